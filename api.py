@@ -0,0 +1,395 @@
+"""
+EDSPL Tracker - JSON API (v1)
+Read access to tickets, comments, attachments and activity for integrations.
+
+Requests authenticate with an API token (Authorization: Bearer <token>; see
+`python manage.py create-token`), not the browser session. Lists are paged
+with keyset cursors, every resource accepts ?fields= for sparse fieldsets,
+and responses carry ETag / Last-Modified validators derived from
+Ticket.updated_at, so a poller that is already up to date gets a 304 after
+one cheap query instead of a full payload.
+"""
+
+import hashlib
+from datetime import datetime, timedelta
+
+from flask import Blueprint, abort, current_app, g, jsonify, request, url_for
+from sqlalchemy.orm import joinedload, load_only
+from werkzeug.exceptions import HTTPException
+
+from models import (db, ApiToken, User, Ticket, Comment, Attachment, ActivityLog,
+                    TICKET_STATUSES, TICKET_PRIORITIES, TICKET_CATEGORIES)
+from archive import activity_source
+from pagination import decode_cursor, paginate_keyset, parse_datetime
+from storage import send_attachment
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+TOKEN_TOUCH_INTERVAL = timedelta(minutes=1)  # how often last_used_at is written
+
+
+# -------------------- Authentication and Errors --------------------
+
+@api.before_request
+def authenticate():
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not token.strip():
+        abort(401, 'An API token is required (Authorization: Bearer <token>).')
+
+    api_token = ApiToken.query.options(joinedload(ApiToken.user)).filter_by(
+        token_hash=ApiToken.hash_token(token.strip()), revoked_at=None
+    ).first()
+    if api_token is None:
+        abort(401, 'Invalid or revoked API token.')
+
+    now = datetime.utcnow()
+    if api_token.last_used_at is None or now - api_token.last_used_at > TOKEN_TOUCH_INTERVAL:
+        api_token.last_used_at = now
+        db.session.commit()
+    g.api_user = api_token.user
+
+
+@api.errorhandler(HTTPException)
+def json_error(e):
+    response = jsonify(error=e.description)
+    response.status_code = e.code
+    if e.code == 401:
+        response.headers['WWW-Authenticate'] = 'Bearer'
+    return response
+
+
+# -------------------- Conditional Requests --------------------
+
+def make_etag(last_modified, *variant):
+    """An ETag for data last changed at `last_modified`, as seen through this request."""
+    raw = '|'.join(str(part) for part in (last_modified, g.api_user.id, request.query_string, *variant))
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def is_current(etag, last_modified):
+    """Whether the client's cached copy (If-None-Match / If-Modified-Since) is still valid."""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)
+    return False
+
+
+def with_validators(response, etag, last_modified):
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True  # always revalidate; that is what the 304s are for
+    return response
+
+
+def not_modified(etag, last_modified):
+    return with_validators(current_app.response_class(status=304), etag, last_modified)
+
+
+def json_response(payload, etag, last_modified):
+    return with_validators(jsonify(payload), etag, last_modified)
+
+
+# -------------------- Resources --------------------
+
+class Resource:
+    """The fields a model exposes and what each needs loaded."""
+
+    def __init__(self, model, columns, relations=None, links=None, always=()):
+        self.model = model
+        self.columns = columns  # attribute names returned as stored
+        self.relations = relations or {}  # field -> (relationship name, getter)
+        self.links = links or {}  # field -> getter building a URL
+        self.always = always  # columns loaded regardless of ?fields= (cursor keys)
+        self.fields = list(columns) + list(self.relations) + list(self.links)
+
+    def requested_fields(self):
+        requested = request.args.get('fields')
+        if not requested:
+            return self.fields
+        names = [name.strip() for name in requested.split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            abort(400, f"Unknown field(s) {', '.join(unknown)}; available: {', '.join(self.fields)}.")
+        return ['id'] + [name for name in names if name != 'id']
+
+    def load_options(self, fields, entity=None):
+        """Load only the columns and relationships the requested fields need, on `entity` (or an alias of it)."""
+        entity = entity or self.model
+        columns = {name for name in fields if name in self.columns} | set(self.always)
+        options = [load_only(*(getattr(entity, name) for name in columns))]
+        for name in fields:
+            if name in self.relations:
+                relationship = getattr(entity, self.relations[name][0])
+                options.append(joinedload(relationship).load_only(User.username))
+        return options
+
+    def serialize(self, obj, fields):
+        data = {}
+        for name in fields:
+            if name in self.columns:
+                value = getattr(obj, name)
+                data[name] = value.isoformat() if isinstance(value, datetime) else value
+            elif name in self.relations:
+                data[name] = self.relations[name][1](obj)
+            else:
+                data[name] = self.links[name](obj)
+        return data
+
+
+TICKETS = Resource(
+    Ticket,
+    ['id', 'ticket_number', 'title', 'description', 'status', 'priority', 'category',
+     'created_at', 'updated_at', 'resolved_at', 'comment_count', 'attachment_count', 'last_activity_at'],
+    relations={
+        'created_by': ('creator', lambda t: t.creator.username),
+        'assigned_to': ('assignee', lambda t: t.assignee.username if t.assignee else None),
+    },
+    links={'url': lambda t: url_for('api.ticket_detail', ticket_id=t.id, _external=True)},
+    always=('created_at', 'updated_at'),
+)
+
+COMMENTS = Resource(
+    Comment,
+    ['id', 'ticket_id', 'content', 'created_at'],
+    relations={'author': ('author', lambda c: c.author.username)},
+    always=('created_at',),
+)
+
+ATTACHMENTS = Resource(
+    Attachment,
+    ['id', 'ticket_id', 'original_filename', 'size', 'mime_type', 'sha256', 'uploaded_at'],
+    relations={'uploaded_by': ('uploader', lambda a: a.uploader.username)},
+    links={'download_url': lambda a: url_for('api.attachment_content', attachment_id=a.id, _external=True)},
+    always=('uploaded_at',),
+)
+
+ACTIVITY = Resource(
+    ActivityLog,
+    ['id', 'ticket_id', 'action', 'old_value', 'new_value', 'created_at'],
+    relations={'user': ('user', lambda a: a.user.username)},
+    always=('created_at',),
+)
+
+
+def get_limit():
+    limit = request.args.get('limit', current_app.config['API_PAGE_SIZE'], type=int)
+    return max(1, min(limit, current_app.config['API_MAX_PAGE_SIZE']))
+
+
+def page_payload(page, resource, fields):
+    args = request.args.to_dict()
+    args.pop('cursor', None)
+    return {
+        'data': [resource.serialize(item, fields) for item in page],
+        'next_cursor': page.next_cursor,
+        'next': url_for(request.endpoint, **request.view_args, **args, cursor=page.next_cursor, _external=True)
+                if page.has_next else None,
+    }
+
+
+# -------------------- Tickets --------------------
+
+TICKET_SORTS = {
+    '-created_at': (Ticket.created_at, True),
+    'created_at': (Ticket.created_at, False),
+    '-updated_at': (Ticket.updated_at, True),
+    'updated_at': (Ticket.updated_at, False),  # oldest change first: for polling with a cursor
+}
+
+
+def _choice_filter(query, column, name, choices):
+    value = request.args.get(name)
+    if value is None:
+        return query
+    if value not in choices:
+        abort(400, f"{name} must be one of {', '.join(choices)}.")
+    return query.filter(column == value)
+
+
+def filtered_tickets():
+    query = Ticket.query
+    query = _choice_filter(query, Ticket.status, 'status', TICKET_STATUSES)
+    query = _choice_filter(query, Ticket.priority, 'priority', TICKET_PRIORITIES)
+    query = _choice_filter(query, Ticket.category, 'category', TICKET_CATEGORIES)
+
+    assigned_to = request.args.get('assigned_to')
+    if assigned_to == 'me':
+        query = query.filter(Ticket.assigned_to == g.api_user.id)
+    elif assigned_to == 'none':
+        query = query.filter(Ticket.assigned_to.is_(None))
+    elif assigned_to:
+        user_id = db.session.query(User.id).filter_by(username=assigned_to).scalar()
+        if user_id is None:
+            abort(400, f'Unknown user {assigned_to!r}.')
+        query = query.filter(Ticket.assigned_to == user_id)
+
+    updated_since = request.args.get('updated_since')
+    if updated_since:
+        try:
+            since = parse_datetime(updated_since)
+        except ValueError:
+            abort(400, 'updated_since must be an ISO date/time.')
+        query = query.filter(Ticket.updated_at > since)
+    return query
+
+
+def tickets_version():
+    """
+    (max updated_at, max id) over all tickets: two index lookups that change
+    whenever any filtered list could have. Changes bump updated_at, even ones
+    that take a ticket out of a filter; new tickets (even imported with an old
+    updated_at) raise the max id; tickets are never deleted.
+    """
+    return db.session.execute(db.select(
+        db.select(db.func.max(Ticket.updated_at)).scalar_subquery(),
+        db.select(db.func.max(Ticket.id)).scalar_subquery(),
+    )).one()
+
+
+@api.route('/tickets')
+def ticket_list():
+    """Tickets, filtered and keyset-paged; or a batch by id with ?ids=1,2,3."""
+    fields = TICKETS.requested_fields()
+    if 'ids' in request.args:
+        return ticket_batch(fields)
+
+    sort = request.args.get('sort', '-created_at')
+    if sort not in TICKET_SORTS:
+        abort(400, f"sort must be one of {', '.join(TICKET_SORTS)}.")
+    sort_column, descending = TICKET_SORTS[sort]
+
+    query = filtered_tickets()
+    last_modified, last_id = tickets_version()
+    etag = make_etag(last_modified, last_id)
+    if is_current(etag, last_modified):
+        return not_modified(etag, last_modified)
+
+    sort_name = sort.lstrip('-')
+    page = paginate_keyset(
+        query.options(*TICKETS.load_options(fields)), sort_column, Ticket.id,
+        key=lambda ticket: (getattr(ticket, sort_name), ticket.id),
+        after=decode_cursor(request.args.get('cursor'), parse=parse_datetime),
+        per_page=get_limit(), descending=descending,
+    )
+    payload = page_payload(page, TICKETS, fields)
+    payload['total'] = query.order_by(None).count()
+    return json_response(payload, etag, last_modified)
+
+
+def ticket_batch(fields):
+    try:
+        ids = [int(part) for part in request.args['ids'].split(',') if part.strip()]
+    except ValueError:
+        abort(400, 'ids must be a comma-separated list of ticket ids.')
+    if not ids or len(ids) > current_app.config['API_BATCH_LIMIT']:
+        abort(400, f"Between 1 and {current_app.config['API_BATCH_LIMIT']} ids can be fetched at once.")
+
+    last_modified, found = db.session.query(db.func.max(Ticket.updated_at), db.func.count(Ticket.id)).filter(
+        Ticket.id.in_(ids)).one()
+    etag = make_etag(last_modified, found)
+    if is_current(etag, last_modified):
+        return not_modified(etag, last_modified)
+
+    tickets = {ticket.id: ticket for ticket in
+               Ticket.query.filter(Ticket.id.in_(ids)).options(*TICKETS.load_options(fields))}
+    payload = {
+        'data': [TICKETS.serialize(tickets[ticket_id], fields) for ticket_id in ids if ticket_id in tickets],
+        'missing': [ticket_id for ticket_id in ids if ticket_id not in tickets],
+    }
+    return json_response(payload, etag, last_modified)
+
+
+def ticket_last_modified(ticket_id):
+    """Ticket.updated_at, which every change to a ticket or its children bumps; 404 if absent."""
+    last_modified = db.session.query(Ticket.updated_at).filter(Ticket.id == ticket_id).scalar()
+    if last_modified is None:
+        abort(404, 'Ticket not found.')
+    return last_modified
+
+
+@api.route('/tickets/<int:ticket_id>')
+def ticket_detail(ticket_id):
+    fields = TICKETS.requested_fields()
+    last_modified = ticket_last_modified(ticket_id)
+    etag = make_etag(last_modified)
+    if is_current(etag, last_modified):
+        return not_modified(etag, last_modified)
+
+    ticket = Ticket.query.options(*TICKETS.load_options(fields)).filter(Ticket.id == ticket_id).one()
+    return json_response(TICKETS.serialize(ticket, fields), etag, last_modified)
+
+
+def ticket_children(ticket_id, resource, query, sort_column, entity=None):
+    """A ticket's comments, attachments or activity, oldest first, keyset-paged; `entity` if querying an alias."""
+    fields = resource.requested_fields()
+    last_modified = ticket_last_modified(ticket_id)
+    etag = make_etag(last_modified)
+    if is_current(etag, last_modified):
+        return not_modified(etag, last_modified)
+
+    entity = entity or resource.model
+    page = paginate_keyset(
+        query.options(*resource.load_options(fields, entity)), sort_column, entity.id,
+        key=lambda item: (getattr(item, sort_column.key), item.id),
+        after=decode_cursor(request.args.get('cursor'), parse=parse_datetime),
+        per_page=get_limit(), descending=False,
+    )
+    return json_response(page_payload(page, resource, fields), etag, last_modified)
+
+
+@api.route('/tickets/<int:ticket_id>/comments')
+def ticket_comments(ticket_id):
+    return ticket_children(ticket_id, COMMENTS, Comment.query.filter(Comment.ticket_id == ticket_id),
+                           Comment.created_at)
+
+
+@api.route('/tickets/<int:ticket_id>/attachments')
+def ticket_attachments(ticket_id):
+    return ticket_children(ticket_id, ATTACHMENTS, Attachment.query.filter(Attachment.ticket_id == ticket_id),
+                           Attachment.uploaded_at)
+
+
+@api.route('/tickets/<int:ticket_id>/activity')
+def ticket_activity(ticket_id):
+    # Like the ticket page, reach back into archived months since the ticket was opened
+    created_at = db.session.query(Ticket.created_at).filter(Ticket.id == ticket_id).scalar()
+    if created_at is None:
+        abort(404, 'Ticket not found.')
+    Activity = activity_source(since=created_at)
+    return ticket_children(ticket_id, ACTIVITY, db.session.query(Activity).filter(Activity.ticket_id == ticket_id),
+                           Activity.created_at, Activity)
+
+
+@api.route('/attachments/<int:attachment_id>/content')
+def attachment_content(attachment_id):
+    attachment = db.session.get(Attachment, attachment_id)
+    if attachment is None:
+        abort(404, 'Attachment not found.')
+    return send_attachment(attachment)
+
+
+# -------------------- Activity Feed --------------------
+
+@api.route('/activity')
+def activity_feed():
+    """
+    All activity in id order; follow next_cursor to consume it as a change
+    feed. Covers activity_log only: rows moved by `manage.py archive-activity`
+    leave the feed, but stay in each ticket's /activity.
+    """
+    fields = ACTIVITY.requested_fields()
+    last_id = db.session.query(db.func.max(ActivityLog.id)).scalar()
+    etag = make_etag(last_id)
+    if is_current(etag, None):
+        return not_modified(etag, None)
+
+    page = paginate_keyset(
+        ActivityLog.query.options(*ACTIVITY.load_options(fields)), ActivityLog.id, ActivityLog.id,
+        key=lambda activity: (activity.id, activity.id),
+        after=decode_cursor(request.args.get('cursor'), parse=int),
+        per_page=get_limit(), descending=False,
+    )
+    return json_response(page_payload(page, ACTIVITY, fields), etag, None)
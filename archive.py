@@ -0,0 +1,167 @@
+"""
+EDSPL Tracker - Activity Archive
+Moves activity older than ACTIVITY_RETENTION_DAYS out of the hot
+activity_log table into one table per month (activity_log_YYYY_MM), so the
+dashboard, ticket pages and change feed keep working on a small table.
+
+Archive tables have the same columns and ids as activity_log and the same
+(created_at, id) and (ticket_id, created_at, id) indexes. The newest row
+always stays in activity_log: SQLite tables created without AUTOINCREMENT
+would otherwise reuse archived ids, and id cursors need them unique. Readers that need
+the full history query through activity_source(), which unions the hot
+table with only the archive months that can hold matching rows.
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table
+from sqlalchemy.orm import aliased
+
+from cache import TTLCache
+from models import db, ActivityLog, ActivityArchive
+
+archive_metadata = MetaData()  # kept apart from db.metadata so create_all leaves them alone
+_tables = {}
+_archives_cache = TTLCache(ttl=60)  # other processes see a new archive month within a minute
+
+
+def archive_table(table_name):
+    if table_name not in _tables:
+        _tables[table_name] = Table(
+            table_name, archive_metadata,
+            Column('id', Integer, primary_key=True, autoincrement=False),
+            Column('ticket_id', Integer, nullable=False),
+            Column('user_id', Integer, nullable=False),
+            Column('action', String(50), nullable=False),
+            Column('old_value', String(256)),
+            Column('new_value', String(256)),
+            Column('created_at', DateTime),
+            Index(f'ix_{table_name}_created_at_id', 'created_at', 'id'),
+            Index(f'ix_{table_name}_ticket_created', 'ticket_id', 'created_at', 'id'),
+        )
+    return _tables[table_name]
+
+
+def _month_start(when):
+    return datetime(when.year, when.month, 1)
+
+
+def _next_month(month_start):
+    return datetime(month_start.year + month_start.month // 12, month_start.month % 12 + 1, 1)
+
+
+# -------------------- Archiving --------------------
+
+class ArchiveResult:
+    def __init__(self):
+        self.moved = 0
+        self.months = {}  # 'YYYY-MM' -> rows moved
+
+
+def archive_activity(older_than_days=180, batch_size=5000, dry_run=False, log=print):
+    """
+    Move activity created more than `older_than_days` ago into monthly archive
+    tables, `batch_size` rows per transaction. Safe to re-run or interrupt:
+    each batch is copied and deleted in the same transaction.
+    """
+    hot = ActivityLog.__table__
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    result = ArchiveResult()
+
+    newest_id = db.session.query(db.func.max(ActivityLog.id)).scalar()
+    oldest = db.session.query(db.func.min(ActivityLog.created_at)).filter(
+        ActivityLog.created_at < cutoff, ActivityLog.id < newest_id).scalar()
+    if oldest is None:
+        return result
+
+    month = _month_start(oldest)
+    while month < cutoff:
+        stop = min(_next_month(month), cutoff)
+        in_month = db.and_(hot.c.created_at >= month, hot.c.created_at < stop, hot.c.id < newest_id)
+        key = f'{month:%Y-%m}'
+
+        if dry_run:
+            count = db.session.query(db.func.count(hot.c.id)).filter(in_month).scalar()
+            if count:
+                result.months[key] = count
+                result.moved += count
+            month = _next_month(month)
+            continue
+
+        table = None
+        while True:
+            ids = [row_id for (row_id,) in db.session.execute(
+                db.select(hot.c.id).where(in_month).order_by(hot.c.id).limit(batch_size)
+            )]
+            if not ids:
+                break
+            if table is None:
+                table = _ensure_archive(key)
+
+            columns = [column.name for column in table.columns]
+            db.session.execute(table.insert().from_select(
+                columns, db.select(*(hot.c[name] for name in columns)).where(hot.c.id.in_(ids))
+            ))
+            db.session.execute(hot.delete().where(hot.c.id.in_(ids)))
+            _record(key, table, ids)
+            db.session.commit()
+
+            result.moved += len(ids)
+            result.months[key] = result.months.get(key, 0) + len(ids)
+            log(f"{key}: archived {result.months[key]} row(s)")
+        month = _next_month(month)
+
+    _archives_cache.clear()
+    return result
+
+
+def _ensure_archive(month):
+    entry = db.session.get(ActivityArchive, month)
+    table_name = entry.table_name if entry else f"activity_log_{month.replace('-', '_')}"
+    table = archive_table(table_name)
+    table.create(bind=db.session.connection(), checkfirst=True)
+    if entry is None:
+        db.session.add(ActivityArchive(month=month, table_name=table_name, row_count=0))
+        db.session.flush()
+    return table
+
+
+def _record(month, table, ids):
+    entry = db.session.get(ActivityArchive, month)
+    low, high = db.session.execute(
+        db.select(db.func.min(table.c.created_at), db.func.max(table.c.created_at)).where(table.c.id.in_(ids))
+    ).one()
+    entry.row_count += len(ids)
+    entry.min_created_at = min(filter(None, (entry.min_created_at, low)), default=None)
+    entry.max_created_at = max(filter(None, (entry.max_created_at, high)), default=None)
+    entry.archived_at = datetime.utcnow()
+
+
+# -------------------- Reading --------------------
+
+def archived_months():
+    """Archive registry rows as plain tuples, cached briefly per process."""
+    return _archives_cache.get_or_set('months', lambda: [
+        (entry.table_name, entry.min_created_at, entry.max_created_at)
+        for entry in ActivityArchive.query.order_by(ActivityArchive.month)
+    ])
+
+
+def activity_source(since=None, until=None):
+    """
+    The entity to query activity through: ActivityLog itself, or an alias of
+    it over activity_log plus every archive month that overlaps since..until.
+    Instances loaded through the alias are ordinary ActivityLog objects.
+    """
+    archives = [table_name for table_name, low, high in archived_months()
+                if (since is None or high is None or high >= since) and (until is None or low is None or low < until)]
+    if not archives:
+        return ActivityLog
+
+    hot = ActivityLog.__table__
+    columns = [column.name for column in hot.columns]
+    selects = [db.select(*(hot.c[name] for name in columns))]
+    for table_name in archives:
+        table = archive_table(table_name)
+        selects.append(db.select(*(table.c[name] for name in columns)))
+    return aliased(ActivityLog, db.union_all(*selects).subquery('activity_all'))
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+EDSPL Tracker - Benchmark Suite
+Drives the Flask test client against the main pages and records latency
+percentiles, SQL query counts and peak memory per scenario in a JSON file,
+so runs on different commits can be compared.
+
+Seed a dedicated database first (the write scenarios add tickets):
+
+    python init_db.py --seed-users 1000 --seed-tickets 500000 --seed-activities 5000000
+    python benchmark.py --iterations 50
+    python benchmark.py --compare bench_results/<old>.json
+    python benchmark.py --only login --login 200 --login-threads 8
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from app import create_app
+from models import db, User, Ticket, ActivityLog, Comment
+
+app = create_app()
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+class Bench:
+    def __init__(self, username, password, seed=1):
+        self.rng = random.Random(seed)
+        self.client = app.test_client()
+        response = self.client.post('/login', data={'username': username, 'password': password})
+        if response.status_code != 302:
+            sys.exit(f"Could not log in as {username}")
+
+        with app.app_context():
+            self.user_id = User.query.filter_by(username=username).first().id
+            self.ticket_ids = [tid for (tid,) in db.session.query(Ticket.id).order_by(db.func.random()).limit(1000)]
+            self.user_ids = [uid for (uid,) in db.session.query(User.id).limit(200)]
+            self.first_day = db.session.query(db.func.min(ActivityLog.created_at)).scalar()
+        if not self.ticket_ids:
+            sys.exit("No tickets to benchmark against; seed the database first (see init_db.py --help).")
+
+    def scenarios(self):
+        """name -> callable returning (method, url, form data)."""
+        rng = self.rng
+        deep_cursor = {}
+
+        def ticket_list_deep():
+            # Walk ten pages in, reusing the cursor the page itself links to
+            if 'after' not in deep_cursor:
+                url = '/tickets'
+                for _ in range(10):
+                    body = self.client.get(url).get_data(as_text=True)
+                    match = re.search(r'after=([^"&]+)', body)
+                    if not match:
+                        break
+                    url = f'/tickets?after={match.group(1)}'
+                deep_cursor['after'] = url
+            return 'GET', deep_cursor['after'], None
+
+        month = self.first_day.strftime('%Y-%m') if self.first_day else datetime.utcnow().strftime('%Y-%m')
+        return {
+            'dashboard': lambda: ('GET', '/dashboard', None),
+            'ticket_list': lambda: ('GET', '/tickets', None),
+            'ticket_list_status': lambda: ('GET', f'/tickets?status={rng.choice(["open", "in_progress", "resolved", "closed"])}', None),
+            'ticket_list_priority': lambda: ('GET', f'/tickets?priority={rng.choice(["low", "medium", "high", "critical"])}', None),
+            'ticket_list_category': lambda: ('GET', f'/tickets?category={rng.choice(["network", "security", "infrastructure", "other"])}', None),
+            'ticket_list_assigned_me': lambda: ('GET', '/tickets?assigned=me', None),
+            'ticket_list_unassigned': lambda: ('GET', '/tickets?assigned=unassigned', None),
+            'ticket_list_search': lambda: ('GET', f'/tickets?search={rng.choice(["firewall", "vpn", "packet loss", "router", "disk"])}', None),
+            'ticket_list_combined': lambda: ('GET', '/tickets?status=open&priority=high&category=network', None),
+            'ticket_list_deep_page': ticket_list_deep,
+            'ticket_view': lambda: ('GET', f'/tickets/{rng.choice(self.ticket_ids)}', None),
+            'audit_log': lambda: ('GET', '/audit', None),
+            'audit_log_range': lambda: ('GET', f'/audit?start_date={month}-01&end_date={month}-28', None),
+            'ticket_create': lambda: ('POST', '/tickets/new', {
+                'title': f'Benchmark ticket {rng.randint(1, 10 ** 9)}', 'description': 'Created by benchmark.py',
+                'priority': 'medium', 'category': 'network', 'assigned_to': str(rng.choice(self.user_ids)),
+            }),
+            'ticket_update': lambda: ('POST', f'/tickets/{rng.choice(self.ticket_ids)}/update', {
+                'status': rng.choice(['open', 'in_progress', 'resolved']), 'priority': rng.choice(['low', 'high']),
+                'assigned_to': str(rng.choice(self.user_ids)), 'title': '', 'description': 'Updated by benchmark.py',
+            }),
+        }
+
+    def request(self, method, url, data):
+        started = time.perf_counter()
+        if method == 'GET':
+            response = self.client.get(url)
+        else:
+            response = self.client.post(url, data=data)
+        response.get_data()  # drain streamed bodies inside the timing
+        elapsed = time.perf_counter() - started
+        return response, elapsed
+
+    def run(self, name, make_request, iterations, warmup):
+        for _ in range(warmup):
+            self.request(*make_request())
+
+        latencies, queries, sql_times, statuses = [], [], [], {}
+        for _ in range(iterations):
+            response, elapsed = self.request(*make_request())
+            latencies.append(elapsed * 1000)
+            queries.append(int(response.headers.get('X-Query-Count', 0)))
+            sql_times.append(float(response.headers.get('X-SQL-Time', 0)))
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        # Memory is measured in a separate pass; tracemalloc slows requests down
+        tracemalloc.start()
+        for _ in range(min(5, iterations)):
+            self.request(*make_request())
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        return {
+            'iterations': iterations,
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+            'p99_ms': round(percentile(latencies, 99), 3),
+            'mean_ms': round(statistics.mean(latencies), 3),
+            'queries_p50': percentile(queries, 50),
+            'queries_max': max(queries),
+            'sql_ms_p50': round(percentile(sql_times, 50), 3),
+            'peak_memory_kb': round(peak / 1024, 1),
+            'status_codes': {str(code): count for code, count in sorted(statuses.items())},
+        }
+
+
+def login_benchmark(username, password, attempts, threads):
+    """
+    Login throughput from `threads` concurrent clients: valid logins, then a
+    burst of wrong passwords for the same account (throttled after the burst).
+    """
+    def login(attempt_password):
+        client = app.test_client()  # a fresh session each time, so every attempt hashes
+        started = time.perf_counter()
+        response = client.post('/login', data={'username': username, 'password': attempt_password})
+        return response.status_code, (time.perf_counter() - started) * 1000
+
+    def run(attempt_password):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(login, [attempt_password] * attempts))
+        elapsed = time.perf_counter() - started
+        latencies = [ms for _, ms in results]
+        return {
+            'attempts': attempts,
+            'threads': threads,
+            'per_second': round(attempts / elapsed, 1),
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+            'status_codes': {str(code): count for code, count in sorted(Counter(code for code, _ in results).items())},
+        }
+
+    return {
+        'hash_method': app.config['PASSWORD_HASH_METHOD'],
+        'hash_concurrency': app.config['PASSWORD_HASH_CONCURRENCY'],
+        'valid': run(password),
+        'invalid': run(password + '-wrong'),
+    }
+
+
+def table_counts():
+    with app.app_context():
+        return {
+            'users': User.query.count(),
+            'tickets': Ticket.query.count(),
+            'comments': Comment.query.count(),
+            'activity_log': ActivityLog.query.count(),
+        }
+
+
+def compare(current, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_path} ({baseline.get('commit')}):")
+    print(f"{'scenario':28} {'p50 ms':>10} {'delta':>8} {'p95 ms':>10} {'delta':>8} {'queries':>8}")
+    for name, result in current['scenarios'].items():
+        old = baseline['scenarios'].get(name)
+        if not old:
+            continue
+
+        def delta(key):
+            return f"{(result[key] - old[key]) / old[key] * 100:+.0f}%" if old[key] else 'n/a'
+        print(f"{name:28} {result['p50_ms']:>10.2f} {delta('p50_ms'):>8} {result['p95_ms']:>10.2f} "
+              f"{delta('p95_ms'):>8} {old['queries_p50']:>3}->{result['queries_p50']:<3}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the EDSPL Tracker pages')
+    parser.add_argument('--iterations', type=int, default=30)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--user', default='admin')
+    parser.add_argument('--password', default='admin123')
+    parser.add_argument('--only', nargs='*', help='Run only these scenarios')
+    parser.add_argument('--output', help='Result file (default bench_results/<commit>.json)')
+    parser.add_argument('--compare', help='Earlier result file to compare against')
+    parser.add_argument('--login', type=int, default=0, metavar='N',
+                        help='Also measure login throughput with N attempts (valid, then wrong passwords)')
+    parser.add_argument('--login-threads', type=int, default=4)
+    args = parser.parse_args()
+
+    app.config['METRICS_RESPONSE_HEADERS'] = True
+    app.config['SLOW_REQUEST_MS'] = 0
+
+    bench = Bench(args.user, args.password)
+    results = {
+        'commit': git_commit(),
+        'timestamp': datetime.utcnow().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'database': app.config['SQLALCHEMY_DATABASE_URI'].split(':', 1)[0],
+        'rows': table_counts(),
+        'scenarios': {},
+    }
+
+    for name, make_request in bench.scenarios().items():
+        if args.only and name not in args.only:
+            continue
+        result = bench.run(name, make_request, args.iterations, args.warmup)
+        results['scenarios'][name] = result
+        print(f"{name:28} p50 {result['p50_ms']:8.2f}ms  p95 {result['p95_ms']:8.2f}ms  "
+              f"p99 {result['p99_ms']:8.2f}ms  queries {result['queries_p50']:>3}  "
+              f"peak {result['peak_memory_kb']:9.1f}KB")
+
+    if args.login:
+        results['login'] = login_benchmark(args.user, args.password, args.login, args.login_threads)
+        for kind in ('valid', 'invalid'):
+            result = results['login'][kind]
+            print(f"{'login_' + kind:28} {result['per_second']:8.1f}/s  p50 {result['p50_ms']:8.2f}ms  "
+                  f"p95 {result['p95_ms']:8.2f}ms  status {result['status_codes']}")
+
+    results['max_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    output = args.output or os.path.join('bench_results', f"{results['commit']}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
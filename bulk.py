@@ -0,0 +1,160 @@
+"""
+EDSPL Tracker - Bulk Ticket Changes
+Applies one status / priority / assignee change to a set of tickets with a
+single set-based UPDATE. The matching activity rows are written by one
+INSERT ... SELECT in the same transaction, and every ticket gets an outcome.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import literal, select, union_all
+
+from models import db, User, Ticket, ActivityLog, TICKET_STATUSES, TICKET_PRIORITIES
+from rollups import RollupChanges, ticket_state
+from saved_filters import FilterCountChanges, expire_quiet_counts, filter_state
+
+# Sentinel for "leave the assignee alone"; None means unassign
+KEEP = object()
+
+OUTCOMES = ('updated', 'unchanged', 'not_found')
+
+
+class BulkError(ValueError):
+    pass
+
+
+class BulkOutcome:
+    def __init__(self, ticket_id, ticket_number=None, outcome='not_found', changes=None):
+        self.ticket_id = ticket_id
+        self.ticket_number = ticket_number
+        self.outcome = outcome
+        self.changes = changes or []  # (field, old value, new value)
+
+
+class BulkResult:
+    def __init__(self):
+        self.outcomes = []
+        self.activity_ids = []
+
+    def count(self, outcome):
+        return sum(1 for item in self.outcomes if item.outcome == outcome)
+
+    @property
+    def counts(self):
+        return {outcome: self.count(outcome) for outcome in OUTCOMES}
+
+
+def bulk_update(ticket_ids, user_id, status=None, priority=None, assigned_to=KEEP, max_tickets=1000):
+    """
+    Change status, priority and/or assignee on every ticket in `ticket_ids`.
+
+    Adds the changes to the current transaction and returns a BulkResult;
+    the caller commits. Tickets already in the requested state are left
+    untouched (no activity, no updated_at bump).
+    """
+    if status is not None and status not in TICKET_STATUSES:
+        raise BulkError(f'Unknown status "{status}".')
+    if priority is not None and priority not in TICKET_PRIORITIES:
+        raise BulkError(f'Unknown priority "{priority}".')
+    if status is None and priority is None and assigned_to is KEEP:
+        raise BulkError('Choose at least one change to apply.')
+
+    ticket_ids = list(dict.fromkeys(ticket_ids))
+    if not ticket_ids:
+        raise BulkError('No tickets selected.')
+    if len(ticket_ids) > max_tickets:
+        raise BulkError(f'At most {max_tickets} tickets can be changed at once.')
+
+    assignee_name = None
+    if assigned_to not in (KEEP, None):
+        assignee_name = db.session.query(User.full_name).filter_by(id=assigned_to).scalar()
+        if assignee_name is None:
+            raise BulkError('Unknown assignee.')
+
+    tickets = Ticket.__table__
+    users = User.__table__
+    activity = ActivityLog.__table__
+    now = datetime.utcnow()
+    selected = tickets.c.id.in_(ticket_ids)
+
+    # Lock the rows (on databases that support it) and keep their old values for the report
+    before = db.session.execute(
+        select(tickets.c.id, tickets.c.ticket_number, tickets.c.status, tickets.c.priority,
+               tickets.c.category, tickets.c.assigned_to, tickets.c.created_at, tickets.c.comment_count,
+               tickets.c.last_activity_at, users.c.full_name)
+        .select_from(tickets.outerjoin(users, users.c.id == tickets.c.assigned_to))
+        .where(selected)
+        .with_for_update(of=tickets)
+    ).all()
+
+    # One SELECT per changed field, each producing the activity rows for the
+    # tickets whose value actually differs; all inserted in one statement
+    def activity_rows(action, old_value, new_value, changed, from_clause=tickets):
+        return (select(tickets.c.id, literal(user_id, db.Integer), literal(action, db.String),
+                       old_value, literal(new_value, db.String), literal(now, db.DateTime))
+                .select_from(from_clause).where(selected, changed))
+
+    parts, changed, values = [], [], {'updated_at': now, 'last_activity_at': now}
+    if status is not None:
+        differs = tickets.c.status.is_distinct_from(status)
+        parts.append(activity_rows('status_changed', tickets.c.status, status, differs))
+        changed.append(differs)
+        values['status'] = status
+        if status == 'resolved':
+            values['resolved_at'] = db.case((differs, now), else_=tickets.c.resolved_at)
+    if priority is not None:
+        differs = tickets.c.priority.is_distinct_from(priority)
+        parts.append(activity_rows('priority_changed', tickets.c.priority, priority, differs))
+        changed.append(differs)
+        values['priority'] = priority
+    if assigned_to is not KEEP:
+        differs = tickets.c.assigned_to.is_distinct_from(assigned_to)
+        parts.append(activity_rows('assigned', users.c.full_name, assignee_name, differs,
+                                   tickets.outerjoin(users, users.c.id == tickets.c.assigned_to)))
+        changed.append(differs)
+        values['assigned_to'] = assigned_to
+
+    result = BulkResult()
+    if before:
+        inserted = db.session.execute(
+            activity.insert()
+            .from_select(['ticket_id', 'user_id', 'action', 'old_value', 'new_value', 'created_at'],
+                         union_all(*parts) if len(parts) > 1 else parts[0])
+            .returning(activity.c.id)
+        )
+        result.activity_ids = sorted(activity_id for (activity_id,) in inserted)
+        db.session.execute(tickets.update().where(selected, db.or_(*changed)).values(**values))
+
+    rollups = RollupChanges()
+    filter_counts = FilterCountChanges()
+    found = {row.id: row for row in before}
+    for ticket_id in ticket_ids:
+        row = found.get(ticket_id)
+        if row is None:
+            result.outcomes.append(BulkOutcome(ticket_id))
+            continue
+        changes = []
+        if status is not None and row.status != status:
+            changes.append(('status', row.status, status))
+        if priority is not None and row.priority != priority:
+            changes.append(('priority', row.priority, priority))
+        if assigned_to is not KEEP and row.assigned_to != assigned_to:
+            changes.append(('assignee', row.full_name, assignee_name))
+        result.outcomes.append(BulkOutcome(row.id, row.ticket_number,
+                                           'updated' if changes else 'unchanged', changes))
+        if changes:
+            old_state = ticket_state(row.status, row.category, row.priority, row.assigned_to)
+            new_state = old_state._replace(
+                status=status or old_state.status, priority=priority or old_state.priority,
+                assignee_id=old_state.assignee_id if assigned_to is KEEP else assigned_to or 0)
+            rollups.track(row.created_at, old_state, new_state, now)
+            old_filters = filter_state(row.status, row.priority, row.category, row.assigned_to, row.comment_count)
+            filter_counts.track(old_filters, old_filters._replace(
+                status=new_state.status, priority=new_state.priority, assigned_to=new_state.assignee_id or None))
+    rollups.save()
+    filter_counts.save()
+    changed_rows = [found[item.ticket_id] for item in result.outcomes if item.outcome == 'updated']
+    if changed_rows:
+        # Only the least recently active ticket decides whether any of them was quiet
+        expire_quiet_counts(min(row.last_activity_at or row.created_at for row in changed_rows))
+    return result
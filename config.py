@@ -2,10 +2,123 @@ import os
 
 basedir = os.path.abspath(os.path.dirname(__file__))
 
+
+def database_url():
+    """DATABASE_URL from the environment, defaulting to the local SQLite file."""
+    url = os.environ.get('DATABASE_URL') or 'sqlite:///' + os.path.join(basedir, 'tracker.db')
+    if url.startswith('postgres://'):
+        # Heroku-style URLs use a scheme SQLAlchemy no longer accepts
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def engine_options(url):
+    """Connection pool sizing; SQLite tuning itself is applied per connection in database.py."""
+    options = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+    }
+    if not url.startswith('sqlite'):
+        options['pool_pre_ping'] = True
+    elif ':memory:' in url or url in ('sqlite://', 'sqlite:///'):
+        # In-memory databases use a single shared connection
+        options = {}
+    return options
+
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'edspl-tracker-secret-key-change-in-production'
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(basedir, 'tracker.db')
+    SQLALCHEMY_DATABASE_URI = database_url()
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # SQLite storage profile: WAL lets readers run alongside the single writer
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 20000))
+
     UPLOAD_FOLDER = os.path.join(basedir, 'uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     ALLOWED_EXTENSIONS = {'txt', 'pdf', 'png', 'jpg', 'jpeg', 'gif', 'doc', 'docx', 'xls', 'xlsx', 'csv', 'log'}
+    TICKETS_PER_PAGE = 50
+    MAX_TICKETS_PER_PAGE = 200
+    SAVED_FILTERS_PER_USER = 20
+    SAVED_FILTER_RECOUNT_SECONDS = 60  # search and 'quiet' filter counts can't be kept per change; recount this often
+    QUIET_TICKET_DAYS = 7  # tickets with no activity for this long count as quiet on the list and dashboard
+    TICKET_COUNT_CACHE_TTL = 30  # seconds a filtered total is reused across pages
+    DASHBOARD_CACHE_TTL = 15  # seconds the dashboard snapshot is shared between requests
+    FRAGMENT_CACHE_ENABLED = True  # reuse rendered ticket list rows until the ticket changes
+    FRAGMENT_CACHE_MAX_BYTES = 8 * 1024 * 1024  # per process, measured in characters of HTML
+    FRAGMENT_CACHE_MAX_ENTRIES = 20000
+    USER_DIRECTORY_CHECK_INTERVAL = 5  # seconds between checks for user changes made by other processes
+    IMPORT_BATCH_SIZE = 1000  # tickets inserted per transaction by bulk imports
+    BULK_MAX_TICKETS = 1000  # tickets one bulk status / priority / assignee change may touch
+    AUDIT_PER_PAGE = 100
+    COMMENTS_PER_PAGE = 50
+    ACTIVITY_PER_PAGE = 30
+    ACTIVITY_RETENTION_DAYS = 180  # manage.py archive-activity moves older activity to monthly tables
+    ARCHIVE_BATCH_SIZE = 5000  # activity rows moved per transaction
+    SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', 500))  # log requests slower than this; 0 disables
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # bearer token for Prometheus scrapes of /metrics
+    METRICS_SLOW_STATEMENTS = 10
+    METRICS_RESPONSE_HEADERS = False  # add X-Query-Count / X-SQL-Time etc. to every response
+
+    # Passwords: hashes made with other parameters are upgraded at the next login.
+    # A method Werkzeug understands, e.g. 'scrypt:32768:8:1' or 'pbkdf2:sha256:600000'
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_CONCURRENCY = int(os.environ.get('PASSWORD_HASH_CONCURRENCY', 2))  # hashes at once per process
+    PASSWORD_HASH_WAIT = 10  # seconds a login waits for a hashing slot before giving up
+
+    # Login throttling: token buckets per username and per client address
+    LOGIN_THROTTLE_ENABLED = os.environ.get('LOGIN_THROTTLE', '1') != '0'
+    LOGIN_THROTTLE_BACKEND = os.environ.get('LOGIN_THROTTLE_BACKEND', 'memory')  # or 'sqlite' to share across processes
+    LOGIN_THROTTLE_PATH = os.path.join(basedir, 'login_throttle.db')
+    LOGIN_USER_BURST = 5  # failed attempts allowed per username before throttling
+    LOGIN_USER_REFILL_SECONDS = 60  # then one more attempt per this many seconds
+    LOGIN_IP_BURST = 20
+    LOGIN_IP_REFILL_SECONDS = 6
+    # Reverse proxies (nginx, PythonAnywhere) in front of the app that append to
+    # X-Forwarded-For; client addresses are read from that header when non-zero
+    PROXY_FIX_X_FOR = int(os.environ.get('PROXY_FIX_X_FOR', 0))
+
+    # Attachments: large files go through resumable chunked uploads
+    MAX_ATTACHMENT_SIZE = int(os.environ.get('MAX_ATTACHMENT_SIZE', 2 * 1024 * 1024 * 1024))
+    UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # suggested to clients; must stay below MAX_CONTENT_LENGTH
+    UPLOAD_BLOCK_SIZE = 1024 * 1024  # bytes read and written per disk write
+    ATTACHMENT_MAX_AGE = 3600  # seconds clients may cache a download before revalidating
+    # None serves files from Python; 'x-sendfile' (Apache/lighttpd) or 'x-accel-redirect' (nginx)
+    # hands the transfer to the front-end server
+    ATTACHMENT_SENDFILE = os.environ.get('ATTACHMENT_SENDFILE') or None
+    ATTACHMENT_ACCEL_PREFIX = '/protected-uploads/'
+
+    # Background jobs (see jobs.py): run `python manage.py worker`, or set
+    # JOB_WORKER_THREADS to run workers inside the web process instead
+    JOB_WORKER_THREADS = int(os.environ.get('JOB_WORKER_THREADS', 0))
+    JOB_POLL_INTERVAL = 1.0  # seconds an idle worker waits before looking again
+    JOB_MAX_ATTEMPTS = 5
+    JOB_RETRY_DELAY = 30  # seconds before the first retry; doubles on each attempt
+    JOB_TIMEOUT = 600  # seconds after which a running job is assumed lost and requeued
+    JOB_KEEP_DAYS = 7  # finished jobs are purged after this many days
+
+    # Live updates over server-sent events; each open page holds a connection,
+    # so the server needs threaded (or async) workers
+    LIVE_UPDATES = os.environ.get('LIVE_UPDATES', '1') != '0'
+    CHANGE_FEED_POLL_INTERVAL = 0.5  # seconds between change-feed reads while anyone listens
+    CHANGE_FEED_WINDOW = 100  # ids re-read behind the newest one, for rows committed out of id order
+    SSE_HEARTBEAT = 15  # seconds between keep-alive comments on an idle stream
+    SSE_MAX_DURATION = 300  # seconds before a stream is closed and the browser reconnects
+
+    # Startup: wsgi.py warms the app up (connection, user directory, templates)
+    # before serving; `python manage.py startup-report` shows where the time goes
+    WARM_UP = os.environ.get('WARM_UP', '1') != '0'
+    STARTUP_BUDGET_SECONDS = float(os.environ.get('STARTUP_BUDGET_SECONDS', 3.0))
+
+    # JSON API (/api/v1), authenticated with tokens from `python manage.py create-token`
+    API_ENABLED = os.environ.get('API_ENABLED', '1') != '0'
+    API_PAGE_SIZE = 100
+    API_MAX_PAGE_SIZE = 500
+    API_BATCH_LIMIT = 100  # ids accepted by one ?ids= batch fetch
@@ -0,0 +1,48 @@
+"""
+EDSPL Tracker - Ticket Counters
+Recomputes the comment_count, attachment_count and last_activity_at columns
+that ticket writes maintain (see Ticket.record_activity), for databases that
+predate them or were loaded outside the app.
+"""
+
+from models import db, Ticket, Comment, Attachment, ActivityLog
+
+
+def repair_ticket_counters(batch_size=5000, log=print):
+    """
+    Recompute the maintained columns from the child tables, one id range per
+    transaction. Only tickets whose stored values are wrong are written.
+    Returns (tickets checked, tickets repaired).
+    """
+    tickets = Ticket.__table__
+    comments = db.select(db.func.count(Comment.id)).where(Comment.ticket_id == tickets.c.id).scalar_subquery()
+    attachments = db.select(db.func.count(Attachment.id)).where(
+        Attachment.ticket_id == tickets.c.id).scalar_subquery()
+    # Archived activity is older than anything left in activity_log, so a
+    # ticket whose history is all archived falls back to its last update
+    last_activity = db.func.coalesce(
+        db.select(db.func.max(ActivityLog.created_at)).where(ActivityLog.ticket_id == tickets.c.id).scalar_subquery(),
+        tickets.c.updated_at, tickets.c.created_at,
+    )
+
+    low, high = db.session.query(db.func.min(tickets.c.id), db.func.max(tickets.c.id)).one()
+    checked = repaired = 0
+    if low is None:
+        return checked, repaired
+
+    for start in range(low, high + 1, batch_size):
+        in_batch = tickets.c.id.between(start, start + batch_size - 1)
+        checked += db.session.query(db.func.count(tickets.c.id)).filter(in_batch).scalar()
+        result = db.session.execute(
+            tickets.update().where(
+                in_batch,
+                db.or_(tickets.c.comment_count.is_distinct_from(comments),
+                       tickets.c.attachment_count.is_distinct_from(attachments),
+                       tickets.c.last_activity_at.is_distinct_from(last_activity)),
+            ).values(comment_count=comments, attachment_count=attachments, last_activity_at=last_activity,
+                     updated_at=tickets.c.updated_at)  # a repair is not a change to the ticket
+        )
+        db.session.commit()
+        repaired += result.rowcount
+        log(f"  tickets {start}-{min(start + batch_size - 1, high)}: {result.rowcount} repaired")
+    return checked, repaired
@@ -0,0 +1,63 @@
+"""
+EDSPL Tracker - Database Engine Setup
+Per-connection tuning for SQLite. PostgreSQL needs nothing beyond the pool
+options in config.py, so the same schema and indexes serve both.
+
+A server that loads the app once and then forks workers (gunicorn --preload,
+uWSGI without lazy-apps) would otherwise hand every worker the master's
+pooled connections; after_fork() gives each worker a fresh pool.
+"""
+
+import os
+import weakref
+
+from sqlalchemy import event
+
+from models import db
+
+# Apps whose engines a forked child must reset; held weakly so an app that is
+# no longer used (tests, one-off scripts) is neither kept alive nor disposed
+_fork_apps = weakref.WeakSet()
+_fork_hook_registered = False
+
+
+def init_engine(app):
+    """Attach connection hooks to the app's engine."""
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name == 'sqlite':
+        event.listen(engine, 'connect', lambda dbapi_conn, record: configure_sqlite(dbapi_conn, app.config))
+    # Covers servers that fork with os.fork(); uWSGI forks below Python, so
+    # wsgi.py also calls after_fork() from its postfork hook
+    global _fork_hook_registered
+    _fork_apps.add(app)
+    if not _fork_hook_registered:
+        os.register_at_fork(after_in_child=_after_fork_in_child)
+        _fork_hook_registered = True
+    return engine
+
+
+def _after_fork_in_child():
+    for app in list(_fork_apps):
+        after_fork(app)
+
+
+def after_fork(app):
+    """Drop the pooled connections inherited from the parent without closing them under it."""
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+def configure_sqlite(dbapi_conn, config):
+    """Apply the SQLite storage profile (journal mode, durability, mmap, cache)."""
+    cursor = dbapi_conn.cursor()
+    try:
+        cursor.execute(f"PRAGMA busy_timeout = {int(config['SQLITE_BUSY_TIMEOUT_MS'])}")
+        cursor.execute(f"PRAGMA journal_mode = {config['SQLITE_JOURNAL_MODE']}")
+        cursor.execute(f"PRAGMA synchronous = {config['SQLITE_SYNCHRONOUS']}")
+        cursor.execute(f"PRAGMA mmap_size = {int(config['SQLITE_MMAP_SIZE'])}")
+        cursor.execute(f"PRAGMA cache_size = -{int(config['SQLITE_CACHE_SIZE_KB'])}")
+        cursor.execute("PRAGMA temp_store = MEMORY")
+    finally:
+        cursor.close()
@@ -0,0 +1,236 @@
+"""
+EDSPL Tracker - Synthetic Data Generator
+Seeds large, realistic volumes of users, tickets, comments and activity for
+load testing. Output is deterministic for a given random seed so benchmark
+runs on different commits see the same data.
+"""
+
+import itertools
+import random
+import time
+from datetime import datetime, timedelta
+
+from passwords import hash_password
+
+from models import (db, User, Ticket, Comment, ActivityLog, TicketSequence, TICKET_PRIORITIES,
+                    bump_cache_version, format_ticket_number)
+from counters import repair_ticket_counters
+from rollups import rebuild_rollups
+
+FIRST_NAMES = ['Aarav', 'Priya', 'Rahul', 'Anita', 'Vikram', 'Neha', 'Suresh', 'Kavya', 'Arjun', 'Meera',
+               'Rohan', 'Divya', 'Karan', 'Pooja', 'Amit', 'Sneha', 'Nikhil', 'Isha', 'Manoj', 'Ritu']
+LAST_NAMES = ['Sharma', 'Verma', 'Gupta', 'Iyer', 'Nair', 'Reddy', 'Patel', 'Singh', 'Das', 'Menon',
+              'Joshi', 'Kulkarni', 'Rao', 'Bose', 'Chopra', 'Mehta', 'Pillai', 'Kapoor', 'Saxena', 'Tyagi']
+
+SUBJECTS = ['Firewall', 'VPN tunnel', 'Core switch', 'Edge router', 'SIEM collector', 'Mail gateway',
+            'Backup job', 'Domain controller', 'Wi-Fi controller', 'Load balancer', 'Proxy server', 'NAS volume']
+PROBLEMS = ['down', 'flapping', 'high CPU', 'certificate expired', 'packet loss', 'disk full',
+            'login failures', 'config drift', 'license expiring', 'slow response', 'unreachable', 'alarm raised']
+WORDS = ('interface link port vlan policy rule session latency threshold alert host service restart '
+         'upstream customer branch site outage patch firmware log trace capture escalation').split()
+
+PRIORITY_WEIGHTS = {'low': 30, 'medium': 45, 'high': 20, 'critical': 5}
+CATEGORY_WEIGHTS = {'network': 40, 'security': 25, 'infrastructure': 25, 'other': 10}
+ACTION_WEIGHTS = {'commented': 50, 'status_changed': 20, 'priority_changed': 10, 'assigned': 15, 'attached': 5}
+
+DEFAULT_PASSWORD = 'password'
+
+
+def _weighted(rng, weights):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def _sentence(rng, words=12):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+class Generator:
+    def __init__(self, seed=42, days=730, batch_size=5000, log=print):
+        self.rng = random.Random(seed)
+        self.days = days
+        self.batch_size = batch_size
+        self.log = log
+        self.now = datetime.utcnow().replace(microsecond=0)
+
+    def _insert(self, table, rows):
+        if rows:
+            db.session.execute(db.insert(table), rows)
+
+    # -------------------- Users --------------------
+
+    def users(self, count):
+        """Create `count` users sharing one password hash (hashing each would dominate)."""
+        password_hash = hash_password(DEFAULT_PASSWORD)
+        start = (db.session.query(db.func.max(User.id)).scalar() or 0) + 1
+        rows = []
+        for n in range(start, start + count):
+            first, last = self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+            rows.append({
+                'username': f'user{n:06d}',
+                'password_hash': password_hash,
+                'full_name': f'{first} {last}',
+                'email': f'user{n:06d}@edspl.net',
+                'role': 'admin' if self.rng.random() < 0.05 else 'technician',
+                'created_at': self.now - timedelta(days=self.rng.randint(0, self.days)),
+            })
+        self._insert(User.__table__, rows)
+        # Core inserts skip the ORM events that tell user directories to reload
+        bump_cache_version(db.session.connection(), 'users')
+        db.session.commit()
+        self.log(f"Seeded {count} users (password: {DEFAULT_PASSWORD})")
+
+    # -------------------- Tickets --------------------
+
+    def tickets(self, count):
+        """Create `count` tickets spread over the last `days` days, busier recently."""
+        user_ids = [uid for (uid,) in db.session.query(User.id)]
+        # A few technicians carry most of the queue: Zipf-like assignment weights
+        assignee_weights = [1.0 / (rank + 1) for rank in range(len(user_ids))]
+        self.rng.shuffle(assignee_weights)
+        cum_weights = list(itertools.accumulate(assignee_weights))
+
+        created = sorted(
+            self.now - timedelta(seconds=int(self.days * 86400 * self.rng.random() ** 1.5))
+            for _ in range(count)
+        )
+
+        done = 0
+        while done < count:
+            chunk = created[done:done + self.batch_size]
+            rows = []
+            by_year = {}
+            for created_at in chunk:
+                by_year[created_at.year] = by_year.get(created_at.year, 0) + 1
+            numbers = {year: TicketSequence.reserve(year, n) for year, n in by_year.items()}
+
+            for created_at in chunk:
+                year = created_at.year
+                number = format_ticket_number(year, numbers[year])
+                numbers[year] += 1
+
+                age_days = (self.now - created_at).days
+                # Older tickets are far more likely to be finished
+                if self.rng.random() < min(0.97, 0.15 + age_days / 60):
+                    status = 'closed' if self.rng.random() < 0.6 else 'resolved'
+                else:
+                    status = 'in_progress' if self.rng.random() < 0.4 else 'open'
+
+                resolved_at = None
+                if status in ('resolved', 'closed'):
+                    hours = min(self.rng.lognormvariate(2.5, 1.2), max(age_days, 1) * 24)
+                    resolved_at = created_at + timedelta(hours=hours)
+
+                assigned_to = None
+                if status != 'open' or self.rng.random() < 0.7:
+                    assigned_to = self.rng.choices(user_ids, cum_weights=cum_weights)[0]
+
+                rows.append({
+                    'ticket_number': number,
+                    'title': f'{self.rng.choice(SUBJECTS)} {self.rng.choice(PROBLEMS)} at site {self.rng.randint(1, 400)}',
+                    'description': _sentence(self.rng, self.rng.randint(8, 40)),
+                    'status': status,
+                    'priority': _weighted(self.rng, PRIORITY_WEIGHTS),
+                    'category': _weighted(self.rng, CATEGORY_WEIGHTS),
+                    'created_by': self.rng.choice(user_ids),
+                    'assigned_to': assigned_to,
+                    'created_at': created_at,
+                    'updated_at': resolved_at or created_at,
+                    'resolved_at': resolved_at,
+                    'last_activity_at': resolved_at or created_at,
+                })
+
+            self._insert(Ticket.__table__, rows)
+            db.session.commit()
+            done += len(chunk)
+            self.log(f"  tickets: {done}/{count}")
+
+    # -------------------- Activity and Comments --------------------
+
+    def activity(self, count, comment_ratio=0.2):
+        """
+        Create `count` activity rows across existing tickets, one "created" row
+        per ticket first. About `comment_ratio` of the rows are comments, which
+        also get a Comment row.
+        """
+        tickets = db.session.query(Ticket.id, Ticket.created_at, Ticket.created_by).all()
+        user_ids = [uid for (uid,) in db.session.query(User.id)]
+        if not tickets:
+            return
+
+        names = dict(db.session.query(User.id, User.full_name))
+        activities, comments = [], []
+        written = 0
+
+        def flush():
+            self._insert(ActivityLog.__table__, activities)
+            self._insert(Comment.__table__, comments)
+            db.session.commit()
+            activities.clear()
+            comments.clear()
+
+        for ticket_id, created_at, created_by in tickets:
+            if written >= count:
+                break
+            activities.append({'ticket_id': ticket_id, 'user_id': created_by, 'action': 'created',
+                               'old_value': None, 'new_value': None, 'created_at': created_at})
+            written += 1
+            if len(activities) >= self.batch_size:
+                flush()
+
+        weights = dict(ACTION_WEIGHTS)
+        others = sum(w for action, w in weights.items() if action != 'commented')
+        weights['commented'] = others * comment_ratio / max(1 - comment_ratio, 0.01)
+        while written < count:
+            ticket_id, created_at, _ = self.rng.choice(tickets)
+            user_id = self.rng.choice(user_ids)
+            action = _weighted(self.rng, weights)
+            span = max((self.now - created_at).total_seconds(), 1)
+            when = created_at + timedelta(seconds=span * self.rng.random() ** 2)
+
+            old_value = new_value = None
+            if action == 'status_changed':
+                old_value, new_value = self.rng.sample(['open', 'in_progress', 'resolved', 'closed'], 2)
+            elif action == 'priority_changed':
+                old_value, new_value = self.rng.sample(list(TICKET_PRIORITIES), 2)
+            elif action == 'assigned':
+                new_value = names[self.rng.choice(user_ids)]
+            elif action == 'attached':
+                new_value = f'capture-{self.rng.randint(1, 99999)}.log'
+            elif action == 'commented':
+                comments.append({'ticket_id': ticket_id, 'user_id': user_id,
+                                 'content': _sentence(self.rng, self.rng.randint(5, 30)), 'created_at': when})
+
+            activities.append({'ticket_id': ticket_id, 'user_id': user_id, 'action': action,
+                               'old_value': old_value, 'new_value': new_value, 'created_at': when})
+            written += 1
+            if len(activities) >= self.batch_size:
+                flush()
+                if written % (self.batch_size * 20) == 0:
+                    self.log(f"  activity: {written}/{count}")
+
+        flush()
+        self.log(f"Seeded {written} activity rows")
+
+
+def seed(users=0, tickets=0, activities=0, comment_ratio=0.2, seed=42, days=730, batch_size=5000, log=print):
+    """Seed the given volumes into the current database."""
+    started = time.perf_counter()
+    generator = Generator(seed=seed, days=days, batch_size=batch_size, log=log)
+    if users:
+        generator.users(users)
+    if tickets:
+        generator.tickets(tickets)
+    if activities:
+        generator.activity(activities, comment_ratio=comment_ratio)
+    if tickets:
+        counted = rebuild_rollups(batch_size=batch_size)
+        log(f"Rebuilt reporting rollups from {counted} tickets")
+    if activities:
+        checked, repaired = repair_ticket_counters(batch_size=batch_size, log=lambda *_: None)
+        log(f"Counted comments and last activity on {repaired} of {checked} tickets")
+
+    if db.engine.dialect.name == 'sqlite':
+        # Refresh planner statistics after a bulk load
+        db.session.execute(db.text('ANALYZE'))
+        db.session.commit()
+    log(f"Seeding finished in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,111 @@
+"""
+EDSPL Tracker - User Directory
+Process-level cache of every user as a small read-only record. It loads the
+logged-in user and fills names and assignee lists, so ordinary requests do
+not query the users table.
+
+Every insert, update or delete of a user bumps the 'users' cache version in
+the same transaction. A process reloads its copy when it sees a newer
+version. It looks at most every USER_DIRECTORY_CHECK_INTERVAL seconds, and
+straight away after a change made in the same process.
+"""
+
+import threading
+import time
+
+from flask_login import UserMixin
+from sqlalchemy import event
+
+from models import db, User, CacheVersion, bump_cache_version
+
+VERSION_NAME = 'users'
+
+
+class DirectoryUser(UserMixin):
+    """What requests need to know about a user; not attached to a database session."""
+    __slots__ = ('id', 'username', 'full_name', 'email', 'role')
+
+    def __init__(self, id, username, full_name, email, role):
+        self.id = id
+        self.username = username
+        self.full_name = full_name
+        self.email = email
+        self.role = role
+
+    def __repr__(self):
+        return f'<DirectoryUser {self.username}>'
+
+
+class UserDirectory:
+    def __init__(self):
+        self.check_interval = 5
+        self._users = {}
+        self._by_name = []
+        self._version = None
+        self._generation = 0
+        self._checked = 0.0
+        self._stale = True
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault('USER_DIRECTORY_CHECK_INTERVAL', 5)
+        self.check_interval = app.config['USER_DIRECTORY_CHECK_INTERVAL']
+        app.extensions['user_directory'] = self
+        app.jinja_env.globals['user_name'] = self.name
+
+    def get(self, user_id):
+        self._refresh()
+        return self._users.get(user_id)
+
+    def name(self, user_id, default='-'):
+        user = self.get(user_id) if user_id else None
+        return user.full_name if user else default
+
+    def all(self):
+        """Every user, ordered by full name."""
+        self._refresh()
+        return self._by_name
+
+    @property
+    def generation(self):
+        """Counts reloads of this process's copy; part of cache keys for anything showing names."""
+        self._refresh()
+        return self._generation
+
+    def invalidate(self):
+        self._stale = True
+
+    def _refresh(self):
+        if not self._stale and time.monotonic() - self._checked < self.check_interval:
+            return
+        with self._lock:
+            if not self._stale and time.monotonic() - self._checked < self.check_interval:
+                return  # another thread just refreshed
+            version = self._read_version()
+            if self._stale or version != self._version:
+                self._load(version)
+            self._checked = time.monotonic()
+
+    def _read_version(self):
+        return db.session.query(CacheVersion.version).filter_by(name=VERSION_NAME).scalar() or 0
+
+    def _load(self, version):
+        self._stale = False
+        rows = db.session.query(User.id, User.username, User.full_name, User.email, User.role)
+        users = {row.id: DirectoryUser(*row) for row in rows}
+        # Swap whole structures so readers never see a half-built directory
+        self._by_name = sorted(users.values(), key=lambda user: user.full_name.lower())
+        self._users = users
+        self._version = version
+        self._generation += 1
+
+
+user_directory = UserDirectory()
+
+
+@event.listens_for(User, 'after_insert')
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _user_changed(mapper, connection, target):
+    bump_cache_version(connection, VERSION_NAME)
+    user_directory.invalidate()
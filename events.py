@@ -0,0 +1,268 @@
+"""
+EDSPL Tracker - Live Updates
+One background thread per process follows the activity_log and comments
+tables and fans new rows out to every connected server-sent-events client,
+so the database sees one small query per poll interval no matter how many
+browsers are watching.
+
+Event ids are "<activity id>-<comment id>" high-water marks, which lets a
+reconnecting browser (Last-Event-ID) pick up where it left off. Ids are
+handed out at insert but rows only become visible at commit, so on
+PostgreSQL a lower id can show up after a higher one was read. Every read
+therefore goes back CHANGE_FEED_WINDOW ids behind the mark and skips the
+rows it has already sent; pages drop repeats of rows they already show.
+"""
+
+import json
+import logging
+import queue
+import threading
+import time
+
+from sqlalchemy.orm import aliased
+
+from models import db, User, Ticket, Comment, ActivityLog
+
+logger = logging.getLogger(__name__)
+
+
+def format_event_id(cursor):
+    return f'{cursor[0]}-{cursor[1]}'
+
+
+def parse_event_id(value):
+    """Parse an event id back into an (activity id, comment id) cursor, or None."""
+    try:
+        activity_id, comment_id = (int(part) for part in (value or '').split('-'))
+    except ValueError:
+        return None
+    return activity_id, comment_id
+
+
+def latest_cursor():
+    return (db.session.query(db.func.coalesce(db.func.max(ActivityLog.id), 0)).scalar(),
+            db.session.query(db.func.coalesce(db.func.max(Comment.id), 0)).scalar())
+
+
+def load_changes(cursor, ticket_id=None, limit=500, window=0, seen=None):
+    """
+    Activity and comments written after `cursor`, oldest first, as event
+    dicts. Returns (events, cursor after them, whether the limit was hit).
+
+    `window` ids behind the cursor are read again to catch rows committed
+    out of id order. `seen` is a pair of (activity, comment) id sets: rows
+    in it are skipped, new rows are added, and ids that have fallen out of
+    the window are dropped from it.
+    """
+    if seen is None:
+        seen = (set(), set())
+    activity_after, comment_after = (max(after - window, 0) for after in cursor)
+    actor = aliased(User)
+    assignee = aliased(User)
+
+    activity_query = db.select(
+        ActivityLog.id, ActivityLog.ticket_id, ActivityLog.action, ActivityLog.old_value,
+        ActivityLog.new_value, ActivityLog.created_at, actor.full_name, Ticket.ticket_number,
+        Ticket.status, Ticket.priority, assignee.full_name,
+    ).join(actor, ActivityLog.user_id == actor.id).join(
+        Ticket, ActivityLog.ticket_id == Ticket.id
+    ).outerjoin(assignee, Ticket.assigned_to == assignee.id).where(
+        ActivityLog.id > activity_after
+    ).order_by(ActivityLog.id).limit(limit)
+
+    comment_query = db.select(
+        Comment.id, Comment.ticket_id, Comment.content, Comment.created_at, actor.full_name,
+    ).join(actor, Comment.user_id == actor.id).where(
+        Comment.id > comment_after
+    ).order_by(Comment.id).limit(limit)
+
+    if ticket_id is not None:
+        activity_query = activity_query.where(ActivityLog.ticket_id == ticket_id)
+        comment_query = comment_query.where(Comment.ticket_id == ticket_id)
+
+    activities = db.session.execute(activity_query).all()
+    comments = db.session.execute(comment_query).all()
+
+    changes = []
+    seen_activity, seen_comments = seen
+    for (row_id, ticket, action, old_value, new_value, created_at, user, number,
+         status, priority, assigned) in activities:
+        if row_id in seen_activity:
+            continue
+        seen_activity.add(row_id)
+        changes.append((created_at, 'activity', row_id, {
+            'id': row_id, 'ticket_id': ticket, 'ticket_number': number, 'action': action,
+            'old_value': old_value, 'new_value': new_value, 'user': user,
+            'created_at': created_at.isoformat(),
+            # Current ticket state, so open pages can update without a reload
+            'ticket': {'status': status, 'priority': priority, 'assignee': assigned},
+        }))
+    for row_id, ticket, content, created_at, user in comments:
+        if row_id in seen_comments:
+            continue
+        seen_comments.add(row_id)
+        changes.append((created_at, 'comment', row_id, {
+            'id': row_id, 'ticket_id': ticket, 'content': content, 'user': user,
+            'created_at': created_at.isoformat(),
+        }))
+    changes.sort(key=lambda change: (change[0], change[1] == 'activity', change[2]))
+
+    events = []
+    activity_id, comment_id = cursor
+    for _, kind, row_id, data in changes:
+        if kind == 'activity':
+            activity_id = max(activity_id, row_id)
+        else:
+            comment_id = max(comment_id, row_id)
+        events.append({'event': kind, 'id': format_event_id((activity_id, comment_id)),
+                       'row_id': row_id, 'data': data})
+
+    # Read up to the last row of each kind seen, even if nothing matched the filter
+    cursor = (max(cursor[0], activities[-1][0]) if activities else cursor[0],
+              max(cursor[1], comments[-1][0]) if comments else cursor[1])
+    for ids, high in zip(seen, cursor):
+        ids.difference_update([row_id for row_id in ids if row_id <= high - window])
+    return events, cursor, len(activities) >= limit or len(comments) >= limit
+
+
+def format_event(event):
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+
+class Subscription:
+    """One connected client: a bounded queue of events, optionally for one ticket."""
+
+    def __init__(self, ticket_id=None, maxsize=1000):
+        self.ticket_id = ticket_id
+        self.events = queue.Queue(maxsize)
+        self.overflowed = False
+
+    def offer(self, event):
+        if self.ticket_id is not None and event['data']['ticket_id'] != self.ticket_id:
+            return
+        try:
+            self.events.put_nowait(event)
+        except queue.Full:
+            # A client this far behind is told to reload instead
+            self.overflowed = True
+
+
+class ChangeFeed:
+    """Polls for new activity while anyone is subscribed and fans it out."""
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._thread = None
+        self.cursor = None  # high-water mark of what has been fanned out
+        self.seen = (set(), set())  # ids fanned out within the window behind it
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('CHANGE_FEED_POLL_INTERVAL', 0.5)
+        app.config.setdefault('CHANGE_FEED_WINDOW', 100)
+        app.config.setdefault('SSE_HEARTBEAT', 15)
+        app.config.setdefault('SSE_MAX_DURATION', 300)
+        app.config.setdefault('SSE_RETRY_MS', 2000)
+        app.config.setdefault('SSE_REPLAY_LIMIT', 200)
+        self.app = app
+        app.extensions['change_feed'] = self
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def subscribe(self, ticket_id=None):
+        subscription = Subscription(ticket_id)
+        with self._lock:
+            if self.cursor is None:
+                # Start from what is visible now, before the caller replays
+                # up to it, so nothing committed in between is lost
+                self._start()
+            self._subscribers.add(subscription)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='change-feed', daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def _start(self):
+        with self.app.app_context():
+            self.seen = (set(), set())
+            # Rows already visible inside the window count as sent
+            _, self.cursor, _ = load_changes(latest_cursor(), window=self.app.config['CHANGE_FEED_WINDOW'],
+                                             seen=self.seen)
+
+    def poll(self):
+        """Read what was committed since the last poll; returns new events."""
+        with self.app.app_context():
+            events, self.cursor, _ = load_changes(self.cursor, window=self.app.config['CHANGE_FEED_WINDOW'],
+                                                  seen=self.seen)
+        return events
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    # Nobody listening: stop querying; subscribe() starts afresh
+                    self.cursor = None
+            if self.cursor is None:
+                time.sleep(self.app.config['CHANGE_FEED_POLL_INTERVAL'])
+                continue
+            try:
+                events = self.poll()
+            except Exception:
+                logger.exception('Change feed poll failed')
+                events = []
+
+            with self._lock:
+                subscribers = list(self._subscribers)
+            for event in events:
+                for subscription in subscribers:
+                    subscription.offer(event)
+            time.sleep(self.app.config['CHANGE_FEED_POLL_INTERVAL'])
+
+    def stream(self, subscription, since=None):
+        """
+        Yield server-sent-event text for a subscription until the client
+        goes away or SSE_MAX_DURATION passes (the browser then reconnects
+        with Last-Event-ID). `since` replays what the client missed first.
+        """
+        config = self.app.config
+        backlog, replayed, reload = [], (set(), set()), False
+        if since is not None:
+            with self.app.app_context():
+                backlog, _, reload = load_changes(since, subscription.ticket_id, limit=config['SSE_REPLAY_LIMIT'],
+                                                  window=config['CHANGE_FEED_WINDOW'], seen=replayed)
+
+        try:
+            yield f"retry: {config['SSE_RETRY_MS']}\n\n"
+            if reload:
+                yield 'event: reload\ndata: {}\n\n'
+                return
+            for event in backlog:
+                yield format_event(event)
+
+            deadline = time.monotonic() + config['SSE_MAX_DURATION']
+            while time.monotonic() < deadline:
+                try:
+                    event = subscription.events.get(timeout=config['SSE_HEARTBEAT'])
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+                    continue
+                if subscription.overflowed:
+                    yield 'event: reload\ndata: {}\n\n'
+                    return
+                if event['row_id'] in replayed[0 if event['event'] == 'activity' else 1]:
+                    # Already sent from the replay
+                    continue
+                yield format_event(event)
+        finally:
+            self.unsubscribe(subscription)
+
+
+change_feed = ChangeFeed()
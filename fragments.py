@@ -0,0 +1,67 @@
+"""
+EDSPL Tracker - Fragment Cache
+Keeps rendered HTML for parts of a page that only change with their data,
+such as ticket list rows keyed on (ticket id, updated_at), in a per-process
+LRU cache bounded by size. Templates call cached_fragment(); hits, misses
+and evictions are exported on /metrics.
+"""
+
+from markupsafe import Markup
+
+from cache import LRUCache
+from directory import user_directory
+from metrics import metrics
+
+
+class FragmentCache:
+    def __init__(self):
+        self.app = None
+        self.cache = None
+
+    def init_app(self, app):
+        app.config.setdefault('FRAGMENT_CACHE_ENABLED', True)
+        app.config.setdefault('FRAGMENT_CACHE_MAX_BYTES', 8 * 1024 * 1024)
+        app.config.setdefault('FRAGMENT_CACHE_MAX_ENTRIES', 20000)
+        self.app = app
+        self.cache = LRUCache(max_bytes=app.config['FRAGMENT_CACHE_MAX_BYTES'],
+                              max_entries=app.config['FRAGMENT_CACHE_MAX_ENTRIES'])
+        app.extensions['fragment_cache'] = self
+        app.jinja_env.globals['cached_fragment'] = self.render
+        metrics.register_collector('fragment_cache', self.collect)
+
+    def render(self, template_name, *key, **context):
+        """
+        Render `template_name` with `context`, or reuse the HTML from an earlier
+        render with the same key. The key must cover everything the fragment
+        shows; user names are covered by the user directory's generation.
+        """
+        if not self.app.config['FRAGMENT_CACHE_ENABLED']:
+            return Markup(self._render(template_name, context))
+        cache_key = (template_name, user_directory.generation) + key
+        html = self.cache.get(cache_key)
+        if html is None:
+            html = self._render(template_name, context)
+            self.cache.set(cache_key, html)
+        return Markup(html)
+
+    def _render(self, template_name, context):
+        # Straight through Jinja: fragments are rendered inside a page, so the
+        # template signals (and their render-time metrics) would count twice
+        return self.app.jinja_env.get_template(template_name).render(context)
+
+    def collect(self):
+        cache = self.cache
+        lines = []
+        for name, kind, value, help_text in (
+            ('edspl_fragment_cache_hits_total', 'counter', cache.hits, 'Fragments served from the cache.'),
+            ('edspl_fragment_cache_misses_total', 'counter', cache.misses, 'Fragments rendered and cached.'),
+            ('edspl_fragment_cache_evictions_total', 'counter', cache.evictions,
+             'Fragments dropped to stay within the size limit.'),
+            ('edspl_fragment_cache_entries', 'gauge', len(cache), 'Fragments currently cached.'),
+            ('edspl_fragment_cache_size_chars', 'gauge', cache.size, 'Total size of the cached HTML.'),
+        ):
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}', f'{name} {value}']
+        return lines
+
+
+fragment_cache = FragmentCache()
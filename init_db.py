@@ -1,16 +1,25 @@
 #!/usr/bin/env python3
 """
 EDSPL Tracker - Database Initialization Script
-Creates the database and default users.
+Creates the database and default users, and optionally seeds synthetic
+data for load testing:
+
+    python init_db.py --seed-users 1000 --seed-tickets 500000 --seed-activities 5000000
 """
 
-from app import app, db
-from models import User
+import argparse
+
+from app import create_app
+from models import db, User, ensure_schema
+from datagen import seed
+
+# Schema and users only: no need to load the web views or the API
+app = create_app(blueprints=False)
 
 def init_database():
     with app.app_context():
-        # Create all tables
-        db.create_all()
+        # Create all tables and indexes
+        ensure_schema()
         print("Database tables created successfully.")
 
         # Check if admin user exists
@@ -80,5 +89,21 @@ def init_database():
         print("Access at: http://localhost:5000")
         print("="*50)
 
+def seed_database(args):
+    with app.app_context():
+        seed(users=args.seed_users, tickets=args.seed_tickets, activities=args.seed_activities,
+             comment_ratio=args.comment_ratio, seed=args.random_seed, days=args.days)
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Create the EDSPL Tracker database')
+    parser.add_argument('--seed-users', type=int, default=0, help='Synthetic users to add')
+    parser.add_argument('--seed-tickets', type=int, default=0, help='Synthetic tickets to add')
+    parser.add_argument('--seed-activities', type=int, default=0, help='Synthetic activity rows to add')
+    parser.add_argument('--comment-ratio', type=float, default=0.2, help='Share of activity rows that are comments')
+    parser.add_argument('--days', type=int, default=730, help='Spread tickets over this many past days')
+    parser.add_argument('--random-seed', type=int, default=42)
+    args = parser.parse_args()
+
     init_database()
+    if args.seed_users or args.seed_tickets or args.seed_activities:
+        seed_database(args)
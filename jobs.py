@@ -0,0 +1,226 @@
+"""
+EDSPL Tracker - Background Jobs
+A small persistent job queue. Routes enqueue side work in the same
+transaction as the change it follows, so it runs only once that commits;
+worker threads claim due jobs from the jobs table, run the registered task
+and retry failures with exponential backoff. Workers run either in a
+separate process (python manage.py worker) or inside the web process when
+JOB_WORKER_THREADS is set.
+
+Tasks may run more than once (a retry after a partial failure, or a worker
+that died mid-job), so they must be safe to repeat.
+"""
+
+import json
+import logging
+import os
+import socket
+import threading
+import traceback
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from models import db, Job
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ['queued', 'running', 'done', 'failed']
+
+TASKS = {}
+
+
+def task(name):
+    """Register a function as the task `name`; it is called with the job payload as keywords."""
+    def register(fn):
+        TASKS[name] = fn
+        return fn
+    return register
+
+
+def enqueue(name, payload=None, key=None, delay=0, max_attempts=None):
+    """
+    Add the task `name` to the current transaction; the caller commits.
+
+    Because the job is written alongside the changes it refers to, workers
+    only see it once those changes are committed, and it is dropped if they
+    roll back. With an idempotency `key`, enqueueing the same work twice
+    returns the job already queued under that key.
+    """
+    if name not in TASKS:
+        raise KeyError(f'unknown task: {name}')
+    if key:
+        existing = Job.query.filter_by(idempotency_key=key).first()
+        if existing:
+            return existing
+
+    job = Job(
+        task=name,
+        payload=json.dumps(payload or {}),
+        idempotency_key=key,
+        max_attempts=max_attempts or current_app.config['JOB_MAX_ATTEMPTS'],
+        run_at=datetime.utcnow() + timedelta(seconds=delay),
+    )
+    try:
+        with db.session.begin_nested():
+            db.session.add(job)
+    except IntegrityError:
+        # Another transaction queued the same key first
+        return Job.query.filter_by(idempotency_key=key).one()
+    return job
+
+
+# -------------------- Running Jobs --------------------
+
+def claim_job(worker_id):
+    """Mark the oldest due job as running for `worker_id` and return it, or None."""
+    jobs = Job.__table__
+    now = datetime.utcnow()
+    next_due = db.select(jobs.c.id).where(
+        jobs.c.status == 'queued', jobs.c.run_at <= now
+    ).order_by(jobs.c.run_at, jobs.c.id).limit(1).with_for_update(skip_locked=True).scalar_subquery()
+
+    # The status check makes a job claimed by another worker meanwhile a no-op
+    row = db.session.execute(
+        jobs.update().where(jobs.c.id == next_due, jobs.c.status == 'queued').values(
+            status='running', locked_by=worker_id, started_at=now, attempts=jobs.c.attempts + 1
+        ).returning(jobs.c.id, jobs.c.task, jobs.c.payload, jobs.c.attempts, jobs.c.max_attempts)
+    ).first()
+    db.session.commit()
+    return row
+
+
+def run_job(job, worker_id):
+    """Run a claimed job and record the outcome. Returns True if it succeeded."""
+    jobs = Job.__table__
+    fn = TASKS.get(job.task)
+    try:
+        if fn is None:
+            raise LookupError(f'unknown task: {job.task}')
+        fn(**json.loads(job.payload))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        error = traceback.format_exc(limit=5)
+        now = datetime.utcnow()
+        if job.attempts >= job.max_attempts:
+            values = {'status': 'failed', 'finished_at': now}
+            logger.error('Job %s (%s) failed permanently after %d attempts', job.id, job.task, job.attempts)
+        else:
+            delay = current_app.config['JOB_RETRY_DELAY'] * 2 ** (job.attempts - 1)
+            values = {'status': 'queued', 'run_at': now + timedelta(seconds=delay)}
+            logger.warning('Job %s (%s) failed, retrying in %ds', job.id, job.task, delay)
+        values.update(last_error=error, locked_by=None)
+        succeeded = False
+    else:
+        values = {'status': 'done', 'finished_at': datetime.utcnow(), 'locked_by': None}
+        succeeded = True
+
+    # A job requeued as lost and claimed elsewhere is left to its new owner
+    db.session.execute(jobs.update().where(jobs.c.id == job.id, jobs.c.locked_by == worker_id).values(**values))
+    db.session.commit()
+    return succeeded
+
+
+def requeue_lost_jobs():
+    """Put back jobs whose worker disappeared (running for longer than JOB_TIMEOUT)."""
+    jobs = Job.__table__
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config['JOB_TIMEOUT'])
+    count = db.session.execute(
+        jobs.update().where(jobs.c.status == 'running', jobs.c.started_at < cutoff).values(
+            status='queued', locked_by=None, run_at=datetime.utcnow()
+        )
+    ).rowcount
+    db.session.commit()
+    return count
+
+
+def purge_finished_jobs():
+    jobs = Job.__table__
+    cutoff = datetime.utcnow() - timedelta(days=current_app.config['JOB_KEEP_DAYS'])
+    count = db.session.execute(
+        jobs.delete().where(jobs.c.status == 'done', jobs.c.finished_at < cutoff)
+    ).rowcount
+    db.session.commit()
+    return count
+
+
+def retry_job(job):
+    """Queue a failed job to run again with a fresh set of attempts."""
+    job.status = 'queued'
+    job.attempts = 0
+    job.run_at = datetime.utcnow()
+    job.finished_at = None
+    job.last_error = None
+    db.session.commit()
+
+
+# -------------------- Worker Pool --------------------
+
+class WorkerPool:
+    """Threads that claim and run jobs until stopped."""
+
+    HOUSEKEEPING_INTERVAL = 60  # seconds between lost-job and purge sweeps
+
+    def __init__(self, app, threads=4):
+        self.app = app
+        self.threads = threads
+        self._stop = threading.Event()
+        self._workers = []
+        self._last_housekeeping = 0.0
+        self._housekeeping_lock = threading.Lock()
+
+    def start(self):
+        prefix = f'{socket.gethostname()}:{os.getpid()}'
+        for n in range(self.threads):
+            worker = threading.Thread(target=self._run, args=(f'{prefix}:{n}',),
+                                      name=f'job-worker-{n}', daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        return self
+
+    def stop(self, timeout=None):
+        """Ask workers to stop after their current job and wait for them."""
+        self._stop.set()
+        for worker in self._workers:
+            worker.join(timeout)
+
+    def wait(self):
+        while any(worker.is_alive() for worker in self._workers):
+            for worker in self._workers:
+                worker.join(1)
+
+    def _run(self, worker_id):
+        poll_interval = self.app.config['JOB_POLL_INTERVAL']
+        while not self._stop.is_set():
+            with self.app.app_context():
+                try:
+                    job = claim_job(worker_id)
+                    if job is not None:
+                        run_job(job, worker_id)
+                    else:
+                        self._housekeeping()
+                except OperationalError as e:
+                    # Typically a locked SQLite database; try again shortly
+                    db.session.rollback()
+                    logger.warning('Job worker %s: %s', worker_id, e.orig)
+                    job = None
+            if job is None:
+                self._stop.wait(poll_interval)
+
+    def _housekeeping(self):
+        now = datetime.utcnow().timestamp()
+        with self._housekeeping_lock:
+            if now - self._last_housekeeping < self.HOUSEKEEPING_INTERVAL:
+                return
+            self._last_housekeeping = now
+        lost = requeue_lost_jobs()
+        if lost:
+            logger.warning('Requeued %d lost job(s)', lost)
+        purge_finished_jobs()
+
+
+def start_workers(app, threads):
+    """Start an in-process worker pool (used when JOB_WORKER_THREADS is set)."""
+    return WorkerPool(app, threads).start()
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+EDSPL Tracker - Management Commands
+Maintenance tasks that are too large or slow for a web request.
+
+Usage:
+    python manage.py import tickets.csv --user admin
+    python manage.py export tickets.jsonl
+    python manage.py clean-uploads --hours 24
+    python manage.py migrate-attachments
+    python manage.py gc --dry-run
+    python manage.py worker --threads 4
+    python manage.py create-token --user admin --name reporting
+    python manage.py rebuild-rollups
+    python manage.py archive-activity --dry-run
+    python manage.py repair-counters
+    python manage.py explain-filters
+    python manage.py startup-report
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+from app import create_app
+from archive import archive_activity
+from counters import repair_ticket_counters
+from models import db, ApiToken, User, UploadSession
+from jobs import WorkerPool, claim_job, run_job
+from rollups import rebuild_rollups
+from saved_filters import explain_filters, recount_saved_filters
+from storage import collect_garbage, migrate_legacy_attachments
+from transfer import FORMATS, detect_format, read_rows, import_tickets, iter_export
+from uploads import discard_upload
+
+# Commands work on the database and jobs only; the web views are not loaded
+app = create_app(blueprints=False)
+
+
+def cmd_import(args):
+    fmt = args.format or detect_format(args.file)
+    user = User.query.filter_by(username=args.user).first()
+    if not user:
+        sys.exit(f"Unknown user: {args.user}")
+
+    started = time.perf_counter()
+    with open(args.file, newline='', encoding='utf-8-sig', errors='surrogateescape') as stream:
+        batch_size = args.batch_size or app.config['IMPORT_BATCH_SIZE']
+        result = import_tickets(read_rows(stream, fmt), user.id, batch_size=batch_size)
+    elapsed = time.perf_counter() - started
+
+    for line_num, message in result.errors[:50]:
+        print(f"line {line_num}: {message}", file=sys.stderr)
+    if result.failed > 50:
+        print(f"... and {result.failed - 50} more errors", file=sys.stderr)
+    if result.stopped_at:
+        print(f"Stopped reading at line {result.stopped_at}; rows after it were not imported.", file=sys.stderr)
+    print(f"Imported {result.imported} ticket(s), skipped {result.failed} in {elapsed:.1f}s.")
+
+
+def cmd_export(args):
+    fmt = args.format or detect_format(args.file)
+    stream = sys.stdout if args.file == '-' else open(args.file, 'w', newline='', encoding='utf-8')
+    try:
+        for chunk in iter_export(fmt):
+            stream.write(chunk)
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+
+
+def cmd_clean_uploads(args):
+    cutoff = datetime.utcnow() - timedelta(hours=args.hours)
+    stale = UploadSession.query.filter(UploadSession.updated_at < cutoff).all()
+    for session in stale:
+        discard_upload(session.id)
+        db.session.delete(session)
+    db.session.commit()
+    print(f"Removed {len(stale)} abandoned upload(s).")
+
+
+def cmd_migrate_attachments(args):
+    moved, missing = migrate_legacy_attachments()
+    print(f"Moved {moved} attachment(s) into the blob store; {missing} file(s) were missing.")
+
+
+def cmd_gc(args):
+    result = collect_garbage(grace=timedelta(hours=args.grace_hours), dry_run=args.dry_run)
+    verb = 'Would remove' if args.dry_run else 'Removed'
+    print(f"Reconciled {result.recounted} reference count(s). {verb} {result.blobs_removed} unreferenced "
+          f"blob(s) and {result.files_removed} orphaned file(s), {result.bytes_freed / 1048576:.1f} MB.")
+
+
+def cmd_worker(args):
+    if args.drain:
+        # Run everything that is due, then exit (e.g. from a scheduled task)
+        worker_id = f'drain:{os.getpid()}'
+        done = failed = 0
+        while (job := claim_job(worker_id)) is not None:
+            if run_job(job, worker_id):
+                done += 1
+            else:
+                failed += 1
+        print(f"Ran {done + failed} job(s), {failed} failed.")
+        return
+
+    pool = WorkerPool(app, threads=args.threads).start()
+
+    def shutdown(signum, frame):
+        print("Stopping after the current jobs...")
+        pool.stop()
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    print(f"Job worker running with {args.threads} thread(s).")
+    pool.wait()
+
+
+def cmd_create_token(args):
+    user = User.query.filter_by(username=args.user).first()
+    if not user:
+        sys.exit(f"Unknown user: {args.user}")
+    api_token, token = ApiToken.issue(user, args.name)
+    db.session.commit()
+    print(f"API token {api_token.id} for {user.username} ({args.name}). It is shown only once:")
+    print(token)
+
+
+def cmd_revoke_token(args):
+    api_token = db.session.get(ApiToken, args.id)
+    if api_token is None:
+        sys.exit(f"Unknown token id: {args.id}")
+    api_token.revoked_at = datetime.utcnow()
+    db.session.commit()
+    print(f"Revoked API token {api_token.id} ({api_token.name}).")
+
+
+def cmd_rebuild_rollups(args):
+    started = time.perf_counter()
+    counted = rebuild_rollups(batch_size=args.batch_size)
+    print(f"Rebuilt reporting rollups from {counted} ticket(s) in {time.perf_counter() - started:.1f}s.")
+
+
+def cmd_repair_counters(args):
+    started = time.perf_counter()
+    checked, repaired = repair_ticket_counters(batch_size=args.batch_size)
+    recounted = recount_saved_filters()
+    print(f"Checked {checked} ticket(s), repaired counters on {repaired} and recounted {recounted} "
+          f"saved filter(s) in {time.perf_counter() - started:.1f}s.")
+
+
+def cmd_explain_filters(args):
+    user = User.query.filter_by(username=args.user).first()
+    if user is None:
+        sys.exit(f"No user named {args.user!r}.")
+    scans = 0
+    for filters, what, plan, uses_index in explain_filters(user.id):
+        described = ', '.join(f'{name}={value}' for name, value in filters.items()) or 'no filters'
+        if not uses_index:
+            scans += 1
+        if args.verbose or not uses_index:
+            print(f"{'ok  ' if uses_index else 'SCAN'} {described} [{what}]")
+            for line in plan:
+                print(f'       {line}')
+    if scans:
+        sys.exit(f"{scans} ticket list queries read the whole tickets table.")
+    print("Every ticket list filter combination is served by an index.")
+
+
+def cmd_archive_activity(args):
+    days = args.days if args.days is not None else app.config['ACTIVITY_RETENTION_DAYS']
+    result = archive_activity(older_than_days=days,
+                              batch_size=args.batch_size or app.config['ARCHIVE_BATCH_SIZE'],
+                              dry_run=args.dry_run)
+    verb = 'Would archive' if args.dry_run else 'Archived'
+    months = ', '.join(f'{month} ({count})' for month, count in result.months.items()) or 'nothing to do'
+    print(f"{verb} {result.moved} activity row(s) older than {days} days: {months}.")
+
+
+def cmd_startup_report(args):
+    # A fresh interpreter, so nothing is already imported; -X importtime
+    # writes one line per module to stderr
+    code = ('import json, time; started = time.perf_counter(); from app import create_app, warm_up; '
+            'imports = time.perf_counter() - started; app = create_app(); warm_up(app); '
+            'print(json.dumps({"imports": imports, **app.extensions["startup"]}))')
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode:
+        sys.exit(result.stderr[-2000:])
+    phases = json.loads(result.stdout.strip().splitlines()[-1])
+
+    # Self time summed per top-level package, wherever in the import tree it was loaded
+    packages = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        own, _, name = line[len('import time:'):].split('|')
+        package = name.strip().split('.')[0]
+        packages[package] = packages.get(package, 0) + int(own)
+    slowest = sorted(packages.items(), key=lambda item: item[1], reverse=True)
+
+    print(f"Import time by package (of {len(packages)}):")
+    for package, us in slowest[:args.top]:
+        print(f"  {us / 1e6:8.3f}s  {package}")
+    print("Startup phases (importtime adds some overhead to imports):")
+    for phase, seconds in phases.items():
+        print(f"  {seconds:8.3f}s  {phase}")
+    total = sum(phases.values())
+    budget = app.config['STARTUP_BUDGET_SECONDS']
+    print(f"  {total:8.3f}s  total, budget {budget:.3f}s")
+    if budget and total > budget:
+        sys.exit(f"Startup is {total - budget:.3f}s over budget.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='EDSPL Tracker management commands')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    p = commands.add_parser('import', help='Import tickets from CSV or JSON Lines')
+    p.add_argument('file')
+    p.add_argument('--user', default='admin', help='Username recorded as creator and actor')
+    p.add_argument('--format', choices=FORMATS, help='Defaults to the file extension')
+    p.add_argument('--batch-size', type=int, help='Defaults to IMPORT_BATCH_SIZE')
+    p.set_defaults(func=cmd_import)
+
+    p = commands.add_parser('export', help='Export all tickets to CSV or JSON Lines')
+    p.add_argument('file', help="Output file, or '-' for stdout")
+    p.add_argument('--format', choices=FORMATS, help='Defaults to the file extension')
+    p.set_defaults(func=cmd_export)
+
+    p = commands.add_parser('clean-uploads', help='Delete chunked uploads that were never finished')
+    p.add_argument('--hours', type=float, default=24, help='Idle time before an upload counts as abandoned')
+    p.set_defaults(func=cmd_clean_uploads)
+
+    p = commands.add_parser('migrate-attachments', help='Move flat-file attachments into the blob store')
+    p.set_defaults(func=cmd_migrate_attachments)
+
+    p = commands.add_parser('gc', help='Delete attachment blobs no attachment refers to')
+    p.add_argument('--grace-hours', type=float, default=1, help='Leave anything younger than this alone')
+    p.add_argument('--dry-run', action='store_true', help='Report what would be removed')
+    p.set_defaults(func=cmd_gc)
+
+    p = commands.add_parser('worker', help='Run background jobs')
+    p.add_argument('--threads', type=int, default=4)
+    p.add_argument('--drain', action='store_true', help='Run the jobs that are due, then exit')
+    p.set_defaults(func=cmd_worker)
+
+    p = commands.add_parser('create-token', help='Issue a JSON API token')
+    p.add_argument('--user', default='admin', help='Username the token acts as')
+    p.add_argument('--name', required=True, help='What the token is for, e.g. the integration name')
+    p.set_defaults(func=cmd_create_token)
+
+    p = commands.add_parser('revoke-token', help='Revoke a JSON API token')
+    p.add_argument('id', type=int)
+    p.set_defaults(func=cmd_revoke_token)
+
+    p = commands.add_parser('rebuild-rollups', help='Recompute the reporting rollups from the tickets')
+    p.add_argument('--batch-size', type=int, default=5000)
+    p.set_defaults(func=cmd_rebuild_rollups)
+
+    p = commands.add_parser('repair-counters',
+                            help='Recompute ticket comment / attachment counts and last activity')
+    p.add_argument('--batch-size', type=int, default=5000)
+    p.set_defaults(func=cmd_repair_counters)
+
+    p = commands.add_parser('explain-filters',
+                            help='Check that every ticket list filter combination uses an index')
+    p.add_argument('--user', default='admin', help="User whose id stands in for 'assigned to me'")
+    p.add_argument('--verbose', action='store_true', help='Print every plan, not just full scans')
+    p.set_defaults(func=cmd_explain_filters)
+
+    p = commands.add_parser('startup-report', help='Time importing, building and warming up the app')
+    p.add_argument('--top', type=int, default=15, help='How many of the slowest packages to list')
+    p.set_defaults(func=cmd_startup_report)
+
+    p = commands.add_parser('archive-activity', help='Move old activity into monthly archive tables')
+    p.add_argument('--days', type=int, help='Defaults to ACTIVITY_RETENTION_DAYS')
+    p.add_argument('--batch-size', type=int, help='Defaults to ARCHIVE_BATCH_SIZE')
+    p.add_argument('--dry-run', action='store_true', help='Report what would be moved')
+    p.set_defaults(func=cmd_archive_activity)
+
+    args = parser.parse_args()
+    with app.app_context():
+        args.func(args)
+
+
+if __name__ == '__main__':
+    main()
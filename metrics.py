@@ -0,0 +1,229 @@
+"""
+EDSPL Tracker - Request and Query Instrumentation
+Counts SQL statements, SQL time and template render time per request,
+aggregates them per endpoint and renders them in Prometheus text format.
+"""
+
+import hashlib
+import threading
+import time
+
+from flask import current_app, g, has_request_context, request, before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestStats:
+    """What one request spent its time on."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.sql_time = 0.0
+        self.render_time = 0.0
+        self.slowest = []  # (seconds, statement), longest first, at most 5
+        self._render_started = []
+
+    def add_query(self, statement, seconds):
+        self.query_count += 1
+        self.sql_time += seconds
+        if len(self.slowest) < 5 or seconds > self.slowest[-1][0]:
+            self.slowest.append((seconds, statement))
+            self.slowest.sort(key=lambda item: item[0], reverse=True)
+            del self.slowest[5:]
+
+    @property
+    def duration(self):
+        return time.perf_counter() - self.started
+
+
+class EndpointStats:
+    def __init__(self):
+        self.requests = {}  # (method, status) -> count
+        self.buckets = [0] * len(DURATION_BUCKETS)
+        self.duration_sum = 0.0
+        self.count = 0
+        self.queries = 0
+        self.sql_time = 0.0
+        self.render_time = 0.0
+
+
+class Metrics:
+    """Process-wide request/query metrics, installed with init_app(app)."""
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._statements = {}  # statement -> [count, total seconds, max seconds]
+        self._collectors = {}  # name -> callable; re-registering a name replaces it
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SLOW_REQUEST_MS', 500)
+        app.config.setdefault('METRICS_SLOW_STATEMENTS', 10)
+        app.config.setdefault('METRICS_RESPONSE_HEADERS', False)
+        self.app = app
+
+        # Engine-wide hooks are process-global: install them once, however many apps are built
+        for name, listener in (('before_cursor_execute', self._before_cursor_execute),
+                               ('after_cursor_execute', self._after_cursor_execute),
+                               ('handle_error', self._handle_error)):
+            if not event.contains(Engine, name, listener):
+                event.listen(Engine, name, listener)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.extensions['metrics'] = self
+
+    def register_collector(self, name, collect):
+        """
+        Add a callable returning extra Prometheus text lines for /metrics.
+        Registering the same name again (a new app in the same process)
+        replaces the earlier collector instead of repeating its metrics.
+        """
+        self._collectors[name] = collect
+
+    # -------------------- Hooks --------------------
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info['query_started'].pop()
+        if not has_request_context() or 'request_stats' not in g:
+            return
+        g.request_stats.add_query(statement, seconds)
+
+        with self._lock:
+            entry = self._statements.get(statement)
+            if entry is None:
+                if len(self._statements) >= 500:
+                    # Forget the quickest statement to keep the table bounded
+                    del self._statements[min(self._statements, key=lambda s: self._statements[s][2])]
+                entry = self._statements[statement] = [0, 0.0, 0.0]
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+
+    def _handle_error(self, context):
+        started = context.connection.info.get('query_started') if context.connection else None
+        if started:
+            started.pop()
+
+    def _before_render(self, sender, template, context, **extra):
+        if 'request_stats' in g:
+            g.request_stats._render_started.append(time.perf_counter())
+
+    def _after_render(self, sender, template, context, **extra):
+        if 'request_stats' in g and g.request_stats._render_started:
+            g.request_stats.render_time += time.perf_counter() - g.request_stats._render_started.pop()
+
+    def _before_request(self):
+        g.request_stats = RequestStats()
+
+    def _after_request(self, response):
+        stats = g.pop('request_stats', None)
+        if stats is None:
+            return response
+
+        duration = stats.duration
+        endpoint = request.endpoint or 'unknown'
+        with self._lock:
+            entry = self._endpoints.setdefault(endpoint, EndpointStats())
+            key = (request.method, response.status_code)
+            entry.requests[key] = entry.requests.get(key, 0) + 1
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    entry.buckets[i] += 1
+            entry.count += 1
+            entry.duration_sum += duration
+            entry.queries += stats.query_count
+            entry.sql_time += stats.sql_time
+            entry.render_time += stats.render_time
+
+        if current_app.config['METRICS_RESPONSE_HEADERS']:
+            response.headers['X-Request-Time'] = f'{duration * 1000:.2f}'
+            response.headers['X-Query-Count'] = str(stats.query_count)
+            response.headers['X-SQL-Time'] = f'{stats.sql_time * 1000:.2f}'
+            response.headers['X-Render-Time'] = f'{stats.render_time * 1000:.2f}'
+
+        threshold = current_app.config['SLOW_REQUEST_MS']
+        if threshold and duration * 1000 >= threshold:
+            slowest = '; '.join(f'{seconds * 1000:.1f}ms {" ".join(sql.split())[:200]}'
+                                for seconds, sql in stats.slowest[:3])
+            current_app.logger.warning(
+                'Slow request %s %s: %.1fms, %d queries (%.1fms SQL), %.1fms render. Slowest: %s',
+                request.method, request.full_path, duration * 1000, stats.query_count,
+                stats.sql_time * 1000, stats.render_time * 1000, slowest or '-'
+            )
+        return response
+
+    # -------------------- Exposition --------------------
+
+    def render_prometheus(self):
+        """All metrics in Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+            statements = sorted(self._statements.items(), key=lambda item: item[1][2], reverse=True)
+            statements = statements[:current_app.config['METRICS_SLOW_STATEMENTS']]
+
+            lines += ['# HELP edspl_http_requests_total HTTP requests by endpoint, method and status.',
+                      '# TYPE edspl_http_requests_total counter']
+            for endpoint, entry in endpoints:
+                for (method, status), count in sorted(entry.requests.items()):
+                    lines.append(f'edspl_http_requests_total{{endpoint="{endpoint}",method="{method}",'
+                                 f'status="{status}"}} {count}')
+
+            lines += ['# HELP edspl_http_request_duration_seconds Request handling time.',
+                      '# TYPE edspl_http_request_duration_seconds histogram']
+            for endpoint, entry in endpoints:
+                for bound, count in zip(DURATION_BUCKETS, entry.buckets):
+                    lines.append(f'edspl_http_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {count}')
+                lines.append(f'edspl_http_request_duration_seconds_bucket{{endpoint="{endpoint}",le="+Inf"}} {entry.count}')
+                lines.append(f'edspl_http_request_duration_seconds_sum{{endpoint="{endpoint}"}} {entry.duration_sum:.6f}')
+                lines.append(f'edspl_http_request_duration_seconds_count{{endpoint="{endpoint}"}} {entry.count}')
+
+            for name, attr, help_text in (
+                ('edspl_sql_queries_total', 'queries', 'SQL statements executed while handling requests.'),
+                ('edspl_sql_duration_seconds_total', 'sql_time', 'Time spent executing SQL.'),
+                ('edspl_template_render_seconds_total', 'render_time', 'Time spent rendering templates.'),
+            ):
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+                for endpoint, entry in endpoints:
+                    value = getattr(entry, attr)
+                    lines.append(f'{name}{{endpoint="{endpoint}"}} {value:.6f}' if isinstance(value, float)
+                                 else f'{name}{{endpoint="{endpoint}"}} {value}')
+
+            lines += ['# HELP edspl_sql_statement_max_seconds Slowest observed execution per statement.',
+                      '# TYPE edspl_sql_statement_max_seconds gauge']
+            # Statements sharing their first 300 characters stay apart by the id of the full text
+            labels = []
+            for statement, entry in statements:
+                text = _escape_label(' '.join(statement.split())[:300])
+                labels.append((f'id="{_statement_id(statement)}",statement="{text}"', entry))
+            for label, (count, total, longest) in labels:
+                lines.append(f'edspl_sql_statement_max_seconds{{{label}}} {longest:.6f}')
+            lines += ['# HELP edspl_sql_statement_calls_total Executions of the slowest statements.',
+                      '# TYPE edspl_sql_statement_calls_total counter']
+            for label, (count, total, longest) in labels:
+                lines.append(f'edspl_sql_statement_calls_total{{{label}}} {count}')
+
+        for collect in list(self._collectors.values()):
+            lines += collect()
+        return '\n'.join(lines) + '\n'
+
+
+def _statement_id(statement):
+    return hashlib.sha1(statement.encode()).hexdigest()[:12]
+
+
+def _escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+
+metrics = Metrics()
@@ -1,10 +1,18 @@
+import hashlib
+import secrets
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.exc import IntegrityError
+
+from passwords import hash_password, needs_rehash, verify_password
 
 db = SQLAlchemy()
 
+TICKET_STATUSES = ('open', 'in_progress', 'resolved', 'closed')
+TICKET_PRIORITIES = ('low', 'medium', 'high', 'critical')
+TICKET_CATEGORIES = ('network', 'security', 'infrastructure', 'other')
+
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
 
@@ -22,15 +30,69 @@ class User(UserMixin, db.Model):
     comments = db.relationship('Comment', backref='author', lazy='dynamic')
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return needs_rehash(self.password_hash)
 
     def __repr__(self):
         return f'<User {self.username}>'
 
 
+class ApiToken(db.Model):
+    """A bearer token for the JSON API. Only a SHA-256 of the token is stored."""
+    __tablename__ = 'api_tokens'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    name = db.Column(db.String(100), nullable=False)
+    token_hash = db.Column(db.String(64), unique=True, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, nullable=True)
+    revoked_at = db.Column(db.DateTime, nullable=True)
+
+    user = db.relationship('User', backref='api_tokens')
+
+    @staticmethod
+    def hash_token(token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    @staticmethod
+    def issue(user, name):
+        """Create a token for `user`. Returns (ApiToken, plain token); the plain token is shown once."""
+        token = 'edspl_' + secrets.token_urlsafe(32)
+        api_token = ApiToken(user_id=user.id, name=name, token_hash=ApiToken.hash_token(token))
+        db.session.add(api_token)
+        return api_token, token
+
+    def __repr__(self):
+        return f'<ApiToken {self.name} user={self.user_id}>'
+
+
+class CacheVersion(db.Model):
+    """Version numbers that tell every process when its cached copy of some data is stale."""
+    __tablename__ = 'cache_versions'
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<CacheVersion {self.name}={self.version}>'
+
+
+def bump_cache_version(connection, name):
+    """Mark cached copies of `name` stale; runs in the caller's transaction."""
+    versions = CacheVersion.__table__
+    bumped = connection.execute(
+        versions.update().where(versions.c.name == name).values(version=versions.c.version + 1)
+    )
+    if bumped.rowcount == 0:
+        connection.execute(versions.insert().values(name=name, version=1))
+
+
 class Ticket(db.Model):
     __tablename__ = 'tickets'
 
@@ -45,10 +107,35 @@ class Ticket(db.Model):
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     assigned_to = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
 
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     resolved_at = db.Column(db.DateTime, nullable=True)
 
+    # Maintained on write (see record_activity) so lists never count child rows;
+    # `manage.py repair-counters` recomputes them from the child tables
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    attachment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Databases that predate the column get it nullable; ensure_schema backfills it
+    last_activity_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Keyset pagination walks the list newest-first on (created_at, id)
+        db.Index('ix_tickets_created_at_id', 'created_at', 'id'),
+        # API change polling walks (updated_at, id) and takes max(updated_at) for ETags
+        db.Index('ix_tickets_updated_at_id', 'updated_at', 'id'),
+        # List sorting by recent activity / most comments, and the dashboard's
+        # count of active tickets gone quiet
+        db.Index('ix_tickets_last_activity_id', 'last_activity_at', 'id'),
+        db.Index('ix_tickets_comment_count_id', 'comment_count', 'id'),
+        db.Index('ix_tickets_status_last_activity', 'status', 'last_activity_at'),
+        # Ticket list / saved filter combinations, each ending in the default
+        # (created_at, id) order; `manage.py explain-filters` checks the plans
+        db.Index('ix_tickets_assignee_status_created', 'assigned_to', 'status', 'created_at', 'id'),
+        db.Index('ix_tickets_status_priority_created', 'status', 'priority', 'created_at', 'id'),
+        db.Index('ix_tickets_category_status_created', 'category', 'status', 'created_at', 'id'),
+        db.Index('ix_tickets_priority_created', 'priority', 'created_at', 'id'),
+    )
+
     # Relationships
     comments = db.relationship('Comment', backref='ticket', lazy='dynamic', order_by='Comment.created_at')
     attachments = db.relationship('Attachment', backref='ticket', lazy='dynamic')
@@ -57,22 +144,84 @@ class Ticket(db.Model):
     @staticmethod
     def generate_ticket_number():
         year = datetime.utcnow().year
-        last_ticket = Ticket.query.filter(
-            Ticket.ticket_number.like(f'EDSPL-{year}-%')
-        ).order_by(Ticket.id.desc()).first()
-
-        if last_ticket:
-            last_num = int(last_ticket.ticket_number.split('-')[-1])
-            new_num = last_num + 1
-        else:
-            new_num = 1
+        return format_ticket_number(year, TicketSequence.reserve(year))
 
-        return f'EDSPL-{year}-{new_num:04d}'
+    @staticmethod
+    def reserve_ticket_numbers(count, year=None):
+        """Allocate a block of `count` consecutive ticket numbers, e.g. for imports."""
+        year = year or datetime.utcnow().year
+        first = TicketSequence.reserve(year, count)
+        return [format_ticket_number(year, n) for n in range(first, first + count)]
+
+    def record_activity(self, comments=0, attachments=0, when=None):
+        """
+        Count new comments / attachments and move last_activity_at and
+        updated_at forward. The counters are assigned as SQL expressions, so
+        the flush increments them in the database (in the caller's
+        transaction) and concurrent writers never lose a count.
+        """
+        when = when or datetime.utcnow()
+        if comments:
+            self.comment_count = Ticket.comment_count + comments
+        if attachments:
+            self.attachment_count = Ticket.attachment_count + attachments
+        self.last_activity_at = when
+        self.updated_at = when
 
     def __repr__(self):
         return f'<Ticket {self.ticket_number}>'
 
 
+def format_ticket_number(year, number):
+    return f'EDSPL-{year}-{number:04d}'
+
+
+class TicketSequence(db.Model):
+    """Last ticket number issued per year, so allocation never scans tickets."""
+    __tablename__ = 'ticket_sequences'
+
+    year = db.Column(db.Integer, primary_key=True)
+    last_value = db.Column(db.Integer, nullable=False, default=0)
+
+    @staticmethod
+    def reserve(year, count=1):
+        """
+        Atomically claim `count` consecutive numbers for `year` and return the first.
+
+        The increment is a single UPDATE ... RETURNING, so concurrent requests
+        serialize on the row lock instead of reading the same last number.
+        """
+        increment = db.update(TicketSequence).where(TicketSequence.year == year).values(
+            last_value=TicketSequence.last_value + count
+        ).returning(TicketSequence.last_value)
+
+        last_value = db.session.execute(increment).scalar()
+        if last_value is None:
+            # First ticket of the year (or a database that predates this table)
+            start = TicketSequence._highest_issued(year)
+            try:
+                with db.session.begin_nested():
+                    db.session.add(TicketSequence(year=year, last_value=start + count))
+                last_value = start + count
+            except IntegrityError:
+                # Another request created the row first; take the next block from it
+                last_value = db.session.execute(increment).scalar()
+
+        return last_value - count + 1
+
+    @staticmethod
+    def _highest_issued(year):
+        prefix = format_ticket_number(year, 0)[:-4]
+        number = db.cast(db.func.substr(Ticket.ticket_number, len(prefix) + 1), db.Integer)
+        highest = db.session.query(db.func.max(number)).filter(
+            Ticket.ticket_number.like(f'{prefix}%')
+        ).scalar()
+        return highest or 0
+
+    def __repr__(self):
+        return f'<TicketSequence {self.year}: {self.last_value}>'
+
+
 class Comment(db.Model):
     __tablename__ = 'comments'
 
@@ -82,6 +231,10 @@ class Comment(db.Model):
     content = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_comments_ticket_created', 'ticket_id', 'created_at', 'id'),
+    )
+
     def __repr__(self):
         return f'<Comment {self.id} on Ticket {self.ticket_id}>'
 
@@ -90,9 +243,12 @@ class Attachment(db.Model):
     __tablename__ = 'attachments'
 
     id = db.Column(db.Integer, primary_key=True)
-    ticket_id = db.Column(db.Integer, db.ForeignKey('tickets.id'), nullable=False)
-    filename = db.Column(db.String(256), nullable=False)  # Stored filename (UUID)
+    ticket_id = db.Column(db.Integer, db.ForeignKey('tickets.id'), nullable=False, index=True)
+    filename = db.Column(db.String(256), nullable=False, index=True)  # Download name (UUID)
     original_filename = db.Column(db.String(256), nullable=False)  # Original name
+    sha256 = db.Column(db.String(64), nullable=True, index=True)  # Content hash, also the download ETag
+    size = db.Column(db.BigInteger, nullable=True)  # Set once the contents are in the blob store
+    mime_type = db.Column(db.String(100), nullable=True)
     uploaded_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -102,6 +258,87 @@ class Attachment(db.Model):
         return f'<Attachment {self.original_filename}>'
 
 
+class Blob(db.Model):
+    """Attachment contents stored once per SHA-256, shared by every attachment with that hash."""
+    __tablename__ = 'blobs'
+
+    sha256 = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.BigInteger, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Blob {self.sha256[:12]} refs={self.ref_count}>'
+
+
+class UploadSession(db.Model):
+    """A resumable chunked upload in progress; bytes so far live in a partial file."""
+    __tablename__ = 'upload_sessions'
+
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex, also the partial file name
+    ticket_id = db.Column(db.Integer, db.ForeignKey('tickets.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    original_filename = db.Column(db.String(256), nullable=False)
+    total_size = db.Column(db.BigInteger, nullable=False)
+    received = db.Column(db.BigInteger, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<UploadSession {self.id} {self.received}/{self.total_size}>'
+
+
+class Job(db.Model):
+    """A unit of background work; see jobs.py."""
+    __tablename__ = 'jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    task = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')  # JSON keyword arguments
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed
+    idempotency_key = db.Column(db.String(200), unique=True, nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # not before
+    locked_by = db.Column(db.String(100), nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    # Workers claim the oldest due job in a given status
+    __table_args__ = (
+        db.Index('ix_jobs_status_run_at', 'status', 'run_at', 'id'),
+    )
+
+    def __repr__(self):
+        return f'<Job {self.id} {self.task} {self.status}>'
+
+
+class SavedFilter(db.Model):
+    """A user's named ticket list filter and its kept count of matching tickets; see saved_filters.py."""
+    __tablename__ = 'saved_filters'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    name = db.Column(db.String(100), nullable=False)
+    filters = db.Column(db.Text, nullable=False, default='{}')  # JSON: list filter name -> value
+    sort = db.Column(db.String(20), nullable=False, default='')
+    incremental = db.Column(db.Boolean, nullable=False, default=True)  # count kept up to date on ticket writes
+    ticket_count = db.Column(db.Integer, nullable=False, default=0)
+    counted_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'name', name='uq_saved_filters_user_name'),
+        # Processes reload the incremental filters when their cache version moves
+        db.Index('ix_saved_filters_incremental', 'incremental'),
+    )
+
+    def __repr__(self):
+        return f'<SavedFilter {self.name!r} of user {self.user_id}>'
+
+
 class ActivityLog(db.Model):
     __tablename__ = 'activity_log'
 
@@ -111,7 +348,16 @@ class ActivityLog(db.Model):
     action = db.Column(db.String(50), nullable=False)  # created, updated, commented, attached, status_changed, assigned
     old_value = db.Column(db.String(256), nullable=True)
     new_value = db.Column(db.String(256), nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Audit paging walks (created_at, id); per-ticket history and the
+        # audit ticket-number filter go through (ticket_id, created_at)
+        db.Index('ix_activity_log_created_at_id', 'created_at', 'id'),
+        db.Index('ix_activity_log_ticket_created', 'ticket_id', 'created_at', 'id'),
+        # Archived rows keep their ids; never hand them out again (see archive.py)
+        {'sqlite_autoincrement': True},
+    )
 
     user = db.relationship('User', backref='activities')
 
@@ -119,14 +365,113 @@ class ActivityLog(db.Model):
         return f'<Activity {self.action} on Ticket {self.ticket_id}>'
 
 
-def log_activity(ticket_id, user_id, action, old_value=None, new_value=None):
-    """Helper function to log ticket activity."""
+class ActivityArchive(db.Model):
+    """One month of activity moved out of activity_log into its own table; see archive.py."""
+    __tablename__ = 'activity_archives'
+
+    month = db.Column(db.String(7), primary_key=True)  # YYYY-MM
+    table_name = db.Column(db.String(64), nullable=False, unique=True)
+    row_count = db.Column(db.Integer, nullable=False, default=0)
+    min_created_at = db.Column(db.DateTime, nullable=True)
+    max_created_at = db.Column(db.DateTime, nullable=True)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ActivityArchive {self.month} rows={self.row_count}>'
+
+
+def log_activity(ticket_id, user_id, action, old_value=None, new_value=None, when=None):
+    """
+    Helper function to log ticket activity. Callers keep the ticket's
+    last_activity_at current, e.g. with Ticket.record_activity().
+    """
     activity = ActivityLog(
         ticket_id=ticket_id,
         user_id=user_id,
         action=action,
         old_value=old_value,
-        new_value=new_value
+        new_value=new_value,
+        created_at=when or datetime.utcnow()
     )
     db.session.add(activity)
     return activity
+
+
+class DailyRollup(db.Model):
+    """
+    Per-day ticket movement for one (category, priority, assignee) group; see rollups.py.
+    The backlog on a day is the running total of what came in minus what went out.
+    """
+    __tablename__ = 'daily_rollups'
+
+    day = db.Column(db.Date, primary_key=True)
+    category = db.Column(db.String(50), primary_key=True)
+    priority = db.Column(db.String(20), primary_key=True)
+    assignee_id = db.Column(db.Integer, primary_key=True)  # 0 = unassigned
+    opened = db.Column(db.Integer, nullable=False, default=0)
+    resolved = db.Column(db.Integer, nullable=False, default=0)  # left open / in progress
+    reopened = db.Column(db.Integer, nullable=False, default=0)
+    moved_in = db.Column(db.Integer, nullable=False, default=0)  # open tickets moved into / out of
+    moved_out = db.Column(db.Integer, nullable=False, default=0)  # the group by a priority or assignee change
+    resolve_seconds = db.Column(db.BigInteger, nullable=False, default=0)  # summed time to resolve
+
+    def __repr__(self):
+        return f'<DailyRollup {self.day} {self.category}/{self.priority}/{self.assignee_id}>'
+
+
+class ResolutionBucket(db.Model):
+    """Histogram of time to resolve per day and group, for approximate medians and percentiles."""
+    __tablename__ = 'daily_resolution_buckets'
+
+    day = db.Column(db.Date, primary_key=True)
+    category = db.Column(db.String(50), primary_key=True)
+    priority = db.Column(db.String(20), primary_key=True)
+    assignee_id = db.Column(db.Integer, primary_key=True)
+    bucket = db.Column(db.Integer, primary_key=True)  # see rollups.bucket_for()
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+def ensure_schema():
+    """
+    Bring the database up to the current models: create missing tables, add
+    columns and indexes introduced since a table was created, and set up
+    the search index. Safe to run repeatedly, on SQLite and PostgreSQL.
+    """
+    from search import create_search_index
+
+    db.create_all()
+    _add_missing_columns()
+    _backfill_columns()
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+    create_search_index()
+
+
+def _add_missing_columns():
+    inspector = db.inspect(db.engine)
+    preparer = db.engine.dialect.identifier_preparer
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = f'ALTER TABLE {preparer.format_table(table)} ADD COLUMN ' \
+                      f'{preparer.format_column(column)} {column.type.compile(db.engine.dialect)}'
+                # New columns must be nullable or carry a server_default
+                if column.server_default is not None:
+                    default = column.server_default.arg
+                    ddl += f" DEFAULT {default.text if hasattr(default, 'text') else repr(str(default))}"
+                conn.exec_driver_sql(ddl)
+
+
+def _backfill_columns():
+    # Columns added by _add_missing_columns without a constant default start
+    # out NULL; sorting, cursors and the quiet filter all assume they are set
+    tickets = Ticket.__table__
+    with db.engine.begin() as conn:
+        conn.execute(tickets.update().where(tickets.c.last_activity_at.is_(None)).values(
+            last_activity_at=db.func.coalesce(tickets.c.updated_at, tickets.c.created_at,
+                                              db.func.current_timestamp()),
+            updated_at=tickets.c.updated_at))  # a backfill is not a change to the ticket
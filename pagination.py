@@ -0,0 +1,102 @@
+"""
+EDSPL Tracker - Keyset Pagination Helpers
+Cursor-based paging over a (sort value, id) pair so page cost stays flat
+no matter how deep into a result set the user goes.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+
+
+def encode_cursor(sort_value, row_id):
+    """Encode a (sort value, id) pair as an opaque URL-safe token."""
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort_value, row_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token, parse=None):
+    """Decode a cursor token. Returns (sort value, id) or None if invalid."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        sort_value, row_id = json.loads(raw)
+        if parse is not None and sort_value is not None:
+            sort_value = parse(sort_value)
+        return sort_value, int(row_id)
+    except (ValueError, TypeError, binascii.Error):
+        return None
+
+
+def parse_datetime(value):
+    return datetime.fromisoformat(value)
+
+
+class KeysetPage:
+    """One page of results plus the cursors needed to move either way."""
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None, per_page=None):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def _after(sort_column, id_column, cursor, descending):
+    sort_value, row_id = cursor
+    if descending:
+        return (sort_column < sort_value) | ((sort_column == sort_value) & (id_column < row_id))
+    return (sort_column > sort_value) | ((sort_column == sort_value) & (id_column > row_id))
+
+
+def paginate_keyset(query, sort_column, id_column, key, after=None, before=None,
+                    per_page=50, descending=True):
+    """
+    Fetch one page of `query` ordered by (sort_column, id_column).
+
+    `after` / `before` are decoded cursors; `key` maps a result item to its
+    (sort value, id) pair so the next cursors can be built. Only per_page + 1
+    rows are read, so no page ever scans past what it shows.
+    """
+    backwards = before is not None and after is None
+    if backwards:
+        query = query.filter(_after(sort_column, id_column, before, not descending))
+    elif after is not None:
+        query = query.filter(_after(sort_column, id_column, after, descending))
+
+    if descending != backwards:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_column.asc(), id_column.asc())
+
+    items = query.limit(per_page + 1).all()
+    has_more = len(items) > per_page
+    items = items[:per_page]
+
+    if backwards:
+        items.reverse()
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, after is not None
+
+    next_cursor = encode_cursor(*key(items[-1])) if items and has_next else None
+    prev_cursor = encode_cursor(*key(items[0])) if items and has_prev else None
+    return KeysetPage(items, next_cursor, prev_cursor, per_page)
@@ -0,0 +1,65 @@
+"""
+EDSPL Tracker - Password Hashing
+Hashes passwords with the configured Werkzeug method and limits how many
+hashes a process computes at once, so a burst of logins queues for a slot
+instead of pinning every CPU the other requests need. Hashes made with
+older parameters are recognised so login can upgrade them.
+"""
+
+import threading
+
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+_slots = None
+_slots_lock = threading.Lock()
+_method_prefixes = {}
+
+
+class HashingBusy(Exception):
+    """No hashing slot became free within PASSWORD_HASH_WAIT seconds."""
+
+
+def _config(name, default):
+    return current_app.config.get(name, default) if current_app else default
+
+
+def hash_method():
+    return _config('PASSWORD_HASH_METHOD', 'scrypt')
+
+
+def _hash_slots():
+    global _slots
+    if _slots is None:
+        with _slots_lock:
+            if _slots is None:
+                _slots = threading.BoundedSemaphore(_config('PASSWORD_HASH_CONCURRENCY', 2))
+    return _slots
+
+
+def _bounded(function, *args):
+    slots = _hash_slots()
+    if not slots.acquire(timeout=_config('PASSWORD_HASH_WAIT', 10)):
+        raise HashingBusy()
+    try:
+        return function(*args)
+    finally:
+        slots.release()
+
+
+def hash_password(password):
+    return _bounded(generate_password_hash, password, hash_method())
+
+
+def verify_password(password_hash, password):
+    return _bounded(check_password_hash, password_hash, password)
+
+
+def needs_rehash(password_hash):
+    """Whether a stored hash was made with parameters other than the configured ones."""
+    method = hash_method()
+    if method not in _method_prefixes:
+        # Werkzeug fills in defaults ('scrypt' -> 'scrypt:32768:8:1'); an
+        # empty-password hash shows the full parameter string once
+        _method_prefixes[method] = generate_password_hash('', method).split('$', 1)[0]
+    return password_hash.split('$', 1)[0] != _method_prefixes[method]
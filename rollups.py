@@ -0,0 +1,243 @@
+"""
+EDSPL Tracker - Reporting Rollups
+Keeps daily ticket aggregates per (category, priority, assignee) so the SLA
+and backlog reports read a small table instead of scanning tickets and
+activity. Code that creates or changes tickets records the change here in
+the same transaction; `python manage.py rebuild-rollups` recomputes the
+tables from the tickets for history.
+"""
+
+import math
+from collections import Counter, defaultdict, namedtuple
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+
+from directory import user_directory
+from models import db, Ticket, DailyRollup, ResolutionBucket
+from stats import ACTIVE_STATUSES
+
+KEY_FIELDS = ('day', 'category', 'priority', 'assignee_id')
+COUNTERS = ('opened', 'resolved', 'reopened', 'moved_in', 'moved_out', 'resolve_seconds')
+GROUPINGS = {'category': 'Category', 'priority': 'Priority', 'assignee_id': 'Assignee'}
+
+# Time-to-resolve buckets grow by 25% from one minute, so a percentile read
+# from the histogram is within about 12% of the exact value
+BUCKET_BASE = 60
+BUCKET_GROWTH = 1.25
+MAX_BUCKET = 80
+
+TicketState = namedtuple('TicketState', 'status category priority assignee_id')
+
+
+def ticket_state(status, category, priority, assigned_to):
+    return TicketState(status or 'open', category or 'other', priority or 'medium', assigned_to or 0)
+
+
+def state_of(ticket):
+    return ticket_state(ticket.status, ticket.category, ticket.priority, ticket.assigned_to)
+
+
+def bucket_for(seconds):
+    if seconds < BUCKET_BASE:
+        return 0
+    return min(MAX_BUCKET, 1 + int(math.log(seconds / BUCKET_BASE, BUCKET_GROWTH)))
+
+
+def bucket_value(bucket):
+    """Representative time to resolve (seconds) for a bucket: its geometric midpoint."""
+    if bucket == 0:
+        return BUCKET_BASE / 2
+    return BUCKET_BASE * BUCKET_GROWTH ** (bucket - 0.5)
+
+
+def histogram_percentile(histogram, pct):
+    total = sum(histogram.values())
+    if not total:
+        return None
+    target = pct / 100 * total
+    seen = 0
+    for bucket in sorted(histogram):
+        seen += histogram[bucket]
+        if seen >= target:
+            return bucket_value(bucket)
+
+
+# -------------------- Recording Changes --------------------
+
+class RollupChanges:
+    """Deltas collected in memory, then written with one upsert per touched row."""
+
+    def __init__(self):
+        self.counters = defaultdict(Counter)  # (day, category, priority, assignee_id) -> deltas
+        self.buckets = Counter()  # (day, category, priority, assignee_id, bucket) -> resolutions
+
+    def track(self, created_at, before, after, when):
+        """
+        Record one ticket going from TicketState `before` to `after` at `when`.
+        A new ticket has `before` None and counts as opened at `created_at`.
+        """
+        if before is None:
+            self.counters[_key(created_at, after)]['opened'] += 1
+            before = after._replace(status='open')
+
+        was_active = before.status in ACTIVE_STATUSES
+        is_active = after.status in ACTIVE_STATUSES
+        if was_active and before[1:] != after[1:]:
+            # An open ticket changing priority or assignee moves between backlogs
+            self.counters[_key(when, before)]['moved_out'] += 1
+            self.counters[_key(when, after)]['moved_in'] += 1
+        if was_active and not is_active:
+            seconds = max(0, int((when - created_at).total_seconds()))
+            counters = self.counters[_key(when, after)]
+            counters['resolved'] += 1
+            counters['resolve_seconds'] += seconds
+            self.buckets[_key(when, after) + (bucket_for(seconds),)] += 1
+        elif is_active and not was_active:
+            self.counters[_key(when, after)]['reopened'] += 1
+
+    def save(self):
+        """Add the collected deltas to the rollup tables. The caller commits."""
+        for key, counts in self.counters.items():
+            _increment(DailyRollup.__table__, dict(zip(KEY_FIELDS, key)), counts)
+        for key, count in self.buckets.items():
+            _increment(ResolutionBucket.__table__, dict(zip(KEY_FIELDS + ('bucket',), key)), {'count': count})
+        self.counters.clear()
+        self.buckets.clear()
+
+
+def _key(when, state):
+    return (when.date(), state.category, state.priority, state.assignee_id)
+
+
+def _increment(table, key, counts):
+    match = db.and_(*(table.c[name] == value for name, value in key.items()))
+    increment = table.update().where(match).values(
+        {table.c[name]: table.c[name] + count for name, count in counts.items()}
+    )
+    if db.session.execute(increment).rowcount == 0:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(table.insert().values(**key, **counts))
+        except IntegrityError:
+            # Another transaction created the row first
+            db.session.execute(increment)
+
+
+def track_ticket(ticket, before, when=None):
+    """Record a change to one ticket; `before` is its TicketState beforehand, None if new."""
+    changes = RollupChanges()
+    changes.track(ticket.created_at, before, state_of(ticket), when or datetime.utcnow())
+    changes.save()
+
+
+def rebuild_rollups(batch_size=5000):
+    """
+    Recompute the rollup tables from the tickets. Returns the number of tickets counted.
+
+    The tickets table only holds each ticket's current state, so every ticket
+    counts as opened in its current group and, if no longer active, resolved
+    at resolved_at (else its last update); reopens and earlier moves are not
+    replayed. Run it while the tracker is quiet: changes made during the
+    rebuild may be counted twice.
+    """
+    tickets = Ticket.__table__
+    rows = db.session.execute(
+        db.select(tickets.c.created_at, tickets.c.status, tickets.c.category, tickets.c.priority,
+                  tickets.c.assigned_to, tickets.c.resolved_at, tickets.c.updated_at)
+        .execution_options(yield_per=batch_size)
+    )
+    changes = RollupChanges()
+    counted = 0
+    for row in rows:
+        state = ticket_state(row.status, row.category, row.priority, row.assigned_to)
+        changes.track(row.created_at, None, state, row.resolved_at or row.updated_at or row.created_at)
+        counted += 1
+
+    db.session.execute(db.delete(DailyRollup.__table__))
+    db.session.execute(db.delete(ResolutionBucket.__table__))
+    rollup_rows = [dict(zip(KEY_FIELDS, key), **{name: counts[name] for name in COUNTERS})
+                   for key, counts in changes.counters.items()]
+    bucket_rows = [dict(zip(KEY_FIELDS + ('bucket',), key), count=count) for key, count in changes.buckets.items()]
+    for start in range(0, len(rollup_rows), batch_size):
+        db.session.execute(db.insert(DailyRollup.__table__), rollup_rows[start:start + batch_size])
+    for start in range(0, len(bucket_rows), batch_size):
+        db.session.execute(db.insert(ResolutionBucket.__table__), bucket_rows[start:start + batch_size])
+    db.session.commit()
+    return counted
+
+
+# -------------------- Reports --------------------
+
+def load_report(start, end, group_by='category'):
+    """
+    Opened / resolved counts, time to resolve and backlog per group for the
+    days start..end (inclusive), plus a per-day series. Reads only the rollups.
+    """
+    rollups = DailyRollup.__table__
+    buckets = ResolutionBucket.__table__
+    group = rollups.c[group_by]
+    in_range = rollups.c.day.between(start, end)
+    net = rollups.c.opened + rollups.c.reopened + rollups.c.moved_in - rollups.c.resolved - rollups.c.moved_out
+    total = db.func.sum
+
+    groups = {}
+
+    def row_for(value):
+        if value not in groups:
+            groups[value] = {'key': value, 'opened': 0, 'resolved': 0, 'reopened': 0,
+                             'resolve_seconds': 0, 'backlog': 0, 'histogram': Counter()}
+        return groups[value]
+
+    for value, opened, resolved, reopened, seconds in db.session.execute(
+        db.select(group, total(rollups.c.opened), total(rollups.c.resolved), total(rollups.c.reopened),
+                  total(rollups.c.resolve_seconds)).where(in_range).group_by(group)
+    ):
+        row = row_for(value)
+        row.update(opened=opened or 0, resolved=resolved or 0, reopened=reopened or 0, resolve_seconds=seconds or 0)
+
+    # Backlog is the running total of everything up to the end of the range
+    for value, backlog in db.session.execute(
+        db.select(group, total(net)).where(rollups.c.day <= end).group_by(group)
+    ):
+        if backlog or value in groups:
+            row_for(value)['backlog'] = backlog or 0
+
+    bucket_group = buckets.c[group_by]
+    for value, bucket, count in db.session.execute(
+        db.select(bucket_group, buckets.c.bucket, total(buckets.c.count))
+        .where(buckets.c.day.between(start, end)).group_by(bucket_group, buckets.c.bucket)
+    ):
+        row_for(value)['histogram'][bucket] += count
+
+    opening = db.session.execute(db.select(total(net)).where(rollups.c.day < start)).scalar() or 0
+    daily = []
+    backlog = opening
+    for day, opened, resolved, change in db.session.execute(
+        db.select(rollups.c.day, total(rollups.c.opened), total(rollups.c.resolved), total(net))
+        .where(in_range).group_by(rollups.c.day).order_by(rollups.c.day)
+    ):
+        backlog += change
+        daily.append({'day': day, 'opened': opened, 'resolved': resolved, 'backlog': backlog})
+
+    totals = {'opened': 0, 'resolved': 0, 'reopened': 0, 'resolve_seconds': 0, 'backlog': 0, 'histogram': Counter()}
+    for row in groups.values():
+        for field in ('opened', 'resolved', 'reopened', 'resolve_seconds', 'backlog'):
+            totals[field] += row[field]
+        totals['histogram'].update(row['histogram'])
+    for row in list(groups.values()) + [totals]:
+        row['mean'] = row['resolve_seconds'] / row['resolved'] if row['resolved'] else None
+        row['median'] = histogram_percentile(row['histogram'], 50)
+        row['p90'] = histogram_percentile(row['histogram'], 90)
+
+    labels = _labels(group_by, groups)
+    rows = sorted(groups.values(), key=lambda row: labels[row['key']].lower())
+    for row in rows:
+        row['label'] = labels[row['key']]
+    return {'groups': rows, 'totals': totals, 'daily': daily}
+
+
+def _labels(group_by, groups):
+    if group_by != 'assignee_id':
+        return {value: value.replace('_', ' ').title() for value in groups}
+    return {value: user_directory.name(value, f'User #{value}') if value else 'Unassigned' for value in groups}
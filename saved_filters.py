@@ -0,0 +1,309 @@
+"""
+EDSPL Tracker - Saved Filters
+Builds the ticket list's filtered query, and keeps named filters per user
+with a count of matching tickets. Code that creates or changes tickets
+adjusts those counts in the same transaction, so the list page shows every
+saved filter's count without counting tickets. Filters that a ticket's own
+columns cannot decide (full-text search, "quiet for N days") are recounted
+instead, once their count is older than SAVED_FILTER_RECOUNT_SECONDS.
+
+Each process keeps the incremental filters parsed in memory, so a ticket
+write reads one cache version row instead of every user's filters. Saving,
+changing or deleting a filter bumps the 'saved_filters' version in the same
+transaction.
+"""
+
+import itertools
+import json
+import threading
+from collections import Counter, namedtuple
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import event
+
+from models import (db, Ticket, SavedFilter, CacheVersion, bump_cache_version,
+                    TICKET_CATEGORIES, TICKET_PRIORITIES, TICKET_STATUSES)
+from pagination import parse_datetime
+from search import search_available, search_hits
+
+VERSION_NAME = 'saved_filters'
+
+TICKET_FILTERS = ('status', 'priority', 'category', 'assigned', 'activity', 'search')
+
+# List orderings: (column, cursor value parser); all walk (column, id) indexes
+TICKET_SORTS = {
+    'created': (Ticket.created_at, parse_datetime),
+    'activity': (Ticket.last_activity_at, parse_datetime),
+    'comments': (Ticket.comment_count, int),
+}
+
+FilterState = namedtuple('FilterState', 'status priority category assigned_to commented')
+
+
+def filter_state(status, priority, category, assigned_to, comment_count):
+    return FilterState(status or 'open', priority or 'medium', category or 'other', assigned_to,
+                       bool(comment_count))
+
+
+def filter_state_of(ticket):
+    return filter_state(ticket.status, ticket.priority, ticket.category, ticket.assigned_to, ticket.comment_count)
+
+
+# -------------------- Querying --------------------
+
+def filtered_ticket_query(filters, user_id):
+    """
+    Tickets matching the list page's filters (a dict keyed by TICKET_FILTERS),
+    with 'assigned': 'me' meaning `user_id`. Returns (query, hits); `hits` is
+    the ranked full-text subquery when the search went through the search
+    index, else None.
+    """
+    status = filters.get('status', '')
+    priority = filters.get('priority', '')
+    category = filters.get('category', '')
+    assigned = filters.get('assigned', '')
+    activity = filters.get('activity', '')
+    search = filters.get('search', '')
+
+    query = Ticket.query
+
+    if status:
+        query = query.filter_by(status=status)
+    if priority:
+        query = query.filter_by(priority=priority)
+    if category:
+        query = query.filter_by(category=category)
+    if assigned == 'me':
+        query = query.filter_by(assigned_to=user_id)
+    if assigned == 'unassigned':
+        query = query.filter_by(assigned_to=None)
+    if activity == 'no_comments':
+        query = query.filter(Ticket.comment_count == 0)
+    if activity == 'quiet':
+        quiet_since = datetime.utcnow() - timedelta(days=current_app.config['QUIET_TICKET_DAYS'])
+        query = query.filter(Ticket.last_activity_at < quiet_since)
+
+    hits = None
+    if search and search_available():
+        hits = search_hits(search)
+        if hits is not None:
+            query = query.join(hits, hits.c.ticket_id == Ticket.id)
+    elif search:
+        search_term = f'%{search}%'
+        query = query.filter(
+            db.or_(
+                Ticket.ticket_number.ilike(search_term),
+                Ticket.title.ilike(search_term),
+                Ticket.description.ilike(search_term)
+            )
+        )
+    return query, hits
+
+
+def is_incremental(filters):
+    """Whether a ticket's own columns decide if it matches, so a count can be adjusted per change."""
+    return not filters.get('search') and filters.get('activity') != 'quiet'
+
+
+def matches(filters, user_id, state):
+    """Whether a ticket in FilterState `state` matches incremental `filters` saved by `user_id`."""
+    for name in ('status', 'priority', 'category'):
+        if filters.get(name) and getattr(state, name) != filters[name]:
+            return False
+    assigned = filters.get('assigned')
+    if assigned == 'me' and state.assigned_to != user_id:
+        return False
+    if assigned == 'unassigned' and state.assigned_to is not None:
+        return False
+    if filters.get('activity') == 'no_comments' and state.commented:
+        return False
+    return True
+
+
+# -------------------- Counts --------------------
+
+class IncrementalFilters:
+    """This process's parsed copy of every incremental saved filter."""
+
+    def __init__(self):
+        self._key = None  # (database URL, cache version) the copy was loaded at
+        self._filters = []  # (filter id, user id, filters dict)
+        self._lock = threading.Lock()
+
+    def all(self):
+        """Reload if the cache version moved (one primary key read), then return the filters."""
+        key = (str(db.engine.url),
+               db.session.query(CacheVersion.version).filter_by(name=VERSION_NAME).scalar() or 0)
+        if key != self._key:
+            with self._lock:
+                rows = db.session.query(SavedFilter.id, SavedFilter.user_id, SavedFilter.filters).filter(
+                    SavedFilter.incremental.is_(True))
+                self._filters = [(filter_id, user_id, json.loads(filters)) for filter_id, user_id, filters in rows]
+                self._key = key
+        return self._filters
+
+
+incremental_filters = IncrementalFilters()
+
+
+@event.listens_for(SavedFilter, 'after_insert')
+@event.listens_for(SavedFilter, 'after_delete')
+def _filter_added_or_removed(mapper, connection, target):
+    bump_cache_version(connection, VERSION_NAME)
+
+
+@event.listens_for(SavedFilter, 'after_update')
+def _filter_changed(mapper, connection, target):
+    # Count updates happen constantly; only a changed definition matters
+    state = db.inspect(target)
+    if state.attrs.filters.history.has_changes() or state.attrs.incremental.history.has_changes():
+        bump_cache_version(connection, VERSION_NAME)
+
+
+class FilterCountChanges:
+    """Ticket changes collected in memory, then applied to the saved filter counts."""
+
+    def __init__(self):
+        self.changes = []  # (FilterState before or None if new, FilterState after)
+
+    def track(self, before, after):
+        if before != after:
+            self.changes.append((before, after))
+
+    def save(self):
+        """Add each incremental filter's net change in matching tickets to its count. The caller commits."""
+        if not self.changes:
+            return
+        deltas = Counter()
+        for filter_id, user_id, filters in incremental_filters.all():
+            for before, after in self.changes:
+                deltas[filter_id] += matches(filters, user_id, after) - (
+                    before is not None and matches(filters, user_id, before))
+
+        saved = SavedFilter.__table__
+        for filter_id, delta in deltas.items():
+            if delta:
+                db.session.execute(saved.update().where(saved.c.id == filter_id).values(
+                    ticket_count=saved.c.ticket_count + delta))
+        self.changes.clear()
+
+
+def track_filter_change(before, after):
+    """Record one ticket going from FilterState `before` (None if new) to `after`."""
+    changes = FilterCountChanges()
+    changes.track(before, after)
+    changes.save()
+
+
+def expire_quiet_counts(last_activity_at):
+    """
+    A ticket last active at `last_activity_at` just had new activity. If it
+    was quiet, 'quiet' filters lost a ticket: have them recounted at their
+    next view instead of waiting out SAVED_FILTER_RECOUNT_SECONDS.
+    """
+    quiet_since = datetime.utcnow() - timedelta(days=current_app.config['QUIET_TICKET_DAYS'])
+    if last_activity_at is None or last_activity_at >= quiet_since:
+        return
+    for saved in SavedFilter.query.filter(SavedFilter.incremental.is_(False)):
+        if json.loads(saved.filters).get('activity') == 'quiet':
+            saved.counted_at = None
+
+
+def count_filter(saved):
+    """Count a saved filter's tickets from scratch."""
+    query, _ = filtered_ticket_query(json.loads(saved.filters), saved.user_id)
+    saved.ticket_count = query.order_by(None).count()
+    saved.counted_at = datetime.utcnow()
+
+
+def refresh_counts(saved_filters):
+    """Recount the filters whose count is not kept incrementally and has gone stale."""
+    stale_before = datetime.utcnow() - timedelta(seconds=current_app.config['SAVED_FILTER_RECOUNT_SECONDS'])
+    stale = [saved for saved in saved_filters
+             if not saved.incremental and (saved.counted_at is None or saved.counted_at < stale_before)]
+    for saved in stale:
+        count_filter(saved)
+    if stale:
+        db.session.commit()
+    return saved_filters
+
+
+def recount_saved_filters():
+    """Recount every saved filter, e.g. after the ticket counters were repaired. Returns how many."""
+    saved_filters = SavedFilter.query.all()
+    for saved in saved_filters:
+        count_filter(saved)
+    db.session.commit()
+    return len(saved_filters)
+
+
+def save_filter(user_id, name, filters, sort=''):
+    """Create or replace the user's filter called `name` and count it."""
+    filters = {key: value for key, value in filters.items() if key in TICKET_FILTERS and value}
+    saved = SavedFilter.query.filter_by(user_id=user_id, name=name).first()
+    if saved is None:
+        saved = SavedFilter(user_id=user_id, name=name)
+        db.session.add(saved)
+    saved.filters = json.dumps(filters, sort_keys=True)
+    saved.sort = sort if sort in TICKET_SORTS and sort != 'created' else ''
+    saved.incremental = is_incremental(filters)
+    count_filter(saved)
+    return saved
+
+
+def query_args(saved):
+    """The ticket list URL arguments that open a saved filter."""
+    args = json.loads(saved.filters)
+    if saved.sort:
+        args['sort'] = saved.sort
+    return args
+
+
+# -------------------- Query Plans --------------------
+
+def filter_combinations():
+    """One representative filter dict for every combination of the list's column filters."""
+    choices = {
+        'status': TICKET_STATUSES[0],
+        'priority': TICKET_PRIORITIES[-1],
+        'category': TICKET_CATEGORIES[0],
+        'assigned': 'me',
+    }
+    for size in range(len(choices) + 1):
+        for names in itertools.combinations(choices, size):
+            yield {name: choices[name] for name in names}
+    yield {'assigned': 'unassigned', 'status': TICKET_STATUSES[0]}
+    yield {'activity': 'no_comments', 'status': TICKET_STATUSES[0]}
+    yield {'activity': 'quiet', 'status': TICKET_STATUSES[0]}
+
+
+def explain_filters(user_id, per_page=50):
+    """
+    The database's plans for the total and for the first list page of every
+    filter combination and sort. Yields (filters, what, plan lines,
+    uses_index); uses_index is False when the plan reads the whole tickets table.
+    """
+    for filters in filter_combinations():
+        query, _ = filtered_ticket_query(filters, user_id)
+        yield (filters, 'count') + _plan(query.with_entities(db.func.count(Ticket.id)).statement)
+        for sort, (sort_column, _) in TICKET_SORTS.items():
+            page = query.order_by(sort_column.desc(), Ticket.id.desc()).limit(per_page + 1)
+            yield (filters, f'sort={sort}') + _plan(page.statement)
+
+
+def _plan(statement):
+    dialect = db.engine.dialect
+    compiled = statement.compile(dialect=dialect)
+    params = compiled.params
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+
+    connection = db.session.connection()
+    if dialect.name == 'sqlite':
+        plan = [row[-1] for row in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + str(compiled), params)]
+        full_scan = 'SCAN tickets' in plan
+    else:
+        plan = [row[0] for row in connection.exec_driver_sql('EXPLAIN ' + str(compiled), params)]
+        full_scan = any('Seq Scan on tickets' in line for line in plan)
+    return plan, not full_scan
@@ -0,0 +1,140 @@
+"""
+EDSPL Tracker - Full-Text Ticket Search
+SQLite FTS5 index over ticket numbers, titles, descriptions and comments.
+
+The index holds one row per ticket (rowid = tickets.id) and is kept in sync
+by triggers, so every writer - the web routes, imports and bulk updates -
+updates it in the same transaction as the ticket itself.
+"""
+
+import re
+
+from markupsafe import Markup, escape
+
+from models import db
+
+SEARCH_TABLE = 'ticket_search'
+
+# Control characters mark highlighted terms in snippets so the surrounding
+# text can be escaped before the <mark> tags are put in.
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+
+# Column weights for bm25(): ticket_number, title, description, comments
+RANK_WEIGHTS = (10.0, 5.0, 1.0, 1.0)
+
+_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+        ticket_number, title, description, comments,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3 4'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS ticket_search_insert AFTER INSERT ON tickets BEGIN
+        INSERT INTO {SEARCH_TABLE} (rowid, ticket_number, title, description, comments)
+        VALUES (new.id, new.ticket_number, new.title, coalesce(new.description, ''), '');
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS ticket_search_update
+        AFTER UPDATE OF ticket_number, title, description ON tickets BEGIN
+        UPDATE {SEARCH_TABLE}
+        SET ticket_number = new.ticket_number, title = new.title, description = coalesce(new.description, '')
+        WHERE rowid = new.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS ticket_search_delete AFTER DELETE ON tickets BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS ticket_search_comment AFTER INSERT ON comments BEGIN
+        UPDATE {SEARCH_TABLE} SET comments = comments || char(10) || new.content
+        WHERE rowid = new.ticket_id;
+    END""",
+]
+
+_available = None
+
+
+def create_search_index():
+    """Create the FTS table and its triggers, backfilling it on first creation."""
+    global _available
+    if db.engine.dialect.name != 'sqlite':
+        _available = False
+        return False
+
+    with db.engine.begin() as conn:
+        exists = conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (SEARCH_TABLE,)
+        ).first()
+        for statement in _SCHEMA:
+            conn.exec_driver_sql(statement)
+        if not exists:
+            _rebuild(conn)
+
+    _available = True
+    return True
+
+
+def rebuild_search_index():
+    """Repopulate the whole index from tickets and comments."""
+    with db.engine.begin() as conn:
+        _rebuild(conn)
+
+
+def _rebuild(conn):
+    conn.exec_driver_sql(f"DELETE FROM {SEARCH_TABLE}")
+    conn.exec_driver_sql(f"""
+        INSERT INTO {SEARCH_TABLE} (rowid, ticket_number, title, description, comments)
+        SELECT t.id, t.ticket_number, t.title, coalesce(t.description, ''),
+               coalesce((SELECT group_concat(c.content, char(10)) FROM comments c WHERE c.ticket_id = t.id), '')
+        FROM tickets t
+    """)
+
+
+def search_available():
+    """True when the FTS index exists on the current database."""
+    global _available
+    if _available is None:
+        _available = db.engine.dialect.name == 'sqlite' and bool(db.session.execute(
+            db.text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': SEARCH_TABLE}
+        ).first())
+    return _available
+
+
+def build_match_query(text):
+    """Turn free text into an FTS5 query: every word must match as a prefix."""
+    terms = re.findall(r'\w+', text.lower())
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search_hits(text):
+    """
+    Subquery of (ticket_id, rank, snippet) for every ticket matching `text`.
+
+    Lower rank is a better match. The hits are not limited: callers join
+    them to their filtered ticket query and page that, so list filters and
+    counts see every match. They are built as a MATERIALIZED CTE so SQLite
+    runs the MATCH once instead of once per candidate ticket when another
+    filter (e.g. status) would otherwise drive the join. Returns None if
+    `text` has nothing searchable.
+    """
+    match = build_match_query(text)
+    if not match:
+        return None
+
+    weights = ', '.join(str(w) for w in RANK_WEIGHTS)
+    statement = db.text(f"""
+        SELECT rowid AS ticket_id,
+               bm25({SEARCH_TABLE}, {weights}) AS rank,
+               snippet({SEARCH_TABLE}, -1, :start, :end, '...', 16) AS snippet
+        FROM {SEARCH_TABLE}
+        WHERE {SEARCH_TABLE} MATCH :match
+    """).bindparams(match=match, start=HIGHLIGHT_START, end=HIGHLIGHT_END)
+    return statement.columns(
+        ticket_id=db.Integer, rank=db.Float, snippet=db.Text
+    ).cte('search_hits').prefix_with('MATERIALIZED')
+
+
+def highlight(snippet):
+    """Render an FTS snippet as escaped HTML with <mark> around matched terms."""
+    if not snippet:
+        return ''
+    html = str(escape(snippet))
+    return Markup(html.replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_END, '</mark>'))
@@ -0,0 +1,25 @@
+// Fills <time class="timeago" datetime="..."> with "5m ago" style text in the
+// browser, so the HTML around it stays the same and can be cached server-side.
+(function () {
+    function timeago(date) {
+        const seconds = (Date.now() - date.getTime()) / 1000;
+        if (seconds < 60) return 'just now';
+        if (seconds < 3600) return Math.floor(seconds / 60) + 'm ago';
+        if (seconds < 86400) return Math.floor(seconds / 3600) + 'h ago';
+        if (seconds < 604800) return Math.floor(seconds / 86400) + 'd ago';
+        return date.toISOString().slice(0, 10);
+    }
+
+    function refresh() {
+        document.querySelectorAll('time.timeago').forEach(el => {
+            const date = new Date(el.getAttribute('datetime'));
+            if (!isNaN(date)) {
+                el.textContent = timeago(date);
+                el.title = date.toLocaleString();
+            }
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', refresh);
+    setInterval(refresh, 60000);
+})();
@@ -0,0 +1,70 @@
+"""
+EDSPL Tracker - Dashboard Statistics
+Builds the dashboard's figures from one grouped aggregate so they can be
+cached as a single snapshot and shared by every user.
+"""
+
+from datetime import datetime, timedelta
+
+from models import db, Ticket, ActivityLog, User
+
+ACTIVE_STATUSES = ('open', 'in_progress')
+
+
+def load_dashboard_snapshot(recent_tickets=10, recent_activity=15, quiet_days=7):
+    """Read ticket counts and the recent lists as plain data, safe to cache across requests."""
+    quiet_since = datetime.utcnow() - timedelta(days=quiet_days)
+    counts, attention = {}, {}
+    # Quiet and uncommented tickets come from the maintained columns in the same pass
+    rows = db.session.query(
+        Ticket.status, Ticket.assigned_to, db.func.count(Ticket.id),
+        db.func.sum(db.case((Ticket.last_activity_at < quiet_since, 1), else_=0)),
+        db.func.sum(db.case((Ticket.comment_count == 0, 1), else_=0)),
+    ).group_by(Ticket.status, Ticket.assigned_to)
+    for status, assigned_to, count, quiet, no_comments in rows:
+        counts[(status, assigned_to)] = count
+        attention[(status, assigned_to)] = (quiet or 0, no_comments or 0)
+
+    tickets = db.session.query(
+        Ticket.id, Ticket.ticket_number, Ticket.title, Ticket.status, Ticket.priority, Ticket.created_at
+    ).order_by(Ticket.created_at.desc(), Ticket.id.desc()).limit(recent_tickets)
+
+    activity = db.session.query(
+        ActivityLog.action, ActivityLog.new_value, ActivityLog.created_at,
+        Ticket.id, Ticket.ticket_number, User.full_name
+    ).join(Ticket, ActivityLog.ticket_id == Ticket.id).join(
+        User, ActivityLog.user_id == User.id
+    ).order_by(ActivityLog.created_at.desc()).limit(recent_activity)
+
+    return {
+        'counts': counts,
+        'attention': attention,
+        'recent_tickets': [row._asdict() for row in tickets],
+        'recent_activity': [
+            {
+                'action': action,
+                'new_value': new_value,
+                'created_at': created_at,
+                'ticket': {'id': ticket_id, 'ticket_number': ticket_number},
+                'user': {'full_name': full_name},
+            }
+            for action, new_value, created_at, ticket_id, ticket_number, full_name in activity
+        ],
+    }
+
+
+def dashboard_stats(snapshot, user_id):
+    """Per-status totals plus the given user's active assignments and active tickets needing attention."""
+    stats = {'total': 0, 'open': 0, 'in_progress': 0, 'resolved': 0, 'closed': 0, 'my_assigned': 0,
+             'quiet': 0, 'no_comments': 0}
+    for (status, assigned_to), count in snapshot['counts'].items():
+        stats['total'] += count
+        if status in stats:
+            stats[status] += count
+        if assigned_to == user_id and status in ACTIVE_STATUSES:
+            stats['my_assigned'] += count
+    for (status, assigned_to), (quiet, no_comments) in snapshot['attention'].items():
+        if status in ACTIVE_STATUSES:
+            stats['quiet'] += quiet
+            stats['no_comments'] += no_comments
+    return stats
@@ -0,0 +1,190 @@
+"""
+EDSPL Tracker - Attachment Blob Store
+Keeps each distinct attachment body once, named by its SHA-256 under
+sharded directories (blobs/ab/cd/<hash>), and counts the attachments that
+reference it so unused blobs can be garbage-collected.
+"""
+
+import mimetypes
+import os
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app, request, send_from_directory
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Attachment, Blob
+from uploads import hash_file
+
+BLOB_DIR = 'blobs'
+
+
+def blob_relpath(sha256):
+    """Path of a blob relative to UPLOAD_FOLDER; two levels of 256 shards each."""
+    return os.path.join(BLOB_DIR, sha256[:2], sha256[2:4], sha256)
+
+
+def blob_path(sha256):
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], blob_relpath(sha256))
+
+
+def attachment_relpath(attachment):
+    """Where an attachment's bytes live, relative to UPLOAD_FOLDER."""
+    if attachment.sha256 and attachment.size is not None:
+        return blob_relpath(attachment.sha256)
+    return attachment.filename  # stored before the blob store existed
+
+
+def guess_mime_type(filename):
+    return mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+
+def send_attachment(attachment):
+    """Download response for an attachment, honouring ATTACHMENT_SENDFILE."""
+    config = current_app.config
+    relpath = attachment_relpath(attachment)
+    mimetype = attachment.mime_type or guess_mime_type(attachment.original_filename)
+
+    if config['ATTACHMENT_SENDFILE'] == 'x-accel-redirect':
+        # nginx serves the bytes (with Range support) from an internal location
+        response = current_app.response_class(mimetype=mimetype)
+        response.headers['X-Accel-Redirect'] = config['ATTACHMENT_ACCEL_PREFIX'] + relpath
+        response.headers['Content-Disposition'] = f'inline; filename="{attachment.original_filename}"'
+        if attachment.sha256:
+            response.set_etag(attachment.sha256)
+        return response.make_conditional(request)
+
+    # Handles Range, If-Range, If-None-Match and If-Modified-Since; with
+    # USE_X_SENDFILE the body is left to the front-end server
+    return send_from_directory(config['UPLOAD_FOLDER'], relpath, mimetype=mimetype,
+                               etag=attachment.sha256 or True, download_name=attachment.original_filename,
+                               conditional=True, max_age=config['ATTACHMENT_MAX_AGE'])
+
+
+def store_blob(path, sha256, size):
+    """
+    Move the finished file at `path` into the store and take a reference to it.
+
+    The reference is taken before the file is moved, so a concurrent garbage
+    collection (which only deletes rows with no references) cannot remove it
+    underneath us. The caller commits.
+    """
+    blobs = Blob.__table__
+    take_reference = blobs.update().where(blobs.c.sha256 == sha256).values(ref_count=blobs.c.ref_count + 1)
+    if db.session.execute(take_reference).rowcount == 0:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(blobs.insert().values(
+                    sha256=sha256, size=size, ref_count=1, created_at=datetime.utcnow()
+                ))
+        except IntegrityError:
+            # Another upload of the same content created the row first
+            db.session.execute(take_reference)
+
+    # Identical content either way; replacing also restores a missing file
+    target = blob_path(sha256)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    os.replace(path, target)
+
+
+def _is_stale(path, cutoff):
+    try:
+        return os.path.getmtime(path) < cutoff
+    except FileNotFoundError:
+        return False
+
+
+class GCResult:
+    def __init__(self):
+        self.recounted = 0
+        self.blobs_removed = 0
+        self.files_removed = 0
+        self.bytes_freed = 0
+
+
+def collect_garbage(grace=timedelta(hours=1), dry_run=False):
+    """
+    Delete blobs no attachment references, and blob files with no row.
+
+    Reference counts are first reconciled against the attachments table.
+    Anything younger than `grace` is left alone so uploads in flight are safe.
+    """
+    result = GCResult()
+    blobs = Blob.__table__
+    cutoff = datetime.utcnow() - grace
+
+    actual = db.select(db.func.count(Attachment.id)).where(
+        Attachment.sha256 == blobs.c.sha256
+    ).scalar_subquery()
+    if not dry_run:
+        result.recounted = db.session.execute(
+            blobs.update().where(blobs.c.ref_count != actual).values(ref_count=actual)
+        ).rowcount
+        db.session.commit()
+
+    unreferenced = actual == 0 if dry_run else blobs.c.ref_count <= 0
+    unused = db.session.execute(
+        db.select(blobs.c.sha256, blobs.c.size).where(unreferenced, blobs.c.created_at < cutoff)
+    ).all()
+    for sha256, size in unused:
+        if dry_run:
+            result.blobs_removed += 1
+            result.bytes_freed += size
+            continue
+        # Re-checked under the delete so a reference taken meanwhile wins
+        deleted = db.session.execute(
+            blobs.delete().where(blobs.c.sha256 == sha256, blobs.c.ref_count <= 0)
+        ).rowcount
+        if deleted:
+            try:
+                os.remove(blob_path(sha256))
+            except FileNotFoundError:
+                pass
+            result.blobs_removed += 1
+            result.bytes_freed += size
+        db.session.commit()
+
+    # Files left behind by uploads whose transaction never committed
+    root = os.path.join(current_app.config['UPLOAD_FOLDER'], BLOB_DIR)
+    file_cutoff = time.time() - grace.total_seconds()
+    for directory, _, names in os.walk(root):
+        if not names:
+            continue
+        known = set(db.session.scalars(db.select(blobs.c.sha256).where(blobs.c.sha256.in_(names))))
+        for name in names:
+            path = os.path.join(directory, name)
+            if name in known or not _is_stale(path, file_cutoff):
+                continue
+            result.files_removed += 1
+            result.bytes_freed += os.path.getsize(path)
+            if not dry_run:
+                os.remove(path)
+    return result
+
+
+def migrate_legacy_attachments(batch_size=100, log=print):
+    """Move attachments stored as flat uploads/<uuid> files into the blob store."""
+    folder = current_app.config['UPLOAD_FOLDER']
+    moved = missing = 0
+    last_id = 0
+    while True:
+        batch = Attachment.query.filter(Attachment.size.is_(None), Attachment.id > last_id).order_by(
+            Attachment.id).limit(batch_size).all()
+        if not batch:
+            break
+        for attachment in batch:
+            last_id = attachment.id
+            path = os.path.join(folder, attachment.filename)
+            if not os.path.isfile(path):
+                missing += 1
+                continue
+            size = os.path.getsize(path)
+            sha256 = hash_file(path).hexdigest()
+            store_blob(path, sha256, size)
+            attachment.sha256 = sha256
+            attachment.size = size
+            attachment.mime_type = attachment.mime_type or guess_mime_type(attachment.original_filename)
+            moved += 1
+        db.session.commit()
+        log(f"  migrated {moved} attachment(s)")
+    return moved, missing
@@ -0,0 +1,46 @@
+"""
+EDSPL Tracker - Background Tasks
+Side work the request handlers hand to the job queue (see jobs.py).
+"""
+
+import logging
+import os
+
+from jobs import task
+from models import db, ActivityLog, Attachment, Ticket
+from storage import blob_path
+from uploads import hash_file
+
+notifications = logging.getLogger('edspl.notifications')
+
+
+@task('notify_activity')
+def notify_activity(activity_ids):
+    """Tell a ticket's assignee about activity by someone else on it."""
+    activities = ActivityLog.query.filter(ActivityLog.id.in_(activity_ids)).options(
+        db.joinedload(ActivityLog.user),
+        db.joinedload(ActivityLog.ticket).joinedload(Ticket.assignee),
+    ).order_by(ActivityLog.id).all()
+
+    for activity in activities:
+        assignee = activity.ticket.assignee
+        if assignee is None or assignee.id == activity.user_id:
+            continue
+        # Delivery (mail, chat) plugs in here; for now notifications are logged
+        notifications.info('To %s <%s>: %s %s by %s', assignee.full_name, assignee.email,
+                           activity.ticket.ticket_number, activity.action.replace('_', ' '),
+                           activity.user.full_name)
+
+
+@task('verify_attachment')
+def verify_attachment(attachment_id):
+    """Re-read a stored attachment and check it still matches its SHA-256."""
+    attachment = db.session.get(Attachment, attachment_id)
+    if attachment is None or attachment.size is None:
+        return  # deleted, or not in the blob store yet
+
+    path = blob_path(attachment.sha256)
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f'blob missing for attachment {attachment_id}: {path}')
+    if os.path.getsize(path) != attachment.size or hash_file(path).hexdigest() != attachment.sha256:
+        raise ValueError(f'blob for attachment {attachment_id} does not match its hash')
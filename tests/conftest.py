@@ -0,0 +1,62 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from archive import _archives_cache  # noqa: E402
+from config import Config  # noqa: E402
+from models import db, User, ensure_schema  # noqa: E402
+from views import invalidate_ticket_caches  # noqa: E402
+
+
+class TestingConfig(Config):
+    TESTING = True
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+    LOGIN_THROTTLE_BACKEND = 'memory'
+    JOB_WORKER_THREADS = 0
+    WARM_UP = False
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """Build a test app on a fresh SQLite file with two users; keyword arguments override config."""
+    apps = []
+
+    def make(**overrides):
+        config = type('TestingConfig', (TestingConfig,), dict(
+            SQLALCHEMY_DATABASE_URI='sqlite:///' + str(tmp_path / f'tracker{len(apps)}.db'),
+            UPLOAD_FOLDER=str(tmp_path / 'uploads'), **overrides))
+        app = create_app(config)
+        # Module-level caches outlive an app; start every test app empty
+        invalidate_ticket_caches()
+        _archives_cache.clear()
+        with app.app_context():
+            ensure_schema()
+            for username, role in (('admin', 'admin'), ('tech1', 'technician')):
+                user = User(username=username, full_name=username.title(), email=f'{username}@example.com',
+                            role=role)
+                user.set_password('secret')
+                db.session.add(user)
+            db.session.commit()
+        apps.append(app)
+        return app
+
+    yield make
+    for app in apps:
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
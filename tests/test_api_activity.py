@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from archive import archive_activity
+from models import db, ApiToken, Ticket, User, log_activity
+
+
+@pytest.fixture
+def api_get(app, client):
+    with app.app_context():
+        _, token = ApiToken.issue(db.session.get(User, 1), 'tests')
+        db.session.commit()
+    return lambda url: client.get(url, headers={'Authorization': f'Bearer {token}'})
+
+
+def test_ticket_activity_includes_archived_months(app, api_get):
+    opened = datetime.utcnow() - timedelta(days=400)
+    with app.app_context():
+        ticket = Ticket(ticket_number='EDSPL-2024-0001', title='Old ticket', created_by=1,
+                        created_at=opened, updated_at=opened)
+        db.session.add(ticket)
+        db.session.flush()
+        log_activity(ticket.id, 1, 'created', when=opened)
+        log_activity(ticket.id, 1, 'commented', when=datetime.utcnow())
+        db.session.commit()
+
+        result = archive_activity(older_than_days=180, log=lambda *_: None)
+        assert result.moved == 1
+
+    response = api_get('/api/v1/tickets/1/activity')
+    assert response.status_code == 200
+    assert [item['action'] for item in response.get_json()['data']] == ['created', 'commented']
+
+
+def test_archiving_never_reuses_activity_ids(app, api_get):
+    old = datetime.utcnow() - timedelta(days=400)
+    with app.app_context():
+        ticket = Ticket(ticket_number='EDSPL-2024-0001', title='Old ticket', created_by=1,
+                        created_at=old, updated_at=old)
+        db.session.add(ticket)
+        db.session.flush()
+        for _ in range(3):
+            log_activity(ticket.id, 1, 'updated', when=old)
+        db.session.commit()
+
+        archive_activity(older_than_days=180, log=lambda *_: None)
+        log_activity(ticket.id, 1, 'commented')
+        db.session.commit()
+
+    ids = [item['id'] for item in api_get('/api/v1/tickets/1/activity').get_json()['data']]
+    assert len(ids) == 4
+    assert len(set(ids)) == 4
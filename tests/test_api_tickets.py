@@ -0,0 +1,75 @@
+import io
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from models import db, ApiToken, Ticket, User
+
+
+@pytest.fixture
+def api_get(app, client):
+    with app.app_context():
+        _, token = ApiToken.issue(db.session.get(User, 1), 'tests')
+        for n in range(3):
+            db.session.add(Ticket(ticket_number=f'EDSPL-2024-000{n + 1}', title=f'Ticket {n + 1}', created_by=1))
+        db.session.commit()
+
+    def get(url, etag=None):
+        headers = {'Authorization': f'Bearer {token}'}
+        if etag:
+            headers['If-None-Match'] = etag
+        return client.get(url, headers=headers)
+    return get
+
+
+def test_conditional_list_request_does_not_count(app, api_get):
+    first = api_get('/api/v1/tickets?status=open')
+    assert first.status_code == 200 and first.get_json()['total'] == 3
+
+    statements = []
+    with app.app_context():
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)  # noqa: E731
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            assert api_get('/api/v1/tickets?status=open', first.headers['ETag']).status_code == 304
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+    assert not any('count(' in statement.lower() for statement in statements)
+
+
+def test_list_etag_changes_when_a_ticket_leaves_the_filter(app, api_get):
+    etag = api_get('/api/v1/tickets?status=open').headers['ETag']
+    with app.app_context():
+        db.session.get(Ticket, 1).status = 'resolved'
+        db.session.commit()
+
+    response = api_get('/api/v1/tickets?status=open', etag)
+    assert response.status_code == 200 and response.get_json()['total'] == 2
+
+
+def test_list_etag_changes_for_backdated_new_tickets(app, api_get):
+    etag = api_get('/api/v1/tickets').headers['ETag']
+    with app.app_context():
+        old = datetime(2020, 1, 1)
+        db.session.add(Ticket(ticket_number='EDSPL-2020-0001', title='Imported', created_by=1,
+                              created_at=old, updated_at=old))
+        db.session.commit()
+
+    assert api_get('/api/v1/tickets', etag).status_code == 200
+
+
+def test_imported_future_times_do_not_hide_later_edits(app, client, api_get):
+    client.post('/login', data={'username': 'admin', 'password': 'secret'})
+    client.post('/tickets/import', content_type='multipart/form-data', data={'file': (
+        io.BytesIO(b'title,created_at,updated_at\nFrom the future,2030-01-01T00:00:00,2031-01-01T00:00:00\n'),
+        'tickets.csv')})
+    with app.app_context():
+        imported = Ticket.query.filter_by(title='From the future').one()
+        assert imported.updated_at <= datetime.utcnow()
+
+    etag = api_get('/api/v1/tickets').headers['ETag']
+    with app.app_context():
+        db.session.get(Ticket, 1).priority = 'high'
+        db.session.commit()
+    assert api_get('/api/v1/tickets', etag).status_code == 200
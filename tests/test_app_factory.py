@@ -0,0 +1,41 @@
+import os
+from collections import Counter
+
+import database
+
+
+def scrape(app):
+    app.config['METRICS_TOKEN'] = 'scrape'
+    response = app.test_client().get('/metrics', headers={'Authorization': 'Bearer scrape'})
+    assert response.status_code == 200
+    return response.get_data(as_text=True)
+
+
+def test_metric_families_are_not_repeated_by_a_second_app(make_app):
+    make_app()
+    app = make_app()
+
+    help_lines = Counter(line for line in scrape(app).splitlines() if line.startswith('# HELP'))
+    assert help_lines and max(help_lines.values()) == 1
+
+
+def test_queries_are_counted_once_per_process(make_app):
+    app = make_app(METRICS_RESPONSE_HEADERS=True, LOGIN_THROTTLE_ENABLED=False)
+
+    def query_count():
+        response = app.test_client().post('/login', data={'username': 'admin', 'password': 'wrong'})
+        return int(response.headers['X-Query-Count'])
+
+    before = query_count()
+    make_app()
+    assert before > 0
+    assert query_count() == before
+
+
+def test_fork_hook_is_registered_once(make_app, monkeypatch):
+    registered = []
+    monkeypatch.setattr(os, 'register_at_fork', lambda **hooks: registered.append(hooks))
+    monkeypatch.setattr(database, '_fork_hook_registered', False)
+    make_app()
+    make_app()
+    assert len(registered) == 1
@@ -0,0 +1,55 @@
+from datetime import datetime
+
+import pytest
+
+from bulk import BulkError, bulk_update
+from models import db, ActivityLog, Ticket
+
+
+@pytest.fixture
+def tickets(app):
+    earlier = datetime(2024, 1, 1)
+    with app.app_context():
+        db.session.add_all([
+            Ticket(ticket_number='EDSPL-2024-0001', title='Open one', created_by=1, created_at=earlier,
+                   updated_at=earlier),
+            Ticket(ticket_number='EDSPL-2024-0002', title='Done already', status='resolved', assigned_to=2,
+                   created_by=1, created_at=earlier, updated_at=earlier, resolved_at=earlier),
+        ])
+        db.session.commit()
+    return earlier
+
+
+def test_outcomes_and_activity_rows(app, tickets):
+    with app.app_context():
+        result = bulk_update([1, 2, 999, 1], user_id=1, status='resolved', assigned_to=2)
+        db.session.commit()
+
+        assert [(item.ticket_id, item.outcome) for item in result.outcomes] == [
+            (1, 'updated'), (2, 'unchanged'), (999, 'not_found')]
+        assert result.outcomes[0].changes == [('status', 'open', 'resolved'), ('assignee', None, 'Tech1')]
+        assert result.counts == {'updated': 1, 'unchanged': 1, 'not_found': 1}
+
+        rows = ActivityLog.query.order_by(ActivityLog.id).all()
+        assert [row.id for row in rows] == result.activity_ids
+        assert sorted((row.ticket_id, row.action, row.old_value, row.new_value) for row in rows) == [
+            (1, 'assigned', None, 'Tech1'), (1, 'status_changed', 'open', 'resolved')]
+
+        changed, untouched = db.session.get(Ticket, 1), db.session.get(Ticket, 2)
+        assert changed.status == 'resolved' and changed.assigned_to == 2
+        assert changed.resolved_at == changed.updated_at > tickets
+        # Already in the requested state: no write at all
+        assert untouched.updated_at == untouched.resolved_at == tickets
+
+
+@pytest.mark.parametrize('kwargs, message', [
+    ({'status': 'bogus'}, 'Unknown status'),
+    ({}, 'Choose at least one change'),
+    ({'priority': 'high', 'max_tickets': 1}, 'At most 1'),
+    ({'assigned_to': 999}, 'Unknown assignee'),
+])
+def test_rejected_requests_change_nothing(app, tickets, kwargs, message):
+    with app.app_context():
+        with pytest.raises(BulkError, match=message):
+            bulk_update([1, 2], user_id=1, **kwargs)
+        assert ActivityLog.query.count() == 0
@@ -0,0 +1,92 @@
+from models import db, ActivityLog, Comment, Ticket
+from events import ChangeFeed, Subscription, load_changes
+
+
+def add_ticket():
+    ticket = Ticket(ticket_number='EDSPL-2024-0001', title='Printer offline', created_by=1)
+    db.session.add(ticket)
+    db.session.commit()
+    return ticket.id
+
+
+def add_activity(ticket_id, row_id=None):
+    # An explicit lower id stands in for a transaction that took its id
+    # early but committed after later rows were already read
+    db.session.add(ActivityLog(id=row_id, ticket_id=ticket_id, user_id=1, action='updated'))
+    db.session.commit()
+
+
+def row_ids(events, kind='activity'):
+    return [event['row_id'] for event in events if event['event'] == kind]
+
+
+def test_late_commits_below_the_cursor_are_delivered_once(app):
+    feed = ChangeFeed(app)
+    with app.app_context():
+        ticket_id = add_ticket()
+        add_activity(ticket_id, 10)
+        feed._start()
+        assert feed.poll() == []
+
+        add_activity(ticket_id, 20)
+        assert row_ids(feed.poll()) == [20]
+
+        add_activity(ticket_id, 15)
+        events = feed.poll()
+        assert row_ids(events) == [15]
+        # The event id never moves the mark backwards
+        assert events[0]['id'] == '20-0'
+        assert feed.poll() == []
+
+
+def test_rows_behind_the_window_are_forgotten(app):
+    app.config['CHANGE_FEED_WINDOW'] = 5
+    with app.app_context():
+        ticket_id = add_ticket()
+        for row_id in (1, 2, 20):
+            add_activity(ticket_id, row_id)
+        seen = (set(), set())
+        events, cursor, _ = load_changes((0, 0), window=5, seen=seen)
+        assert row_ids(events) == [1, 2, 20]
+        assert cursor == (20, 0)
+        assert seen == ({20}, set())
+
+
+def test_replay_covers_late_rows_and_is_not_repeated_live(app):
+    app.config.update(SSE_HEARTBEAT=0.05, SSE_MAX_DURATION=0.2)
+    feed = ChangeFeed(app)
+    with app.app_context():
+        ticket_id = add_ticket()
+        add_activity(ticket_id, 20)
+        add_activity(ticket_id, 15)
+        db.session.add(Comment(ticket_id=ticket_id, user_id=1, content='Swapped the toner'))
+        db.session.commit()
+        replayed = load_changes((0, 0))[0]
+
+    subscription = Subscription(ticket_id)
+    # The feed thread fanned these out before the stream got to them
+    for event in replayed:
+        subscription.offer(event)
+    subscription.offer({'event': 'activity', 'id': '30-1', 'row_id': 30, 'data': {'ticket_id': ticket_id}})
+
+    # The browser last saw event 20-0, before 15 and the comment committed.
+    # The replay re-reads the window (the page skips 20 itself) and the live
+    # copies of what it sent are dropped.
+    body = ''.join(feed.stream(subscription, since=(20, 0)))
+    assert body.count('event: activity') == 3
+    assert body.count('event: comment') == 1
+    assert body.count('"id": 15,') == 1
+    assert 'id: 30-1\nevent: activity' in body
+
+
+def test_subscribing_pins_the_cursor_before_the_replay(app):
+    feed = ChangeFeed(app)
+    with app.app_context():
+        add_activity(add_ticket(), 10)
+    subscription = feed.subscribe()
+    try:
+        # Set before the caller replays, not later by the feed thread
+        assert feed.cursor == (10, 0)
+        assert feed.seen == ({10}, set())
+    finally:
+        feed.unsubscribe(subscription)
@@ -0,0 +1,13 @@
+import pytest
+
+from saved_filters import explain_filters
+
+
+def test_every_filter_combination_uses_an_index(make_app):
+    app = make_app()
+    with app.app_context():
+        plans = list(explain_filters(user_id=1))
+    assert plans
+    full_scans = [(filters, what, plan) for filters, what, plan, uses_index in plans if not uses_index]
+    if full_scans:
+        pytest.fail('\n'.join(f'{filters} {what}: {plan}' for filters, what, plan in full_scans))
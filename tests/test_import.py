@@ -0,0 +1,54 @@
+import io
+from datetime import datetime
+
+from models import db, Ticket
+
+
+def upload(client, content, filename):
+    client.post('/login', data={'username': 'admin', 'password': 'secret'})
+    return client.post('/tickets/import', data={'file': (io.BytesIO(content), filename)},
+                       content_type='multipart/form-data')
+
+
+def ticket_titles(app):
+    with app.app_context():
+        return [title for (title,) in db.session.query(Ticket.title).order_by(Ticket.id)]
+
+
+def test_rows_that_are_not_utf8_are_skipped_with_their_line(app, client):
+    response = upload(client, b'title\nFirst\nCaf\xe9\nThird\n', 'tickets.csv')
+
+    assert response.status_code == 200
+    assert b'Imported 2 ticket(s), skipped 1.' in response.data
+    assert b'<td>3</td>' in response.data and b'not valid UTF-8' in response.data
+    assert ticket_titles(app) == ['First', 'Third']
+
+
+def test_jsonl_lines_that_are_not_utf8_are_skipped(app, client):
+    response = upload(client, b'{"title": "First"}\n{"title": "Caf\xe9"}\n', 'tickets.jsonl')
+
+    assert response.status_code == 200
+    assert b'<td>2</td>' in response.data
+    assert ticket_titles(app) == ['First']
+
+
+def test_malformed_csv_stops_with_the_line_and_keeps_earlier_rows(app, client):
+    content = b'title,description\nFirst,ok\nSecond,"' + b'y' * 200000 + b'"\nThird,ok\n'
+    response = upload(client, content, 'tickets.csv')
+
+    assert response.status_code == 200
+    assert b'Could not read the file past line 3: malformed CSV' in response.data
+    assert b'Imported 1 ticket(s) from the lines before it' in response.data
+    assert ticket_titles(app) == ['First']
+
+
+def test_offsets_are_converted_to_utc(app, client):
+    content = (b'title,created_at,resolved_at,status\n'
+               b'Mixed,2024-01-01T10:00:00+02:00,2024-01-01 09:30:00,resolved\n'
+               b'Zulu,2024-01-02T00:00:00Z,,open\n')
+    response = upload(client, content, 'tickets.csv')
+
+    assert b'Imported 2 ticket(s), skipped 0.' in response.data
+    with app.app_context():
+        created = dict(db.session.query(Ticket.title, Ticket.created_at))
+    assert created == {'Mixed': datetime(2024, 1, 1, 8, 0), 'Zulu': datetime(2024, 1, 2, 0, 0)}
@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from jobs import TASKS, claim_job, enqueue, requeue_lost_jobs, retry_job, run_job, task
+from models import db, Job
+
+calls = []
+
+
+@pytest.fixture(autouse=True)
+def flaky_task():
+    @task('test_flaky')
+    def flaky(fail=True):
+        calls.append(fail)
+        if fail:
+            raise RuntimeError('boom')
+
+    calls.clear()
+    yield
+    TASKS.pop('test_flaky', None)
+
+
+def make_due(job_id):
+    job = db.session.get(Job, job_id)
+    job.run_at = datetime.utcnow()
+    db.session.commit()
+
+
+def test_claim_takes_the_oldest_due_job_once(app):
+    with app.app_context():
+        later = enqueue('test_flaky', {'fail': False}, delay=60)
+        first = enqueue('test_flaky', {'fail': False})
+        second = enqueue('test_flaky', {'fail': False})
+        db.session.commit()
+
+        assert claim_job('w1').id == first.id
+        assert claim_job('w2').id == second.id
+        assert claim_job('w3') is None  # `later` is not due yet
+        assert db.session.get(Job, later.id).status == 'queued'
+
+
+def test_enqueue_with_a_key_returns_the_queued_job(app):
+    with app.app_context():
+        first = enqueue('test_flaky', key='same')
+        db.session.commit()
+        assert enqueue('test_flaky', key='same').id == first.id
+        assert Job.query.count() == 1
+
+
+def test_failures_back_off_then_fail(app):
+    app.config.update(JOB_RETRY_DELAY=30)
+    with app.app_context():
+        job_id = enqueue('test_flaky', max_attempts=3).id
+        db.session.commit()
+
+        delays = []
+        for _ in range(3):
+            started = datetime.utcnow()
+            assert run_job(claim_job('w1'), 'w1') is False
+            job = db.session.get(Job, job_id)
+            if job.status == 'queued':
+                delays.append(round((job.run_at - started).total_seconds()))
+                make_due(job_id)
+
+        assert delays == [30, 60]
+        assert job.status == 'failed' and job.attempts == 3
+        assert 'boom' in job.last_error and job.locked_by is None
+
+
+def test_retry_job_starts_over_without_the_old_error(app):
+    with app.app_context():
+        job_id = enqueue('test_flaky', max_attempts=1).id
+        db.session.commit()
+        run_job(claim_job('w1'), 'w1')
+
+        retry_job(db.session.get(Job, job_id))
+        job = db.session.get(Job, job_id)
+        assert (job.status, job.attempts, job.last_error, job.finished_at) == ('queued', 0, None, None)
+        assert claim_job('w1').id == job_id
+
+
+def test_lost_jobs_are_requeued(app):
+    app.config.update(JOB_TIMEOUT=60)
+    with app.app_context():
+        job_id = enqueue('test_flaky').id
+        db.session.commit()
+        claim_job('w1')
+        db.session.get(Job, job_id).started_at = datetime.utcnow() - timedelta(minutes=5)
+        db.session.commit()
+
+        assert requeue_lost_jobs() == 1
+        assert claim_job('w2').id == job_id
@@ -0,0 +1,27 @@
+import pytest
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(PROXY_FIX_X_FOR=1, LOGIN_USER_BURST=100, LOGIN_IP_BURST=3)
+
+
+def login(client, password, client_address):
+    # Every request reaches the app from the proxy's address
+    return client.post('/login', data={'username': 'admin', 'password': password},
+                       headers={'X-Forwarded-For': client_address}, environ_base={'REMOTE_ADDR': '10.0.0.1'})
+
+
+def test_forwarded_clients_get_separate_buckets(client):
+    for _ in range(3):
+        assert login(client, 'wrong', '203.0.113.5').status_code == 200
+    assert login(client, 'wrong', '203.0.113.5').status_code == 429
+
+    assert login(client, 'secret', '198.51.100.7').status_code == 302
+
+
+def test_without_proxy_fix_the_proxy_address_is_the_bucket(make_app):
+    client = make_app(LOGIN_USER_BURST=100, LOGIN_IP_BURST=3).test_client()
+    for _ in range(3):
+        login(client, 'wrong', '203.0.113.5')
+    assert login(client, 'secret', '198.51.100.7').status_code == 429
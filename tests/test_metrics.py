@@ -0,0 +1,39 @@
+import pytest
+
+from metrics import metrics
+
+
+def scrape(app):
+    app.config['METRICS_TOKEN'] = 'scrape'
+    response = app.test_client().get('/metrics', headers={'Authorization': 'Bearer scrape'})
+    assert response.status_code == 200
+    return response.get_data(as_text=True)
+
+
+@pytest.fixture
+def statements():
+    with metrics._lock:
+        saved = dict(metrics._statements)
+        metrics._statements.clear()
+    yield metrics._statements
+    with metrics._lock:
+        metrics._statements.clear()
+        metrics._statements.update(saved)
+
+
+def test_long_statements_with_a_shared_prefix_are_separate_series(app, statements):
+    prefix = 'SELECT ' + ', '.join(f'column_{n}' for n in range(60))
+    statements[prefix + ' FROM a'] = [1, 0.5, 9.0]
+    statements[prefix + ' FROM b'] = [2, 0.5, 8.0]
+
+    series = [line.split(' ')[0] for line in scrape(app).splitlines()
+              if line.startswith('edspl_sql_statement_calls_total{')]
+    assert len(series) == len(set(series)) >= 2
+
+
+def test_metrics_use_the_requesting_apps_config(make_app, statements):
+    first = make_app(METRICS_SLOW_STATEMENTS=0)
+    make_app(METRICS_SLOW_STATEMENTS=10)
+    statements['SELECT 1'] = [1, 0.1, 0.1]
+
+    assert 'edspl_sql_statement_calls_total{' not in scrape(first)
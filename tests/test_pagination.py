@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+
+from models import db, Ticket
+from pagination import decode_cursor, encode_cursor, paginate_keyset, parse_datetime
+
+
+def test_cursor_round_trip_and_garbage():
+    when = datetime(2024, 3, 1, 9, 30, 15, 250000)
+    assert decode_cursor(encode_cursor(when, 42), parse=parse_datetime) == (when, 42)
+    assert decode_cursor(encode_cursor('high', 7)) == ('high', 7)
+    for token in (None, '', 'not-a-cursor', encode_cursor('x', 'y')[:-2]):
+        assert decode_cursor(token) is None
+
+
+def page(after=None, before=None, descending=True):
+    return paginate_keyset(Ticket.query, Ticket.created_at, Ticket.id,
+                           key=lambda ticket: (ticket.created_at, ticket.id),
+                           after=decode_cursor(after, parse=parse_datetime),
+                           before=decode_cursor(before, parse=parse_datetime),
+                           per_page=4, descending=descending)
+
+
+def test_walks_every_row_once_across_tied_sort_values(app):
+    start = datetime(2024, 1, 1)
+    with app.app_context():
+        # Three tickets share each timestamp, so pages must break ties on id
+        db.session.execute(db.insert(Ticket.__table__), [
+            {'ticket_number': f'EDSPL-2024-{n:04d}', 'title': f'Ticket {n}', 'created_by': 1,
+             'created_at': start + timedelta(hours=n // 3)} for n in range(1, 11)])
+        db.session.commit()
+        expected = [ticket.id for ticket in
+                    Ticket.query.order_by(Ticket.created_at.desc(), Ticket.id.desc())]
+
+        pages, cursor = [], None
+        while True:
+            current = page(after=cursor)
+            pages.append(current)
+            if not current.has_next:
+                break
+            cursor = current.next_cursor
+        assert [ticket.id for current in pages for ticket in current] == expected
+        assert [len(current) for current in pages] == [4, 4, 2]
+        assert not pages[0].has_prev and pages[-1].has_prev
+
+        # Stepping back from the last page gives the same pages
+        back = page(before=pages[-1].prev_cursor)
+        assert [ticket.id for ticket in back] == [ticket.id for ticket in pages[1]]
+        assert back.has_next and back.has_prev
+
+        ascending = page(descending=False)
+        assert [ticket.id for ticket in ascending] == list(reversed(expected))[:4]
@@ -0,0 +1,86 @@
+import io
+import json
+
+import pytest
+from sqlalchemy import event
+
+from models import db, SavedFilter
+from saved_filters import count_filter
+
+FILTERS = {
+    'Open': {'status': 'open'},
+    'High': {'priority': 'high'},
+    'Mine': {'assigned': 'me'},
+    'Unassigned open': {'assigned': 'unassigned', 'status': 'open'},
+    'Uncommented': {'activity': 'no_comments'},
+    'Network high': {'category': 'network', 'priority': 'high'},
+}
+
+
+@pytest.fixture
+def logged_in(client):
+    client.post('/login', data={'username': 'admin', 'password': 'secret'})
+    for name, filters in FILTERS.items():
+        client.post('/tickets/filters', data={'name': name, **filters})
+    return client
+
+
+def kept_and_recounted(app):
+    """Each saved filter's kept count next to a count from scratch."""
+    with app.app_context():
+        kept = {saved.name: saved.ticket_count for saved in SavedFilter.query}
+        recounted = {}
+        for saved in SavedFilter.query:
+            count_filter(saved)
+            recounted[saved.name] = saved.ticket_count
+        db.session.rollback()
+    return kept, recounted
+
+
+def test_counts_follow_every_kind_of_ticket_write(app, logged_in):
+    client = logged_in
+    client.post('/tickets/new', data={'title': 'Router down', 'priority': 'high', 'category': 'network'})
+    client.post('/tickets/new', data={'title': 'Mine', 'priority': 'low', 'assigned_to': '1'})
+    client.post('/tickets/new', data={'title': 'Printer', 'category': 'other'})
+    client.post('/tickets/1/update', data={'status': 'in_progress', 'priority': 'high', 'assigned_to': '2'})
+    client.post('/tickets/2/comment', data={'content': 'On it'})
+    client.post('/tickets/bulk', data={'ticket_ids': ['2', '3'], 'priority': 'high', 'status': 'resolved'})
+    client.post('/tickets/import', content_type='multipart/form-data', data={'file': (
+        io.BytesIO(b'title,priority,category,assigned_to\nSwitch,high,network,admin\nFan,low,other,\n'),
+        'tickets.csv')})
+
+    kept, recounted = kept_and_recounted(app)
+    assert kept == recounted
+    assert kept['High'] == 4
+
+
+def test_ticket_writes_reuse_the_parsed_filters(app, logged_in):
+    logged_in.post('/tickets/new', data={'title': 'First'})
+
+    statements = []
+    with app.app_context():
+        def listener(conn, cursor, statement, *args):
+            statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            logged_in.post('/tickets/new', data={'title': 'Second', 'priority': 'high'})
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+    assert not any(statement.lstrip().upper().startswith('SELECT')
+                   and 'FROM saved_filters' in statement for statement in statements)
+    kept, recounted = kept_and_recounted(app)
+    assert kept == recounted
+
+
+def test_a_changed_filter_is_picked_up_by_the_next_write(app, logged_in):
+    logged_in.post('/tickets/new', data={'title': 'First'})
+    logged_in.post('/tickets/filters', data={'name': 'High', 'priority': 'low'})  # replaces 'High'
+    logged_in.post('/tickets/new', data={'title': 'Low one', 'priority': 'low'})
+    with app.app_context():
+        saved = SavedFilter.query.filter_by(name='High').one()
+        assert json.loads(saved.filters) == {'priority': 'low'}
+        assert saved.ticket_count == 1
+
+    kept, recounted = kept_and_recounted(app)
+    assert kept == recounted
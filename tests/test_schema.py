@@ -0,0 +1,45 @@
+import html
+import re
+from datetime import datetime
+
+from models import db, Ticket, ensure_schema
+
+
+def test_ensure_schema_backfills_last_activity(app):
+    updated = datetime(2024, 5, 1, 9, 30)
+    with app.app_context():
+        db.session.add(Ticket(ticket_number='EDSPL-2024-0001', title='Old ticket', created_by=1,
+                              created_at=datetime(2024, 4, 1), updated_at=updated))
+        db.session.commit()
+
+        # A database from before the column existed
+        with db.engine.begin() as conn:
+            for index in ('ix_tickets_last_activity_id', 'ix_tickets_status_last_activity'):
+                conn.exec_driver_sql(f'DROP INDEX {index}')
+            conn.exec_driver_sql('ALTER TABLE tickets DROP COLUMN last_activity_at')
+
+        ensure_schema()
+        ticket = db.session.get(Ticket, 1)
+        assert ticket.last_activity_at == updated
+        assert ticket.updated_at == updated
+
+
+def test_backfilled_tickets_page_by_activity(app, client):
+    with app.app_context():
+        for n in range(3):
+            db.session.add(Ticket(ticket_number=f'EDSPL-2024-000{n + 1}', title=f'Ticket {n + 1}', created_by=1))
+        db.session.commit()
+        with db.engine.begin() as conn:
+            for index in ('ix_tickets_last_activity_id', 'ix_tickets_status_last_activity'):
+                conn.exec_driver_sql(f'DROP INDEX {index}')
+            conn.exec_driver_sql('ALTER TABLE tickets DROP COLUMN last_activity_at')
+        ensure_schema()
+
+    client.post('/login', data={'username': 'admin', 'password': 'secret'})
+    first = client.get('/tickets?sort=activity&per_page=2')
+    assert first.status_code == 200
+    assert b'EDSPL-2024-0003' in first.data and b'EDSPL-2024-0002' in first.data
+
+    next_page = re.search(rb'href="([^"]*after=[^"]+)"', first.data).group(1)
+    second = client.get(html.unescape(next_page.decode()))
+    assert b'EDSPL-2024-0001' in second.data
@@ -0,0 +1,40 @@
+import re
+
+from models import db, Ticket
+
+
+def ticket_numbers(response):
+    return re.findall(r'EDSPL-\d{4}-\d{4,}', response.get_data(as_text=True))
+
+
+def test_index_follows_ticket_and_comment_writes(client):
+    client.post('/login', data={'username': 'admin', 'password': 'secret'})
+    client.post('/tickets/new', data={'title': 'Firewall rule missing'})
+    assert ticket_numbers(client.get('/tickets?search=firewall'))
+
+    client.post('/tickets/1/update', data={'title': 'Switch port flapping'})
+    assert not ticket_numbers(client.get('/tickets?search=firewall'))
+    assert ticket_numbers(client.get('/tickets?search=flapping'))
+
+    client.post('/tickets/1/comment', data={'content': 'Replaced the transceiver'})
+    assert ticket_numbers(client.get('/tickets?search=transceiver'))
+
+
+def test_filters_see_every_match_not_just_the_best_ranked(app, client):
+    with app.app_context():
+        # Many strong matches (in the title) and a few weak ones (description only)
+        db.session.execute(db.insert(Ticket.__table__), [
+            {'ticket_number': f'EDSPL-2024-{n:05d}', 'title': f'Router {n}', 'created_by': 1}
+            for n in range(1, 1201)])
+        rows = [{'ticket_number': f'EDSPL-2024-{n:05d}', 'title': f'Ticket {n}', 'description': 'router reboot',
+                  'status': 'resolved', 'created_by': 1} for n in range(1201, 1206)]
+        db.session.execute(db.insert(Ticket.__table__), rows)
+        db.session.commit()
+
+    client.post('/login', data={'username': 'admin', 'password': 'secret'})
+    response = client.get('/tickets?search=router&status=resolved')
+    assert 'Showing 5 of 5 ticket(s)' in response.get_data(as_text=True)
+    assert len(set(ticket_numbers(response))) == 5
+
+    everything = client.get('/tickets?search=router&per_page=50').get_data(as_text=True)
+    assert 'of 1205 ticket(s)' in everything
@@ -0,0 +1,67 @@
+import io
+import os
+from datetime import timedelta
+
+from models import db, Attachment, Blob, Ticket
+from storage import blob_path, collect_garbage
+
+
+def upload(client, content, name='notes.txt'):
+    return client.post('/tickets/1/attach', data={'file': (io.BytesIO(content), name)},
+                       content_type='multipart/form-data')
+
+
+def test_identical_uploads_share_one_counted_blob(app, client):
+    client.post('/login', data={'username': 'admin', 'password': 'secret'})
+    client.post('/tickets/new', data={'title': 'Scanner config'})
+    upload(client, b'same bytes', 'first.txt')
+    upload(client, b'same bytes', 'second.txt')
+    upload(client, b'other bytes')
+
+    with app.app_context():
+        blobs = {blob.sha256: blob.ref_count for blob in Blob.query}
+        assert sorted(blobs.values()) == [1, 2]
+        assert all(os.path.exists(blob_path(sha256)) for sha256 in blobs)
+        assert db.session.get(Ticket, 1).attachment_count == 3
+
+
+def test_garbage_collection_follows_references(app, client):
+    client.post('/login', data={'username': 'admin', 'password': 'secret'})
+    client.post('/tickets/new', data={'title': 'Scanner config'})
+    upload(client, b'shared', 'first.txt')
+    upload(client, b'shared', 'second.txt')
+
+    with app.app_context():
+        first, second = Attachment.query.order_by(Attachment.id).all()
+        sha256 = first.sha256
+        # Rows removed behind the store's back leave the count too high
+        db.session.delete(first)
+        db.session.commit()
+
+        result = collect_garbage(grace=timedelta(0))
+        assert (result.recounted, result.blobs_removed) == (1, 0)
+        assert db.session.get(Blob, sha256).ref_count == 1
+
+        db.session.delete(second)
+        db.session.commit()
+        assert collect_garbage(grace=timedelta(0), dry_run=True).blobs_removed == 1
+        assert os.path.exists(blob_path(sha256))
+
+        result = collect_garbage(grace=timedelta(0))
+        assert (result.blobs_removed, result.bytes_freed) == (1, len(b'shared'))
+        assert db.session.get(Blob, sha256) is None
+        assert not os.path.exists(blob_path(sha256))
+
+
+def test_orphaned_files_wait_out_the_grace_period(app):
+    with app.app_context():
+        path = blob_path('ab' * 32)
+        os.makedirs(os.path.dirname(path))
+        with open(path, 'wb') as f:
+            f.write(b'never committed')
+
+        assert collect_garbage(grace=timedelta(hours=1)).files_removed == 0
+        old = os.path.getmtime(path) - 7200
+        os.utime(path, (old, old))
+        assert collect_garbage(grace=timedelta(hours=1)).files_removed == 1
+        assert not os.path.exists(path)
@@ -0,0 +1,39 @@
+import io
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import db, SavedFilter, Ticket
+
+
+@pytest.fixture
+def quiet_ticket(app, client):
+    long_ago = datetime.utcnow() - timedelta(days=30)
+    with app.app_context():
+        db.session.add(Ticket(ticket_number='EDSPL-2024-0001', title='Quiet ticket', created_by=1,
+                              created_at=long_ago, updated_at=long_ago, last_activity_at=long_ago))
+        db.session.commit()
+    client.post('/login', data={'username': 'admin', 'password': 'secret'})
+    client.post('/tickets/filters', data={'name': 'Quiet', 'activity': 'quiet'})
+    assert b'Showing 1 of 1 ticket(s)' in client.get('/tickets?activity=quiet').data
+    return 1
+
+
+def saved_count(app):
+    with app.app_context():
+        return SavedFilter.query.filter_by(name='Quiet').one().ticket_count
+
+
+@pytest.mark.parametrize('post', [
+    lambda client, ticket_id: client.post(f'/tickets/{ticket_id}/comment', data={'content': 'Looking at it'}),
+    lambda client, ticket_id: client.post(f'/tickets/{ticket_id}/attach', content_type='multipart/form-data',
+                                          data={'file': (io.BytesIO(b'log line'), 'trace.log')}),
+    lambda client, ticket_id: client.post('/tickets/bulk', data={'ticket_ids': ticket_id, 'priority': 'high'}),
+], ids=['comment', 'attachment', 'bulk'])
+def test_activity_refreshes_quiet_counts(app, client, quiet_ticket, post):
+    assert saved_count(app) == 1
+    assert post(client, quiet_ticket).status_code in (200, 302)
+
+    page = client.get('/tickets?activity=quiet').data
+    assert b'Showing 0 of 0 ticket(s)' in page
+    assert saved_count(app) == 0
@@ -0,0 +1,40 @@
+import threading
+
+from models import db, Ticket, TicketSequence, format_ticket_number
+
+
+def test_first_reservation_continues_after_existing_tickets(app):
+    with app.app_context():
+        db.session.add(Ticket(ticket_number=format_ticket_number(2031, 7), title='Legacy', created_by=1))
+        db.session.commit()
+        assert Ticket.reserve_ticket_numbers(2, year=2031) == [format_ticket_number(2031, 8),
+                                                                format_ticket_number(2031, 9)]
+        db.session.commit()
+        assert TicketSequence.reserve(2031) == 10
+
+
+def test_concurrent_reservations_never_overlap(app):
+    reserved, errors = [], []
+    start = threading.Barrier(8)
+
+    def worker(count):
+        try:
+            with app.app_context():
+                start.wait()
+                for _ in range(5):
+                    first = TicketSequence.reserve(2032, count)
+                    db.session.commit()
+                    reserved.extend(range(first, first + count))
+        except Exception as exc:  # surfaced below; a thread can't fail the test itself
+            errors.append(exc)
+
+    threads = [threading.Thread(target=worker, args=(n % 3 + 1,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert sorted(reserved) == list(range(1, len(reserved) + 1))
+    with app.app_context():
+        assert db.session.get(TicketSequence, 2032).last_value == len(reserved)
@@ -0,0 +1,139 @@
+"""
+EDSPL Tracker - Login Throttling
+Token buckets per username and per client address. Every login attempt
+takes a token from both buckets before any password is hashed. A
+successful login gives the tokens back, so only failures drain a bucket.
+An empty bucket refuses further attempts until it refills.
+
+Buckets live in process memory by default. With LOGIN_THROTTLE_BACKEND =
+'sqlite' they live in a small SQLite file, which every worker process on
+the host shares.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+
+class MemoryBuckets:
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = {}  # key -> (tokens, updated)
+        self._lock = threading.Lock()
+
+    def update(self, limits, change, now):
+        with self._lock:
+            current = {key: self._buckets.get(key) for key in limits}
+            result, new_state = _apply(limits, current, change, now)
+            self._buckets.update(new_state)
+            if len(self._buckets) > self.max_keys:
+                self._prune()
+            return result
+
+    def _prune(self):
+        # Drop the oldest half; a forgotten bucket simply starts full again
+        ordered = sorted(self._buckets.items(), key=lambda item: item[1][1])
+        for key, _ in ordered[:len(ordered) // 2]:
+            del self._buckets[key]
+
+
+class SQLiteBuckets:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS buckets '
+                         '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def update(self, limits, change, now):
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')  # serialise read-modify-write across processes
+        try:
+            current = {}
+            for key in limits:
+                row = conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+                current[key] = tuple(row) if row else None
+            result, new_state = _apply(limits, current, change, now)
+            conn.executemany('INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)',
+                             [(key, tokens, updated) for key, (tokens, updated) in new_state.items()])
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return result
+
+
+def _apply(limits, current, change, now):
+    """
+    Refill each bucket for the time passed, then apply `change` tokens to all
+    of them (-1 takes, +1 gives back). A take only happens if every bucket
+    has a token. Returns (seconds until a token is free, or 0 if applied; new state).
+    """
+    levels = {}
+    for key, (capacity, refill_seconds) in limits.items():
+        tokens, updated = current.get(key) or (capacity, now)
+        levels[key] = min(capacity, tokens + (now - updated) / refill_seconds)
+
+    if change < 0:
+        waits = [(1 - levels[key]) * limits[key][1] for key in limits if levels[key] < 1]
+        if waits:
+            return max(waits), {key: (levels[key], now) for key in limits}
+    return 0, {key: (min(limits[key][0], levels[key] + change), now) for key in limits}
+
+
+class LoginThrottle:
+    def __init__(self):
+        self.app = None
+        self._buckets = None
+
+    def init_app(self, app):
+        app.config.setdefault('LOGIN_THROTTLE_ENABLED', True)
+        app.config.setdefault('LOGIN_THROTTLE_BACKEND', 'memory')
+        app.config.setdefault('LOGIN_THROTTLE_PATH', os.path.join(app.root_path, 'login_throttle.db'))
+        app.config.setdefault('LOGIN_USER_BURST', 5)
+        app.config.setdefault('LOGIN_USER_REFILL_SECONDS', 60)
+        app.config.setdefault('LOGIN_IP_BURST', 20)
+        app.config.setdefault('LOGIN_IP_REFILL_SECONDS', 6)
+        self.app = app
+        self._buckets = None
+        app.extensions['login_throttle'] = self
+
+    @property
+    def buckets(self):
+        if self._buckets is None:
+            if self.app.config['LOGIN_THROTTLE_BACKEND'] == 'sqlite':
+                self._buckets = SQLiteBuckets(self.app.config['LOGIN_THROTTLE_PATH'])
+            else:
+                self._buckets = MemoryBuckets()
+        return self._buckets
+
+    def _limits(self, username, address):
+        config = self.app.config
+        return {
+            f'user:{username.lower()}': (config['LOGIN_USER_BURST'], config['LOGIN_USER_REFILL_SECONDS']),
+            f'ip:{address}': (config['LOGIN_IP_BURST'], config['LOGIN_IP_REFILL_SECONDS']),
+        }
+
+    def attempt(self, username, address):
+        """Take a token for a login attempt. Returns 0, or the seconds to wait if throttled."""
+        if not self.app.config['LOGIN_THROTTLE_ENABLED']:
+            return 0
+        return self.buckets.update(self._limits(username, address), -1, time.time())
+
+    def succeeded(self, username, address):
+        """Give back the tokens a successful attempt took."""
+        if self.app.config['LOGIN_THROTTLE_ENABLED']:
+            self.buckets.update(self._limits(username, address), 1, time.time())
+
+
+login_throttle = LoginThrottle()
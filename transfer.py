@@ -0,0 +1,311 @@
+"""
+EDSPL Tracker - Bulk Ticket Import / Export
+Streams tickets in and out as CSV or JSON Lines without holding a whole
+file or table in memory. Imports are validated row by row and inserted in
+batched transactions together with their "created" activity rows.
+"""
+
+import csv
+import io
+import json
+from datetime import datetime, timezone
+
+from sqlalchemy.orm import aliased
+
+from models import (db, User, Ticket, ActivityLog,
+                    TICKET_STATUSES, TICKET_PRIORITIES, TICKET_CATEGORIES)
+from rollups import RollupChanges, ticket_state
+from saved_filters import FilterCountChanges, filter_state
+
+FORMATS = ('csv', 'jsonl')
+
+EXPORT_FIELDS = [
+    'ticket_number', 'title', 'description', 'status', 'priority', 'category',
+    'created_by', 'assigned_to', 'created_at', 'updated_at', 'resolved_at',
+]
+
+DATETIME_FIELDS = ('created_at', 'updated_at', 'resolved_at')
+
+
+def detect_format(filename):
+    """Guess the format from a file name; defaults to CSV."""
+    name = (filename or '').lower()
+    if name.endswith(('.jsonl', '.ndjson', '.json')):
+        return 'jsonl'
+    return 'csv'
+
+
+# -------------------- Import --------------------
+
+class UnreadableFile(ValueError):
+    """The file cannot be read past `line_num`: not valid text, or broken CSV."""
+
+    def __init__(self, line_num, message):
+        super().__init__(message)
+        self.line_num = line_num
+
+
+class ImportResult:
+    def __init__(self):
+        self.imported = 0
+        self.errors = []  # (line number, message)
+        self.stopped_at = None  # line number where an unreadable file ended the import
+
+    @property
+    def failed(self):
+        return len(self.errors)
+
+
+def read_rows(stream, fmt):
+    """
+    Yield (line number, row dict) from a text stream, one row at a time.
+    Open the stream with errors='surrogateescape' and rows that are not
+    valid text are reported one by one; otherwise, and if the CSV itself
+    breaks, UnreadableFile is raised after every row before that point.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f'unsupported format: {fmt}')
+
+    line_num = 0  # lines read so far
+    try:
+        if fmt == 'csv':
+            reader = csv.DictReader(stream)
+            for row in reader:
+                line_num = reader.line_num
+                if not all(_is_text(value) for value in row.values() if isinstance(value, str)):
+                    row = ValueError('row is not valid UTF-8 text')
+                yield line_num, row
+        else:
+            for line_num, line in enumerate(stream, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                if not _is_text(line):
+                    yield line_num, ValueError('line is not valid UTF-8 text')
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield line_num, ValueError(f'invalid JSON: {e}')
+                    continue
+                yield line_num, row if isinstance(row, dict) else ValueError('expected a JSON object')
+    except UnicodeDecodeError as e:
+        # Text is decoded ahead in blocks, so the bad bytes are at or after this line
+        raise UnreadableFile(line_num + 1, f'file is not valid {e.encoding} text from here on ({e.reason})')
+    except csv.Error as e:
+        raise UnreadableFile(reader.line_num + 1, f'malformed CSV: {e}')  # the line being parsed
+
+
+def _is_text(value):
+    # Bytes that did not decode come through surrogateescape as lone surrogates
+    try:
+        value.encode('utf-8')
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
+def _parse_datetime(value, field):
+    if value in (None, ''):
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).strip())
+    except ValueError:
+        raise ValueError(f'{field} is not an ISO date/time: {value!r}')
+    if parsed.tzinfo is not None:
+        # Stored times are naive UTC; a row may mix offsets and plain times
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _choice(row, field, choices, default):
+    value = str(row.get(field) or default).strip().lower()
+    if value not in choices:
+        raise ValueError(f'{field} must be one of {", ".join(choices)}')
+    return value
+
+
+def validate_row(row, users, default_user_id):
+    """
+    Turn an import row into Ticket column values, raising ValueError if invalid.
+
+    `users` maps username to (id, full_name). Ticket numbers are never taken
+    from the row; they are allocated when the batch is inserted.
+    """
+    title = str(row.get('title') or '').strip()
+    if not title:
+        raise ValueError('title is required')
+    if len(title) > 200:
+        raise ValueError('title is longer than 200 characters')
+
+    def user_id(field, default):
+        username = str(row.get(field) or '').strip()
+        if not username:
+            return default
+        if username not in users:
+            raise ValueError(f'{field} user {username!r} does not exist')
+        return users[username][0]
+
+    # Times in the future are clamped to now: the API's ETags and the list
+    # orderings assume max(updated_at) moves forward with every later edit
+    now = datetime.utcnow()
+    status = _choice(row, 'status', TICKET_STATUSES, 'open')
+    created_at = min(_parse_datetime(row.get('created_at'), 'created_at') or now, now)
+    updated_at = min(_parse_datetime(row.get('updated_at'), 'updated_at') or created_at, now)
+    resolved_at = _parse_datetime(row.get('resolved_at'), 'resolved_at')
+    if status == 'resolved' and resolved_at is None:
+        resolved_at = created_at
+    if resolved_at is not None:
+        resolved_at = min(resolved_at, now)
+
+    return {
+        'title': title,
+        'description': str(row.get('description') or '').strip(),
+        'status': status,
+        'priority': _choice(row, 'priority', TICKET_PRIORITIES, 'medium'),
+        'category': _choice(row, 'category', TICKET_CATEGORIES, 'other'),
+        'created_by': user_id('created_by', default_user_id),
+        'assigned_to': user_id('assigned_to', None),
+        'created_at': created_at,
+        'updated_at': updated_at,
+        'resolved_at': resolved_at,
+    }
+
+
+def import_tickets(rows, user_id, batch_size=1000):
+    """
+    Validate and insert (line number, row) pairs in batches of `batch_size`.
+
+    Each batch reserves its ticket numbers in one allocation and is committed
+    as a single transaction. Invalid rows are skipped and reported. If the
+    file itself becomes unreadable, the rows before that point are still
+    imported and result.stopped_at says where reading ended.
+    """
+    result = ImportResult()
+    users = {username: (uid, full_name) for uid, username, full_name
+             in db.session.query(User.id, User.username, User.full_name)}
+    names = {uid: full_name for uid, full_name in users.values()}
+
+    batch = []
+    try:
+        for line_num, row in rows:
+            try:
+                if isinstance(row, Exception):
+                    raise row
+                batch.append(validate_row(row, users, user_id))
+            except ValueError as e:
+                result.errors.append((line_num, str(e)))
+                continue
+
+            if len(batch) >= batch_size:
+                result.imported += _insert_batch(batch, user_id, names)
+                batch = []
+    except UnreadableFile as e:
+        result.errors.append((e.line_num, str(e)))
+        result.stopped_at = e.line_num
+
+    if batch:
+        result.imported += _insert_batch(batch, user_id, names)
+    return result
+
+
+def _insert_batch(batch, user_id, names):
+    for values, number in zip(batch, Ticket.reserve_ticket_numbers(len(batch))):
+        values['ticket_number'] = number
+        values['last_activity_at'] = values['updated_at']
+
+    # Core inserts on the tables skip per-object ORM bookkeeping
+    tickets = Ticket.__table__
+    ticket_ids = db.session.scalars(
+        db.insert(tickets).returning(tickets.c.id, sort_by_parameter_order=True), batch
+    ).all()
+
+    activities = []
+    for ticket_id, values in zip(ticket_ids, batch):
+        activities.append({
+            'ticket_id': ticket_id, 'user_id': user_id, 'action': 'created',
+            'old_value': None, 'new_value': None, 'created_at': values['created_at'],
+        })
+        if values['assigned_to']:
+            activities.append({
+                'ticket_id': ticket_id, 'user_id': user_id, 'action': 'assigned',
+                'old_value': None, 'new_value': names[values['assigned_to']],
+                'created_at': values['created_at'],
+            })
+    db.session.execute(db.insert(ActivityLog.__table__), activities)
+
+    rollups = RollupChanges()
+    filter_counts = FilterCountChanges()
+    for values in batch:
+        state = ticket_state(values['status'], values['category'], values['priority'], values['assigned_to'])
+        rollups.track(values['created_at'], None, state, values['resolved_at'] or values['updated_at'])
+        filter_counts.track(None, filter_state(values['status'], values['priority'], values['category'],
+                                               values['assigned_to'], 0))
+    rollups.save()
+    filter_counts.save()
+    db.session.commit()
+    return len(ticket_ids)
+
+
+# -------------------- Export --------------------
+
+def export_rows(batch_size=1000):
+    """Yield every ticket as an export dict, streaming from the database."""
+    creator = aliased(User)
+    assignee = aliased(User)
+    statement = db.select(
+        Ticket.ticket_number, Ticket.title, Ticket.description, Ticket.status,
+        Ticket.priority, Ticket.category, creator.username, assignee.username,
+        Ticket.created_at, Ticket.updated_at, Ticket.resolved_at,
+    ).join(creator, Ticket.created_by == creator.id).outerjoin(
+        assignee, Ticket.assigned_to == assignee.id
+    ).order_by(Ticket.id).execution_options(yield_per=batch_size)
+
+    for values in db.session.execute(statement):
+        row = dict(zip(EXPORT_FIELDS, values))
+        for field in DATETIME_FIELDS:
+            if row[field] is not None:
+                row[field] = row[field].isoformat()
+        yield row
+
+
+def iter_csv(header, rows, flush_every=500):
+    """Yield CSV text for a header and an iterable of row tuples, in chunks."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(value.isoformat() if isinstance(value, datetime) else value for value in row)
+        if count % flush_every == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def iter_export(fmt, rows=None, flush_every=500):
+    """Yield the export as text chunks of roughly `flush_every` rows each."""
+    rows = export_rows() if rows is None else rows
+    buffer = io.StringIO()
+
+    if fmt == 'csv':
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+        writer.writeheader()
+        write = writer.writerow
+    elif fmt == 'jsonl':
+        def write(row):
+            buffer.write(json.dumps(row))
+            buffer.write('\n')
+    else:
+        raise ValueError(f'unsupported format: {fmt}')
+
+    for count, row in enumerate(rows, start=1):
+        write(row)
+        if count % flush_every == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
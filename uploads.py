@@ -0,0 +1,149 @@
+"""
+EDSPL Tracker - Streaming Attachment Uploads
+Writes uploads to disk in fixed-size blocks while hashing them, so no upload
+is ever held in memory, and supports resumable uploads sent in chunks.
+"""
+
+import hashlib
+import os
+import threading
+import uuid
+
+from flask import current_app
+
+# Running SHA-256 state per in-progress upload: upload id -> (hasher, bytes hashed).
+# Hash objects cannot be stored in the database, so a chunk landing on another
+# worker (or after a restart) re-hashes the partial file once and carries on.
+_hashers = {}
+_hashers_lock = threading.Lock()
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def partial_folder():
+    folder = os.path.join(current_app.config['UPLOAD_FOLDER'], '.partial')
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def partial_path(upload_id):
+    return os.path.join(partial_folder(), upload_id)
+
+
+def new_stored_filename(original_filename):
+    ext = original_filename.rsplit('.', 1)[1].lower()
+    return f'{uuid.uuid4().hex}.{ext}'
+
+
+def copy_stream(source, target, hasher, limit=None):
+    """Copy `source` into the open file `target` block by block. Returns bytes copied."""
+    block_size = current_app.config['UPLOAD_BLOCK_SIZE']
+    copied = 0
+    while True:
+        block = source.read(block_size)
+        if not block:
+            break
+        copied += len(block)
+        if limit is not None and copied > limit:
+            raise UploadError('Upload is larger than declared.', 413)
+        hasher.update(block)
+        target.write(block)
+    return copied
+
+
+def hash_file(path, hasher=None, length=None):
+    """Feed the first `length` bytes (default all) of a file into a SHA-256 hasher."""
+    hasher = hasher or hashlib.sha256()
+    block_size = current_app.config['UPLOAD_BLOCK_SIZE']
+    remaining = length
+    with open(path, 'rb') as f:
+        while remaining is None or remaining > 0:
+            block = f.read(block_size if remaining is None else min(block_size, remaining))
+            if not block:
+                break
+            hasher.update(block)
+            if remaining is not None:
+                remaining -= len(block)
+    return hasher
+
+
+def save_stream(stream, path):
+    """Write a whole stream to `path`. Returns (sha256 hex, size)."""
+    hasher = hashlib.sha256()
+    with open(path, 'wb') as target:
+        size = copy_stream(stream, target, hasher)
+    return hasher.hexdigest(), size
+
+
+def append_chunk(session, stream, start, length):
+    """
+    Append one chunk of a resumable upload at byte offset `start`.
+
+    Chunks must arrive in order; a mismatched offset raises a 409 so the
+    client can ask for the current offset and resume from there.
+    """
+    if start != session.received:
+        raise UploadError(f'Expected offset {session.received}.', 409)
+    if session.received + length > session.total_size:
+        raise UploadError('Chunk runs past the declared file size.', 413)
+
+    path = partial_path(session.id)
+    on_disk = os.path.getsize(path) if os.path.exists(path) else 0
+    if on_disk < start:
+        # The partial file lost data (e.g. cleaned up); resume from what is there
+        session.received = on_disk
+        raise UploadError(f'Expected offset {on_disk}.', 409)
+
+    with _hashers_lock:
+        hasher, hashed = _hashers.pop(session.id, (None, 0))
+    if hasher is None or hashed != start:
+        hasher = hash_file(path, length=start) if start else hashlib.sha256()
+
+    with open(path, 'ab') as target:
+        target.truncate(start)  # drop any tail left by an interrupted chunk
+        copied = copy_stream(stream, target, hasher, limit=length)
+    if copied != length:
+        raise UploadError('Chunk was shorter than its Content-Range.', 400)
+
+    session.received = start + copied
+    with _hashers_lock:
+        _hashers[session.id] = (hasher, session.received)
+    return session.received
+
+
+def finish_upload(session):
+    """Finish hashing a completed upload. Returns (partial file path, sha256 hex)."""
+    with _hashers_lock:
+        hasher, hashed = _hashers.pop(session.id, (None, 0))
+    path = partial_path(session.id)
+    if hasher is None or hashed != session.received:
+        hasher = hash_file(path)
+    return path, hasher.hexdigest()
+
+
+def discard_upload(upload_id):
+    with _hashers_lock:
+        _hashers.pop(upload_id, None)
+    try:
+        os.remove(partial_path(upload_id))
+    except FileNotFoundError:
+        pass
+
+
+def parse_content_range(header):
+    """Parse 'bytes start-end/total'. Returns (start, length, total) or None."""
+    if not header or not header.startswith('bytes '):
+        return None
+    try:
+        span, total = header[6:].split('/')
+        start, end = (int(part) for part in span.split('-'))
+        total = int(total)
+    except ValueError:
+        return None
+    if start < 0 or end < start or end >= total:
+        return None
+    return start, end - start + 1, total
@@ -0,0 +1,923 @@
+"""
+EDSPL Tracker - Web Views
+The pages of the tracker as the 'web' blueprint, registered by
+create_app() in app.py.
+"""
+
+import io
+import uuid
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import (Blueprint, Response, abort, current_app, jsonify, render_template, redirect, url_for, flash,
+                   request, stream_with_context)
+from flask_login import login_user, logout_user, login_required, current_user
+from markupsafe import Markup
+from werkzeug.utils import secure_filename
+
+from models import db, User, Ticket, Comment, Attachment, Job, UploadSession, SavedFilter, log_activity
+from pagination import decode_cursor, paginate_keyset, parse_datetime
+from cache import TTLCache
+from search import highlight
+from stats import load_dashboard_snapshot, dashboard_stats
+from metrics import metrics
+from uploads import (UploadError, append_chunk, discard_upload, finish_upload, new_stored_filename,
+                     parse_content_range, partial_path, save_stream)
+from storage import guess_mime_type, send_attachment, store_blob
+from bulk import KEEP, BulkError, bulk_update
+from directory import user_directory
+from passwords import HashingBusy
+from throttle import login_throttle
+from rollups import GROUPINGS, load_report, state_of, track_ticket
+from archive import activity_source
+from saved_filters import (TICKET_FILTERS, TICKET_SORTS, expire_quiet_counts, filter_state_of,
+                           filtered_ticket_query, query_args, refresh_counts, save_filter, track_filter_change)
+from events import change_feed, parse_event_id
+from jobs import JOB_STATUSES, enqueue, retry_job, start_workers
+from transfer import FORMATS, detect_format, read_rows, import_tickets, iter_export, iter_csv
+
+web = Blueprint('web', __name__)
+
+ticket_count_cache = TTLCache()
+dashboard_cache = TTLCache()
+
+
+@web.record_once
+def configure(state):
+    ticket_count_cache.ttl = state.app.config['TICKET_COUNT_CACHE_TTL']
+    dashboard_cache.ttl = state.app.config['DASHBOARD_CACHE_TTL']
+
+
+def admin_required(f):
+    """Restrict a view to users with the admin role."""
+    @wraps(f)
+    @login_required
+    def decorated(*args, **kwargs):
+        if current_user.role != 'admin':
+            abort(403)
+        return f(*args, **kwargs)
+    return decorated
+
+
+def invalidate_ticket_caches():
+    """Drop cached counts after tickets or their activity change."""
+    ticket_count_cache.clear()
+    dashboard_cache.clear()
+
+
+def queue_notifications(ticket, activities):
+    """Queue a notification to the assignee for activity someone else just did."""
+    if not activities or not ticket.assigned_to or ticket.assigned_to == current_user.id:
+        return
+    db.session.flush()  # assigns the activity ids
+    activity_ids = [activity.id for activity in activities]
+    enqueue('notify_activity', {'activity_ids': activity_ids}, key=f'notify_activity:{activity_ids[0]}')
+
+
+def get_per_page(default=None):
+    """Page size from ?per_page=, clamped to the configured maximum."""
+    per_page = request.args.get('per_page', default or current_app.config['TICKETS_PER_PAGE'], type=int)
+    return max(1, min(per_page, current_app.config['MAX_TICKETS_PER_PAGE']))
+
+
+def page_url(**cursor):
+    """URL for the current page with the paging cursor replaced."""
+    args = request.args.to_dict()
+    args.pop('after', None)
+    args.pop('before', None)
+    args.update(cursor)
+    return url_for(request.endpoint, **request.view_args, **args)
+
+
+web.add_app_template_global(page_url)
+
+
+def allowed_file(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
+
+
+# -------------------- Authentication Routes --------------------
+
+@web.route('/')
+def index():
+    if current_user.is_authenticated:
+        return redirect(url_for('web.dashboard'))
+    return redirect(url_for('web.login'))
+
+
+@web.route('/login', methods=['GET', 'POST'])
+def login():
+    if current_user.is_authenticated:
+        return redirect(url_for('web.dashboard'))
+
+    if request.method == 'POST':
+        username = request.form.get('username', '').strip()
+        password = request.form.get('password', '')
+
+        # Throttled attempts are refused before any password is hashed
+        wait = login_throttle.attempt(username, request.remote_addr)
+        if wait:
+            flash(f'Too many login attempts. Try again in {int(wait) + 1} seconds.', 'danger')
+            return render_template('login.html'), 429, {'Retry-After': str(int(wait) + 1)}
+
+        user = User.query.filter_by(username=username).first()
+        try:
+            valid = user is not None and user.check_password(password)
+        except HashingBusy:
+            flash('The server is busy. Please try again in a moment.', 'warning')
+            return render_template('login.html'), 503, {'Retry-After': '5'}
+
+        if valid:
+            login_throttle.succeeded(username, request.remote_addr)
+            if user.password_needs_rehash():
+                # Hashing parameters changed since this password was set
+                try:
+                    user.set_password(password)
+                    db.session.commit()
+                except HashingBusy:
+                    pass  # upgraded at a later login instead
+            login_user(user)
+            next_page = request.args.get('next')
+            flash(f'Welcome back, {user.full_name}!', 'success')
+            return redirect(next_page or url_for('web.dashboard'))
+        else:
+            flash('Invalid username or password.', 'danger')
+
+    return render_template('login.html')
+
+
+@web.route('/logout')
+@login_required
+def logout():
+    logout_user()
+    flash('You have been logged out.', 'info')
+    return redirect(url_for('web.login'))
+
+
+# -------------------- Dashboard --------------------
+
+def dashboard_snapshot():
+    return load_dashboard_snapshot(quiet_days=current_app.config['QUIET_TICKET_DAYS'])
+
+
+@web.route('/dashboard')
+@login_required
+def dashboard():
+    # Counts and recent lists come from one cached snapshot shared by all users
+    snapshot = dashboard_cache.get_or_set('snapshot', dashboard_snapshot)
+    stats = dashboard_stats(snapshot, current_user.id)
+
+    return render_template('dashboard.html', stats=stats,
+                           recent_tickets=snapshot['recent_tickets'],
+                           recent_activity=snapshot['recent_activity'])
+
+
+@web.route('/dashboard/stats')
+@login_required
+def dashboard_stats_json():
+    # Live dashboards re-read their counters here after a change event
+    snapshot = dashboard_cache.get_or_set('snapshot', dashboard_snapshot)
+    return jsonify(dashboard_stats(snapshot, current_user.id))
+
+
+# -------------------- Live Updates --------------------
+
+@web.route('/events')
+@login_required
+def event_stream():
+    """Server-sent events for new activity and comments, optionally for one ticket."""
+    if not current_app.config['LIVE_UPDATES']:
+        abort(404)
+    subscription = change_feed.subscribe(request.args.get('ticket', type=int))
+    # Browsers send Last-Event-ID on reconnect; pages pass ?since= on first connect
+    since = parse_event_id(request.headers.get('Last-Event-ID') or request.args.get('since'))
+    return Response(change_feed.stream(subscription, since), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+# -------------------- Ticket Routes --------------------
+
+@web.route('/tickets')
+@login_required
+def ticket_list():
+    filters = {name: request.args.get(name, '') for name in TICKET_FILTERS}
+    sort = request.args.get('sort', '')
+    sort_column, parse_sort_value = TICKET_SORTS.get(sort, TICKET_SORTS['created'])
+    query, hits = filtered_ticket_query(filters, current_user.id)
+
+    # The filtered total only changes when tickets do, so reuse it while paging
+    count_key = tuple(current_user.id if name == 'assigned' and value == 'me' else value
+                      for name, value in filters.items())
+    total = ticket_count_cache.get_or_set(count_key, query.count)
+
+    after = request.args.get('after')
+    before = request.args.get('before')
+    snippets = {}
+
+    if hits is not None:
+        # Search results are ranked best match first rather than newest first
+        page = paginate_keyset(
+            query.add_columns(hits.c.rank, hits.c.snippet),
+            hits.c.rank, Ticket.id,
+            key=lambda row: (row.rank, row.Ticket.id),
+            after=decode_cursor(after, parse=float),
+            before=decode_cursor(before, parse=float),
+            per_page=get_per_page(),
+            descending=False,
+        )
+        snippets = {row.Ticket.id: row.snippet for row in page.items}
+        page.items = [row.Ticket for row in page.items]
+    else:
+        page = paginate_keyset(
+            query,
+            sort_column, Ticket.id,
+            key=lambda ticket: (getattr(ticket, sort_column.key), ticket.id),
+            after=decode_cursor(after, parse=parse_sort_value),
+            before=decode_cursor(before, parse=parse_sort_value),
+            per_page=get_per_page(),
+        )
+
+    saved_filters = refresh_counts(
+        SavedFilter.query.filter_by(user_id=current_user.id).order_by(SavedFilter.name).all())
+    # The list arguments as a saved filter would store them, to offer saving and mark a match
+    current_args = {name: value for name, value in filters.items() if value}
+    if sort in TICKET_SORTS and sort != 'created':
+        current_args['sort'] = sort
+
+    return render_template('tickets/list.html', tickets=page, page=page, total=total, snippets=snippets,
+                           filters=filters, saved_filters=saved_filters, query_args=query_args,
+                           current_args=current_args, users=user_directory.all())
+
+
+@web.route('/tickets/filters', methods=['POST'])
+@login_required
+def saved_filter_create():
+    name = request.form.get('name', '').strip()
+    filters = {name: request.form.get(name, '') for name in TICKET_FILTERS}
+    sort = request.form.get('sort', '')
+    back = url_for('web.ticket_list', **{key: value for key, value in filters.items() if value},
+                   **({'sort': sort} if sort else {}))
+
+    if not name or len(name) > 100:
+        flash('Filter name must be 1 to 100 characters.', 'danger')
+        return redirect(back)
+    existing = SavedFilter.query.filter_by(user_id=current_user.id, name=name).first()
+    if existing is None and SavedFilter.query.filter_by(
+            user_id=current_user.id).count() >= current_app.config['SAVED_FILTERS_PER_USER']:
+        flash(f"You can keep at most {current_app.config['SAVED_FILTERS_PER_USER']} saved filters.", 'danger')
+        return redirect(back)
+
+    save_filter(current_user.id, name, filters, sort)
+    db.session.commit()
+    flash(f'Filter "{name}" {"updated" if existing else "saved"}.', 'success')
+    return redirect(back)
+
+
+@web.route('/tickets/filters/<int:filter_id>/delete', methods=['POST'])
+@login_required
+def saved_filter_delete(filter_id):
+    saved = SavedFilter.query.filter_by(id=filter_id, user_id=current_user.id).first_or_404()
+    db.session.delete(saved)
+    db.session.commit()
+    flash(f'Filter "{saved.name}" deleted.', 'info')
+    return redirect(url_for('web.ticket_list'))
+
+
+@web.route('/tickets/new', methods=['GET', 'POST'])
+@login_required
+def ticket_create():
+    if request.method == 'POST':
+        title = request.form.get('title', '').strip()
+        description = request.form.get('description', '').strip()
+        priority = request.form.get('priority', 'medium')
+        category = request.form.get('category', 'other')
+        assigned_to = request.form.get('assigned_to')
+
+        if not title:
+            flash('Title is required.', 'danger')
+            return redirect(url_for('web.ticket_create'))
+
+        now = datetime.utcnow()
+        ticket = Ticket(
+            ticket_number=Ticket.generate_ticket_number(),
+            title=title,
+            description=description,
+            priority=priority,
+            category=category,
+            created_by=current_user.id,
+            assigned_to=int(assigned_to) if assigned_to else None,
+            created_at=now,
+            updated_at=now,
+            last_activity_at=now
+        )
+        db.session.add(ticket)
+        db.session.flush()  # assigns ticket.id; everything below commits together
+        track_ticket(ticket, None)
+        track_filter_change(None, filter_state_of(ticket))
+
+        # Log creation
+        activities = [log_activity(ticket.id, current_user.id, 'created', when=now)]
+        if ticket.assigned_to:
+            activities.append(log_activity(ticket.id, current_user.id, 'assigned', None,
+                                           user_directory.name(ticket.assigned_to), when=now))
+        queue_notifications(ticket, activities)
+        db.session.commit()
+        invalidate_ticket_caches()
+
+        flash(f'Ticket {ticket.ticket_number} created successfully.', 'success')
+        return redirect(url_for('web.ticket_view', ticket_id=ticket.id))
+
+    return render_template('tickets/create.html', users=user_directory.all())
+
+
+@web.route('/tickets/import', methods=['GET', 'POST'])
+@admin_required
+def ticket_import():
+    result = None
+    if request.method == 'POST':
+        file = request.files.get('file')
+        if not file or file.filename == '':
+            flash('No file selected.', 'danger')
+            return redirect(url_for('web.ticket_import'))
+
+        fmt = request.form.get('format') or detect_format(file.filename)
+        if fmt not in FORMATS:
+            flash('Unsupported import format.', 'danger')
+            return redirect(url_for('web.ticket_import'))
+
+        # Parse straight off the uploaded stream, one row at a time
+        stream = io.TextIOWrapper(file.stream, encoding='utf-8-sig', errors='surrogateescape', newline='')
+        result = import_tickets(read_rows(stream, fmt), current_user.id,
+                                batch_size=current_app.config['IMPORT_BATCH_SIZE'])
+        invalidate_ticket_caches()
+        if result.stopped_at:
+            flash(f'Could not read the file past line {result.stopped_at}: {result.errors[-1][1]}. '
+                  f'Imported {result.imported} ticket(s) from the lines before it, skipped {result.failed}.',
+                  'danger')
+        else:
+            flash(f'Imported {result.imported} ticket(s), skipped {result.failed}.',
+                  'success' if not result.failed else 'warning')
+
+    return render_template('tickets/import.html', result=result, formats=FORMATS)
+
+
+@web.route('/tickets/export')
+@login_required
+def ticket_export():
+    fmt = request.args.get('format', 'csv')
+    if fmt not in FORMATS:
+        abort(400)
+
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    filename = f'tickets-{datetime.utcnow():%Y%m%d}.{fmt}'
+    return Response(
+        stream_with_context(iter_export(fmt)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+
+@web.route('/tickets/bulk', methods=['POST'])
+@login_required
+def ticket_bulk():
+    """Apply one status / priority / assignee change to the selected or all filtered tickets."""
+    limit = current_app.config['BULK_MAX_TICKETS']
+    # The list's filters travel as filter_<name> so they don't clash with the changes
+    filters = {name: request.form.get(f'filter_{name}', '') for name in TICKET_FILTERS}
+    back = url_for('web.ticket_list', **{name: value for name, value in filters.items() if value})
+
+    if request.form.get('scope') == 'filter':
+        query, _ = filtered_ticket_query(filters, current_user.id)
+        ticket_ids = [tid for (tid,) in query.with_entities(Ticket.id).order_by(Ticket.id).limit(limit + 1)]
+    else:
+        ticket_ids = request.form.getlist('ticket_ids', type=int)
+
+    assigned_to = request.form.get('assigned_to', '')
+    if assigned_to == '':
+        assigned_to = KEEP
+    elif assigned_to == 'none':
+        assigned_to = None
+    elif assigned_to.isdigit():
+        assigned_to = int(assigned_to)
+    else:
+        flash('Unknown assignee.', 'danger')
+        return redirect(back)
+
+    try:
+        result = bulk_update(ticket_ids, current_user.id,
+                             status=request.form.get('status') or None,
+                             priority=request.form.get('priority') or None,
+                             assigned_to=assigned_to, max_tickets=limit)
+    except BulkError as e:
+        flash(str(e), 'danger')
+        return redirect(back)
+
+    if result.activity_ids:
+        enqueue('notify_activity', {'activity_ids': result.activity_ids},
+                key=f'notify_activity:{result.activity_ids[0]}')
+    db.session.commit()
+    invalidate_ticket_caches()
+
+    counts = result.counts
+    flash(f"Updated {counts['updated']} ticket(s); {counts['unchanged']} already matched, "
+          f"{counts['not_found']} not found.", 'success' if counts['updated'] else 'info')
+    return render_template('tickets/bulk_result.html', result=result, back=back)
+
+
+@web.route('/tickets/<int:ticket_id>')
+@login_required
+def ticket_view(ticket_id):
+    comment_total = db.select(db.func.count(Comment.id)).where(
+        Comment.ticket_id == Ticket.id).correlate(Ticket).scalar_subquery()
+    row = db.session.query(Ticket, comment_total).filter(Ticket.id == ticket_id).first()
+    if row is None:
+        abort(404)
+    ticket, comment_total = row
+
+    # Newest comments first from the database, shown oldest-first on the page
+    comments = paginate_keyset(
+        Comment.query.filter_by(ticket_id=ticket.id),
+        Comment.created_at, Comment.id,
+        key=lambda comment: (comment.created_at, comment.id),
+        after=decode_cursor(request.args.get('comments'), parse=parse_datetime),
+        per_page=current_app.config['COMMENTS_PER_PAGE'],
+    )
+    comments.items.reverse()
+
+    # A ticket's history can reach back into archived months
+    Activity = activity_source(since=ticket.created_at)
+    activities = paginate_keyset(
+        db.session.query(Activity).filter(Activity.ticket_id == ticket.id),
+        Activity.created_at, Activity.id,
+        key=lambda activity: (activity.created_at, activity.id),
+        after=decode_cursor(request.args.get('activity'), parse=parse_datetime),
+        per_page=current_app.config['ACTIVITY_PER_PAGE'],
+    )
+
+    attachments = Attachment.query.filter_by(ticket_id=ticket.id).order_by(Attachment.uploaded_at).all()
+
+    return render_template('tickets/view.html', ticket=ticket, users=user_directory.all(),
+                           comments=comments, comment_total=comment_total,
+                           attachments=attachments, activities=activities)
+
+
+@web.route('/tickets/<int:ticket_id>/update', methods=['POST'])
+@login_required
+def ticket_update(ticket_id):
+    ticket = Ticket.query.get_or_404(ticket_id)
+
+    # Track changes for audit
+    before = state_of(ticket)
+    filters_before = filter_state_of(ticket)
+    old_status = ticket.status
+    old_priority = ticket.priority
+    old_assignee = user_directory.name(ticket.assigned_to, None)
+
+    # Update fields
+    new_status = request.form.get('status')
+    new_priority = request.form.get('priority')
+    new_assigned_to = request.form.get('assigned_to')
+    new_title = request.form.get('title', '').strip()
+    new_description = request.form.get('description', '').strip()
+
+    if new_title:
+        ticket.title = new_title
+    if new_description is not None:
+        ticket.description = new_description
+    if new_status:
+        ticket.status = new_status
+    if new_priority:
+        ticket.priority = new_priority
+
+    ticket.assigned_to = int(new_assigned_to) if new_assigned_to else None
+    ticket.updated_at = datetime.utcnow()
+
+    if new_status == 'resolved' and old_status != 'resolved':
+        ticket.resolved_at = datetime.utcnow()
+
+    # Log changes in the same transaction as the update
+    activities = []
+    if old_status != ticket.status:
+        activities.append(log_activity(ticket.id, current_user.id, 'status_changed', old_status, ticket.status))
+    if old_priority != ticket.priority:
+        activities.append(log_activity(ticket.id, current_user.id, 'priority_changed', old_priority,
+                                       ticket.priority))
+
+    new_assignee = user_directory.name(ticket.assigned_to, None)
+    if old_assignee != new_assignee:
+        activities.append(log_activity(ticket.id, current_user.id, 'assigned', old_assignee, new_assignee))
+    if activities:
+        expire_quiet_counts(ticket.last_activity_at)
+        ticket.last_activity_at = activities[-1].created_at
+
+    track_ticket(ticket, before)
+    track_filter_change(filters_before, filter_state_of(ticket))
+    queue_notifications(ticket, activities)
+    db.session.commit()
+    invalidate_ticket_caches()
+
+    flash('Ticket updated successfully.', 'success')
+    return redirect(url_for('web.ticket_view', ticket_id=ticket.id))
+
+
+@web.route('/tickets/<int:ticket_id>/comment', methods=['POST'])
+@login_required
+def ticket_comment(ticket_id):
+    ticket = Ticket.query.get_or_404(ticket_id)
+    content = request.form.get('content', '').strip()
+
+    if not content:
+        flash('Comment cannot be empty.', 'danger')
+        return redirect(url_for('web.ticket_view', ticket_id=ticket.id))
+
+    comment = Comment(
+        ticket_id=ticket.id,
+        user_id=current_user.id,
+        content=content
+    )
+    db.session.add(comment)
+
+    # Log activity
+    activity = log_activity(ticket.id, current_user.id, 'commented')
+    if not ticket.comment_count:
+        # First comment: the ticket leaves any "no comments yet" filters
+        state = filter_state_of(ticket)
+        track_filter_change(state, state._replace(commented=True))
+    expire_quiet_counts(ticket.last_activity_at)
+    ticket.record_activity(comments=1, when=activity.created_at)
+    queue_notifications(ticket, [activity])
+    db.session.commit()
+    invalidate_ticket_caches()
+
+    flash('Comment added.', 'success')
+    return redirect(url_for('web.ticket_view', ticket_id=ticket.id))
+
+
+@web.route('/tickets/<int:ticket_id>/attach', methods=['POST'])
+@login_required
+def ticket_attach(ticket_id):
+    ticket = Ticket.query.get_or_404(ticket_id)
+
+    if 'file' not in request.files:
+        flash('No file selected.', 'danger')
+        return redirect(url_for('web.ticket_view', ticket_id=ticket.id))
+
+    file = request.files['file']
+    if file.filename == '':
+        flash('No file selected.', 'danger')
+        return redirect(url_for('web.ticket_view', ticket_id=ticket.id))
+
+    if file and allowed_file(file.filename):
+        original_filename = secure_filename(file.filename)
+
+        # Copy block by block, hashing as we go, rather than file.save()
+        path = partial_path(uuid.uuid4().hex)
+        sha256, size = save_stream(file.stream, path)
+
+        add_attachment(ticket, path, original_filename, sha256, size)
+        flash(f'File "{original_filename}" uploaded.', 'success')
+    else:
+        flash('File type not allowed.', 'danger')
+
+    return redirect(url_for('web.ticket_view', ticket_id=ticket.id))
+
+
+def add_attachment(ticket, path, original_filename, sha256, size):
+    """Move an uploaded file into the blob store, record it against a ticket and log it."""
+    store_blob(path, sha256, size)
+    attachment = Attachment(
+        ticket_id=ticket.id,
+        filename=new_stored_filename(original_filename),
+        original_filename=original_filename,
+        sha256=sha256,
+        size=size,
+        mime_type=guess_mime_type(original_filename),
+        uploaded_by=current_user.id
+    )
+    db.session.add(attachment)
+
+    # Log activity
+    activity = log_activity(ticket.id, current_user.id, 'attached', None, original_filename)
+    expire_quiet_counts(ticket.last_activity_at)
+    ticket.record_activity(attachments=1, when=activity.created_at)
+    queue_notifications(ticket, [activity])
+    db.session.flush()
+    enqueue('verify_attachment', {'attachment_id': attachment.id}, key=f'verify_attachment:{attachment.id}')
+    db.session.commit()
+    invalidate_ticket_caches()
+    return attachment
+
+
+# Resumable uploads: POST declares the file, then the client PUTs chunks with
+# Content-Range headers and can GET the session to find where to resume.
+
+@web.route('/tickets/<int:ticket_id>/uploads', methods=['POST'])
+@login_required
+def upload_start(ticket_id):
+    ticket = Ticket.query.get_or_404(ticket_id)
+    data = request.get_json(silent=True) or {}
+    original_filename = secure_filename(str(data.get('filename', '')))
+    size = data.get('size')
+
+    if not original_filename or not allowed_file(original_filename):
+        return jsonify(error='File type not allowed.'), 400
+    if not isinstance(size, int) or size <= 0:
+        return jsonify(error='File size is required.'), 400
+    if size > current_app.config['MAX_ATTACHMENT_SIZE']:
+        return jsonify(error='File is too large.'), 413
+
+    session = UploadSession(
+        id=uuid.uuid4().hex,
+        ticket_id=ticket.id,
+        user_id=current_user.id,
+        original_filename=original_filename,
+        total_size=size
+    )
+    db.session.add(session)
+    db.session.commit()
+    open(partial_path(session.id), 'wb').close()
+
+    return jsonify(upload_id=session.id, offset=0, chunk_size=current_app.config['UPLOAD_CHUNK_SIZE'],
+                   url=url_for('web.upload_chunk', upload_id=session.id)), 201
+
+
+def get_upload_session(upload_id):
+    session = db.session.get(UploadSession, upload_id)
+    if session is None or session.user_id != current_user.id:
+        abort(404)
+    return session
+
+
+@web.route('/uploads/session/<upload_id>', methods=['GET'])
+@login_required
+def upload_status(upload_id):
+    session = get_upload_session(upload_id)
+    return jsonify(upload_id=session.id, offset=session.received, size=session.total_size)
+
+
+@web.route('/uploads/session/<upload_id>', methods=['PUT'])
+@login_required
+def upload_chunk(upload_id):
+    session = get_upload_session(upload_id)
+    content_range = parse_content_range(request.headers.get('Content-Range'))
+    if content_range is None or content_range[2] != session.total_size:
+        return jsonify(error='A valid Content-Range header is required.', offset=session.received), 400
+
+    start, length, _ = content_range
+    try:
+        append_chunk(session, request.stream, start, length)
+    except UploadError as e:
+        db.session.commit()
+        return jsonify(error=str(e), offset=session.received), e.status
+    db.session.commit()
+
+    if session.received < session.total_size:
+        return jsonify(offset=session.received, complete=False)
+
+    ticket = db.session.get(Ticket, session.ticket_id)
+    path, sha256 = finish_upload(session)
+    db.session.delete(session)
+    attachment = add_attachment(ticket, path, session.original_filename, sha256, session.total_size)
+    return jsonify(offset=session.received, complete=True, attachment_id=attachment.id, sha256=sha256)
+
+
+@web.route('/uploads/session/<upload_id>', methods=['DELETE'])
+@login_required
+def upload_cancel(upload_id):
+    session = get_upload_session(upload_id)
+    db.session.delete(session)
+    db.session.commit()
+    discard_upload(upload_id)
+    return '', 204
+
+
+@web.route('/uploads/<filename>')
+@login_required
+def uploaded_file(filename):
+    attachment = Attachment.query.filter_by(filename=filename).first_or_404()
+    return send_attachment(attachment)
+
+
+# -------------------- Audit Report --------------------
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d') if value else None
+    except ValueError:
+        return None
+
+
+def audit_query():
+    """
+    Activity filtered by the audit form's ticket number and date range, across
+    the live log and any archive months in range. Returns (query, entity).
+    """
+    start = parse_date(request.args.get('start_date'))
+    end = parse_date(request.args.get('end_date'))
+    ticket_number = request.args.get('ticket_number', '').strip().upper()
+
+    # End date is inclusive: everything before the following midnight
+    until = end + timedelta(days=1) if end else None
+    Activity = activity_source(since=start, until=until)
+    query = db.session.query(Activity)
+
+    if ticket_number:
+        if ticket_number.startswith('EDSPL-'):
+            # Prefix range so the unique ticket_number index does the lookup
+            match = db.and_(Ticket.ticket_number >= ticket_number,
+                            Ticket.ticket_number < ticket_number + '\uffff')
+        else:
+            match = Ticket.ticket_number.ilike(f'%{ticket_number}%')
+        query = query.filter(Activity.ticket_id.in_(db.select(Ticket.id).where(match)))
+    if start:
+        query = query.filter(Activity.created_at >= start)
+    if until:
+        query = query.filter(Activity.created_at < until)
+
+    return query, Activity
+
+
+@web.route('/audit')
+@login_required
+def audit_log():
+    query, Activity = audit_query()
+    page = paginate_keyset(
+        query.options(db.joinedload(Activity.ticket)),
+        Activity.created_at, Activity.id,
+        key=lambda activity: (activity.created_at, activity.id),
+        after=decode_cursor(request.args.get('after'), parse=parse_datetime),
+        before=decode_cursor(request.args.get('before'), parse=parse_datetime),
+        per_page=get_per_page(current_app.config['AUDIT_PER_PAGE']),
+    )
+    return render_template('audit.html', activities=page, page=page)
+
+
+@web.route('/audit/export')
+@login_required
+def audit_export():
+    query, Activity = audit_query()
+    rows = query.join(Ticket, Activity.ticket_id == Ticket.id).join(
+        User, Activity.user_id == User.id
+    ).with_entities(
+        Activity.created_at, Ticket.ticket_number, User.full_name,
+        Activity.action, Activity.old_value, Activity.new_value
+    ).order_by(Activity.created_at.desc(), Activity.id.desc()).yield_per(1000)
+
+    header = ['timestamp', 'ticket', 'user', 'action', 'previous_value', 'new_value']
+    filename = f'audit-{datetime.utcnow():%Y%m%d}.csv'
+    return Response(
+        stream_with_context(iter_csv(header, rows)),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+
+# -------------------- Reports --------------------
+
+@web.route('/reports')
+@login_required
+def reports():
+    end = parse_date(request.args.get('end_date')) or datetime.utcnow()
+    start = parse_date(request.args.get('start_date')) or end - timedelta(days=29)
+    start, end = start.date(), end.date()
+    if start > end:
+        start, end = end, start
+    group_by = request.args.get('group', 'category')
+    if group_by not in GROUPINGS:
+        group_by = 'category'
+
+    report = load_report(start, end, group_by)
+    return render_template('reports.html', report=report, start=start, end=end,
+                           group_by=group_by, groupings=GROUPINGS)
+
+
+# -------------------- Background Jobs --------------------
+
+_job_workers = None
+
+
+@web.before_app_request
+def start_job_workers():
+    # Started on the first request rather than at import so forked server
+    # workers each get their own threads
+    global _job_workers
+    if _job_workers is None and current_app.config['JOB_WORKER_THREADS']:
+        _job_workers = start_workers(current_app._get_current_object(), current_app.config['JOB_WORKER_THREADS'])
+
+
+@web.route('/jobs')
+@admin_required
+def job_list():
+    status = request.args.get('status', '')
+    counts = dict(db.session.query(Job.status, db.func.count(Job.id)).group_by(Job.status))
+
+    query = Job.query
+    if status in JOB_STATUSES:
+        query = query.filter(Job.status == status)
+    page = paginate_keyset(
+        query, Job.id, Job.id,
+        key=lambda job: (job.id, job.id),
+        after=decode_cursor(request.args.get('after'), parse=int),
+        before=decode_cursor(request.args.get('before'), parse=int),
+        per_page=get_per_page(current_app.config['AUDIT_PER_PAGE']),
+    )
+    return render_template('jobs.html', jobs=page, page=page, counts=counts, statuses=JOB_STATUSES)
+
+
+@web.route('/jobs/<int:job_id>/retry', methods=['POST'])
+@admin_required
+def job_retry(job_id):
+    job = Job.query.get_or_404(job_id)
+    if job.status != 'failed':
+        flash('Only failed jobs can be retried.', 'danger')
+    else:
+        retry_job(job)
+        flash(f'Job {job.id} queued again.', 'success')
+    return redirect(url_for('web.job_list', status=request.args.get('status', '')))
+
+
+# -------------------- Metrics --------------------
+
+@web.route('/metrics')
+def metrics_view():
+    # Scrapers authenticate with a bearer token; people need an admin session
+    token = current_app.config['METRICS_TOKEN']
+    authorized = token and request.headers.get('Authorization') == f'Bearer {token}'
+    if not authorized:
+        if not current_user.is_authenticated:
+            return current_app.login_manager.unauthorized()
+        if current_user.role != 'admin':
+            abort(403)
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+
+# -------------------- Template Filters --------------------
+
+@web.app_template_filter('timeago')
+def timeago_filter(dt):
+    if not dt:
+        return ''
+    now = datetime.utcnow()
+    diff = now - dt
+    seconds = diff.total_seconds()
+
+    if seconds < 60:
+        return 'just now'
+    elif seconds < 3600:
+        mins = int(seconds / 60)
+        return f'{mins}m ago'
+    elif seconds < 86400:
+        hours = int(seconds / 3600)
+        return f'{hours}h ago'
+    elif seconds < 604800:
+        days = int(seconds / 86400)
+        return f'{days}d ago'
+    else:
+        return dt.strftime('%Y-%m-%d')
+
+
+@web.app_template_filter('timeago_tag')
+def timeago_tag_filter(dt):
+    """A <time> element static/js/timeago.js turns into relative text; cacheable, unlike |timeago."""
+    if not dt:
+        return ''
+    return Markup(f'<time class="timeago" datetime="{dt.isoformat()}Z">{dt:%Y-%m-%d %H:%M}</time>')
+
+
+web.add_app_template_filter(highlight, 'highlight')
+
+
+@web.app_template_filter('duration')
+def duration_filter(seconds):
+    if seconds is None:
+        return '-'
+    minutes = int(seconds // 60)
+    if minutes < 60:
+        return f'{minutes}m'
+    hours, minutes = divmod(minutes, 60)
+    if hours < 24:
+        return f'{hours}h {minutes}m'
+    days, hours = divmod(hours, 24)
+    return f'{days}d {hours}h'
+
+
+@web.app_template_filter('status_badge')
+def status_badge_filter(status):
+    badges = {
+        'open': 'bg-primary',
+        'in_progress': 'bg-warning text-dark',
+        'resolved': 'bg-success',
+        'closed': 'bg-secondary'
+    }
+    return badges.get(status, 'bg-secondary')
+
+
+@web.app_template_filter('priority_badge')
+def priority_badge_filter(priority):
+    badges = {
+        'low': 'bg-info',
+        'medium': 'bg-primary',
+        'high': 'bg-warning text-dark',
+        'critical': 'bg-danger'
+    }
+    return badges.get(priority, 'bg-secondary')
@@ -1,16 +1,30 @@
-# WSGI configuration for PythonAnywhere
-# This file is used by PythonAnywhere to serve the Flask app
+# WSGI configuration for PythonAnywhere, gunicorn or uWSGI
+# This file is used by PythonAnywhere to serve the Flask app, e.g.
+#     gunicorn --preload --workers 4 wsgi:application
 
 import sys
 import os
 
-# Add project directory to path
-project_home = '/home/YOUR_USERNAME/edspl-tracker'
+# Add project directory (the one holding this file) to path
+project_home = os.path.dirname(os.path.abspath(__file__))
 if project_home not in sys.path:
     sys.path.insert(0, project_home)
 
 # Set environment variable for Flask
 os.environ['FLASK_ENV'] = 'production'
 
-# Import Flask app
-from app import app as application
+# Build the Flask app and do the first request's work before serving
+from app import create_app, warm_up
+from database import after_fork
+
+application = create_app()
+if application.config['WARM_UP']:
+    warm_up(application)
+
+try:
+    from uwsgidecorators import postfork
+except ImportError:
+    pass
+else:
+    # uWSGI forks workers without os.fork(), so the at-fork hook never runs
+    postfork(lambda: after_fork(application))